@@ -0,0 +1,107 @@
+"""
+Avalia offline quanto recall a busca perde com embeddings encurtados.
+
+Os modelos text-embedding-3 permitem encurtar o vetor: pedir `dimensions`
+à API equivale a truncar o vetor completo e renormalizá-lo. Este script faz
+isso com os vetores já gravados em rag_embeddings (sem chamar a API para o
+corpus) e compara, para cada largura, o top-k com o top-k da largura
+completa (busca exata, força bruta em NumPy).
+
+As consultas são trechos sorteados do próprio corpus (o trecho consultado é
+excluído do resultado) ou perguntas reais de um arquivo, uma por linha, que
+são embeddadas na largura completa.
+
+Uso:
+    python -m benchmarks.avaliar_dimensoes --k 5
+    python -m benchmarks.avaliar_dimensoes --categoria faq --perguntas perguntas.txt
+"""
+import argparse
+import json
+
+import numpy as np
+
+from src.db.conection import vector_conn
+
+DIMENSOES_AVALIADAS = (256, 512, 1024, 1536)
+
+
+def carregar_corpus(categoria: str | None, limite: int) -> np.ndarray:
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            filtro = "WHERE categoria = %(categoria)s" if categoria else ""
+            cursor.execute(f"""
+                SELECT embedding::text AS vetor
+                FROM rag_embeddings
+                {filtro}
+                ORDER BY id
+                LIMIT %(limite)s
+            """, {"categoria": categoria, "limite": limite})
+            return np.array([json.loads(row["vetor"]) for row in cursor.fetchall()], dtype=np.float32)
+        finally:
+            cursor.close()
+
+
+def encurtar(vetores: np.ndarray, dimensoes: int) -> np.ndarray:
+    """Trunca e renormaliza, como o parâmetro `dimensions` da API."""
+    curtos = vetores[:, :dimensoes]
+    return curtos / np.linalg.norm(curtos, axis=1, keepdims=True)
+
+
+def top_k(corpus: np.ndarray, consultas: np.ndarray, k: int, excluir: np.ndarray | None) -> np.ndarray:
+    similaridades = consultas @ corpus.T
+    if excluir is not None:
+        similaridades[np.arange(len(consultas)), excluir] = -np.inf
+    melhores = np.argpartition(-similaridades, k, axis=1)[:, :k]
+    ordem = np.argsort(-np.take_along_axis(similaridades, melhores, axis=1), axis=1)
+    return np.take_along_axis(melhores, ordem, axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--categoria", default=None)
+    parser.add_argument("--limite", type=int, default=50_000, help="Trechos carregados do corpus")
+    parser.add_argument("--consultas", type=int, default=200, help="Trechos sorteados como consulta")
+    parser.add_argument("--perguntas", default=None, help="Arquivo com uma pergunta por linha")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dimensoes", type=int, nargs="+", default=list(DIMENSOES_AVALIADAS))
+    args = parser.parse_args()
+
+    corpus = carregar_corpus(args.categoria, args.limite)
+    if len(corpus) <= args.k:
+        raise SystemExit("❌ Corpus pequeno demais para o k pedido")
+    largura = corpus.shape[1]
+
+    if args.perguntas:
+        from src.rag.generate import gerar_embeddings_em_lote
+
+        with open(args.perguntas, encoding="utf-8") as arquivo:
+            perguntas = [linha.strip() for linha in arquivo if linha.strip()]
+        consultas = np.array(gerar_embeddings_em_lote(perguntas), dtype=np.float32)
+        if consultas.shape[1] != largura:
+            raise SystemExit(f"❌ Perguntas com {consultas.shape[1]} dimensões e corpus com {largura}")
+        excluir = None
+    else:
+        rng = np.random.default_rng(42)
+        excluir = rng.choice(len(corpus), size=min(args.consultas, len(corpus)), replace=False)
+        consultas = corpus[excluir]
+
+    referencia = top_k(encurtar(corpus, largura), encurtar(consultas, largura), args.k, excluir)
+
+    print(f"📊 {len(corpus)} trechos de {largura} dimensões, {len(consultas)} consultas, k={args.k}\n")
+    for dimensoes in sorted(args.dimensoes):
+        if dimensoes > largura:
+            print(f"{dimensoes:>6}: ignorada (o corpus tem {largura} dimensões)")
+            continue
+        encontrados = top_k(encurtar(corpus, dimensoes), encurtar(consultas, dimensoes), args.k, excluir)
+        acertos = sum(len(set(a) & set(b)) for a, b in zip(encontrados, referencia))
+        primeiro = np.mean(encontrados[:, 0] == referencia[:, 0])
+        print(
+            f"{dimensoes:>6}: recall@{args.k} {acertos / referencia.size:.3f} | "
+            f"top-1 igual {primeiro:.3f} | {dimensoes * 4 / 1024:.1f} KB por vetor "
+            f"({dimensoes / largura:.0%} do espaço)"
+        )
+
+
+if __name__ == "__main__":
+    main()
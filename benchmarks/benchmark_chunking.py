@@ -0,0 +1,81 @@
+"""
+Compara a divisão em blocos original (que refazia o " ".join da lista de
+palavras a cada palavra) com as estratégias de src.rag.chunking.
+
+Uso:
+    python -m benchmarks.benchmark_chunking --palavras 200000 --tamanho 1500
+"""
+import argparse
+import random
+import time
+
+from src.rag.chunking import ESTRATEGIAS, dividir_em_blocos
+
+
+def dividir_em_blocos_original(texto: str, tamanho: int = 800) -> list[str]:
+    """Implementação que existia em src/rag/insert.py e na página de embeddings."""
+    palavras = texto.split()
+    blocos = []
+    atual = []
+
+    for palavra in palavras:
+        atual.append(palavra)
+        if len(" ".join(atual)) >= tamanho:
+            blocos.append(" ".join(atual))
+            atual = []
+
+    if atual:
+        blocos.append(" ".join(atual))
+
+    return blocos
+
+
+def gerar_texto(palavras: int) -> str:
+    rng = random.Random(42)
+    vocabulario = ["regulamento", "artigo", "aluno", "produto", "prazo", "de", "a", "o", "que", "para"]
+    partes = []
+    for i in range(palavras):
+        partes.append(rng.choice(vocabulario))
+        if i % 15 == 14:
+            partes[-1] += "."
+        if i % 120 == 119:
+            partes[-1] += "\n\n"
+    return " ".join(partes)
+
+
+def medir(funcao, repeticoes: int) -> tuple[float, int]:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        blocos = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return min(tempos), len(blocos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--palavras", type=int, default=100_000)
+    parser.add_argument("--tamanho", type=int, default=800, help="Caracteres (tokens na estratégia tokens)")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    texto = gerar_texto(args.palavras)
+    print(f"Texto: {args.palavras} palavras, {len(texto) / 1024:.0f} KiB, blocos de {args.tamanho}\n")
+
+    casos = {"original": lambda: dividir_em_blocos_original(texto, args.tamanho)}
+    for estrategia in ESTRATEGIAS:
+        tamanho = args.tamanho // 3 if estrategia == "tokens" else args.tamanho
+        casos[estrategia] = lambda e=estrategia, t=tamanho: dividir_em_blocos(texto, t, estrategia=e)
+
+    base = None
+    for nome, funcao in casos.items():
+        segundos, blocos = medir(funcao, args.repeticoes)
+        base = base or segundos
+        print(
+            f"{nome:<12} {segundos * 1000:10.1f} ms {blocos:8d} blocos "
+            f"{args.palavras / segundos:14,.0f} palavras/s {base / segundos:8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compara a gravação linha a linha (INSERT por chunk) com os caminhos em massa
+de src.rag.bulk numa tabela temporária com o mesmo formato de rag_embeddings.
+
+Uso:
+    python -m benchmarks.benchmark_insercao --linhas 100000 --lote 1000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.db.conection import vector_conn
+from src.rag.bulk import inserir_em_massa
+
+TABELA = "bench_rag_embeddings"
+
+
+def gerar_linhas(quantidade: int, dimensoes: int, tamanho_texto: int):
+    rng = np.random.default_rng(42)
+    texto = "x" * tamanho_texto
+    for i in range(quantidade):
+        yield (f"{i} {texto}", "benchmark", rng.random(dimensoes, dtype=np.float32).tolist())
+
+
+def inserir_linha_a_linha(cursor, linhas) -> dict:
+    sql = f"INSERT INTO {TABELA} (content, categoria, embedding) VALUES (%s, %s, %s)"
+    total = 0
+    inicio = time.perf_counter()
+    for linha in linhas:
+        cursor.execute(sql, linha)
+        total += 1
+    segundos = time.perf_counter() - inicio
+    return {"linhas": total, "segundos": segundos, "linhas_por_segundo": total / segundos}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=10_000)
+    parser.add_argument("--lote", type=int, default=1000)
+    parser.add_argument("--dimensoes", type=int, default=1536)
+    parser.add_argument("--tamanho-texto", type=int, default=800)
+    parser.add_argument("--sem-linha-a-linha", action="store_true", help="Pula o caminho atual (lento)")
+    args = parser.parse_args()
+
+    metodos = {
+        "copy": lambda cur, linhas: inserir_em_massa(cur, linhas, metodo="copy", tamanho_lote=args.lote, tabela=TABELA),
+        "values": lambda cur, linhas: inserir_em_massa(cur, linhas, metodo="values", tamanho_lote=args.lote, tabela=TABELA),
+    }
+    if not args.sem_linha_a_linha:
+        metodos["linha a linha"] = inserir_linha_a_linha
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+                CREATE TEMP TABLE {TABELA} (
+                    id bigserial PRIMARY KEY,
+                    content text NOT NULL,
+                    categoria text NOT NULL,
+                    embedding vector({args.dimensoes}) NOT NULL,
+                    created_at timestamptz NOT NULL DEFAULT now()
+                ) ON COMMIT DROP
+            """)
+
+            print(f"📊 {args.linhas} linhas, {args.dimensoes} dimensões, lote de {args.lote}\n")
+            for nome, metodo in metodos.items():
+                cursor.execute(f"TRUNCATE {TABELA}")
+                resultado = metodo(cursor, gerar_linhas(args.linhas, args.dimensoes, args.tamanho_texto))
+                print(
+                    f"{nome:>14}: {resultado['linhas_por_segundo']:>10.0f} linhas/s "
+                    f"({resultado['segundos']:.2f}s)"
+                )
+        finally:
+            conn.rollback()
+            cursor.close()
+
+
+if __name__ == "__main__":
+    main()
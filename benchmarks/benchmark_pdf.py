@@ -0,0 +1,64 @@
+"""
+Compara a extração de texto serial (uma página por vez) com a extração
+paralela por intervalos de páginas de src.pdf.pdf_extractor, num PDF
+sintético gerado com reportlab.
+
+Uso:
+    python -m benchmarks.benchmark_pdf --paginas 300 --processos 4
+"""
+import argparse
+import io
+import os
+import time
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from src.pdf.pdf_extractor import extrair_texto_pdf, extrair_texto_pdf_por_paginas
+
+
+def gerar_pdf(paginas: int, linhas_por_pagina: int = 50) -> bytes:
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    for p in range(paginas):
+        for i in range(linhas_por_pagina):
+            pdf.drawString(40, 800 - 15 * i, f"Página {p + 1}, linha {i + 1}: texto de exemplo para extração " * 2)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def medir(funcao, dados: bytes, paginas: int, processos: int, repeticoes: int) -> dict:
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(io.BytesIO(dados), processos=processos)
+        tempos.append(time.perf_counter() - inicio)
+    segundos = min(tempos)
+    return {"segundos": segundos, "paginas_por_segundo": paginas / segundos}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paginas", type=int, default=300)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    dados = gerar_pdf(args.paginas)
+    print(f"PDF sintético: {args.paginas} páginas, {len(dados) / 1024:.0f} KiB\n")
+
+    casos = [
+        ("extrair_texto_pdf (serial)", extrair_texto_pdf, 1),
+        (f"extrair_texto_pdf ({args.processos} processos)", extrair_texto_pdf, args.processos),
+        ("extrair_texto_pdf_por_paginas (serial)", extrair_texto_pdf_por_paginas, 1),
+        (f"extrair_texto_pdf_por_paginas ({args.processos} processos)", extrair_texto_pdf_por_paginas, args.processos),
+    ]
+
+    for nome, funcao, processos in casos:
+        resultado = medir(funcao, dados, args.paginas, processos, args.repeticoes)
+        print(f"{nome:<50} {resultado['segundos']:8.2f}s {resultado['paginas_por_segundo']:10.1f} páginas/s")
+
+
+if __name__ == "__main__":
+    main()
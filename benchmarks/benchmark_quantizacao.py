@@ -0,0 +1,139 @@
+"""
+Compara a busca com índice HNSW em precisão completa (vector), meia precisão
+(halfvec) e quantização binária (bit), as duas últimas com reordenação exata
+dos candidatos. Para cada precisão mostra o tamanho do índice, a latência
+p50/p99 e o recall@k em relação à busca exata (varredura sem índice).
+
+Roda numa tabela temporária que sombreia rag_embeddings, com vetores
+sintéticos agrupados ou com uma cópia dos vetores reais (--dados banco).
+
+Uso:
+    python -m benchmarks.benchmark_quantizacao --linhas 50000 --consultas 200
+    python -m benchmarks.benchmark_quantizacao --dados banco --k 5 --candidatos 80
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src.db.conection import vector_conn
+from src.db.schema import PRECISOES, expressao_indice
+from src.rag.bulk import inserir_em_massa, literal_vetor
+from src.rag.get import montar_sql_busca, numero_candidatos, parametros_indice
+
+
+def vetores_sinteticos(quantidade: int, dimensoes: int, grupos: int, rng) -> np.ndarray:
+    """Vetores normalizados em torno de `grupos` centros, como embeddings de assuntos distintos."""
+    centros = rng.standard_normal((grupos, dimensoes), dtype=np.float32)
+    vetores = centros[rng.integers(0, grupos, quantidade)]
+    vetores += 0.6 * rng.standard_normal((quantidade, dimensoes), dtype=np.float32)
+    return vetores / np.linalg.norm(vetores, axis=1, keepdims=True)
+
+
+def criar_tabela(cursor, args, rng) -> tuple[int, list[str]]:
+    """Cria a tabela temporária e devolve (dimensões, consultas)."""
+    if args.dados == "banco":
+        cursor.execute("""
+            CREATE TEMP TABLE rag_embeddings ON COMMIT DROP AS
+            SELECT id, content, categoria, embedding FROM public.rag_embeddings LIMIT %s
+        """, (args.linhas,))
+        cursor.execute("SELECT vector_dims(embedding) AS dimensoes FROM rag_embeddings LIMIT 1")
+        row = cursor.fetchone()
+        if row is None:
+            raise SystemExit("❌ rag_embeddings está vazia")
+        # As consultas são vetores do próprio corpus
+        cursor.execute("SELECT embedding::text AS vetor FROM rag_embeddings ORDER BY random() LIMIT %s", (args.consultas,))
+        return row["dimensoes"], [r["vetor"] for r in cursor.fetchall()]
+
+    cursor.execute(f"""
+        CREATE TEMP TABLE rag_embeddings (
+            id bigserial PRIMARY KEY,
+            content text NOT NULL,
+            categoria text NOT NULL,
+            embedding vector({args.dimensoes}) NOT NULL
+        ) ON COMMIT DROP
+    """)
+    vetores = vetores_sinteticos(args.linhas + args.consultas, args.dimensoes, args.grupos, rng)
+    inserir_em_massa(
+        cursor,
+        ((f"texto {i}", "benchmark", vetor.tolist()) for i, vetor in enumerate(vetores[:args.linhas])),
+        metodo="copy",
+    )
+    return args.dimensoes, [literal_vetor(vetor.tolist()) for vetor in vetores[args.linhas:]]
+
+
+def buscar(cursor, vetor: str, precisao: str, dimensoes: int, k: int, candidatos: int | None) -> tuple[list[str], float]:
+    candidatos = numero_candidatos(k, precisao, candidatos)
+    prefixo, parametros = parametros_indice(ef_search=max(candidatos, 40))
+    inicio = time.perf_counter()
+    cursor.execute(prefixo + montar_sql_busca(None, precisao, dimensoes), {
+        **parametros,
+        "vetor": vetor,
+        "limite": k,
+        "candidatos": candidatos,
+        "distancia_maxima": 2,
+    })
+    conteudos = [row["content"] for row in cursor.fetchall()]
+    return conteudos, (time.perf_counter() - inicio) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dados", choices=("sinteticos", "banco"), default="sinteticos")
+    parser.add_argument("--linhas", type=int, default=20_000)
+    parser.add_argument("--dimensoes", type=int, default=1536)
+    parser.add_argument("--grupos", type=int, default=200, help="Centros dos vetores sintéticos")
+    parser.add_argument("--consultas", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--candidatos", type=int, default=None, help="Padrão: numero_candidatos de src.rag.get")
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            dimensoes, consultas = criar_tabela(cursor, args, rng)
+
+            # Referência: busca exata, sem índice
+            cursor.execute("SELECT set_config('enable_indexscan', 'off', true)")
+            exatos = [buscar(cursor, vetor, "vector", dimensoes, args.k, args.k)[0] for vetor in consultas]
+            cursor.execute("SELECT set_config('enable_indexscan', 'on', true)")
+
+            print(f"📊 {args.linhas} linhas ({args.dados}), {dimensoes} dimensões, {len(consultas)} consultas, k={args.k}\n")
+            for precisao in PRECISOES:
+                nome = f"bench_idx_{precisao}"
+                expressao, operadores = expressao_indice(precisao, dimensoes)
+                inicio = time.perf_counter()
+                cursor.execute(f"""
+                    CREATE INDEX {nome} ON rag_embeddings USING hnsw ({expressao} {operadores})
+                    WITH (m = {args.m}, ef_construction = {args.ef_construction})
+                """)
+                construcao = time.perf_counter() - inicio
+                cursor.execute("ANALYZE rag_embeddings")
+                cursor.execute("SELECT pg_relation_size(%s::regclass) AS bytes", (nome,))
+                tamanho = cursor.fetchone()["bytes"]
+
+                latencias = []
+                acertos = 0
+                for vetor, esperados in zip(consultas, exatos):
+                    encontrados, ms = buscar(cursor, vetor, precisao, dimensoes, args.k, args.candidatos)
+                    latencias.append(ms)
+                    acertos += len(set(encontrados) & set(esperados))
+
+                print(
+                    f"{precisao:>8}: índice {tamanho / 1024 ** 2:>8.1f} MB (construído em {construcao:.1f}s) | "
+                    f"p50 {np.percentile(latencias, 50):>6.2f} ms | p99 {np.percentile(latencias, 99):>6.2f} ms | "
+                    f"recall@{args.k} {acertos / (args.k * len(consultas)):.3f}"
+                )
+                # Um índice por vez: cada consulta só pode usar o da sua precisão
+                cursor.execute(f"DROP INDEX {nome}")
+        finally:
+            conn.rollback()
+            cursor.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,26 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Imports das funções
-from src.rag.generate import gerar_embedding
-from src.pdf.pdf_extractor import extrair_texto_pdf, obter_info_pdf
+from src.pdf.pdf_extractor import obter_info_pdf
+from src.rag.chunking import ESTRATEGIAS
+from src.rag.jobs import cancelar_job, enfileirar_job, listar_jobs
 from src.rag.crud import (
     listar_embeddings,
+    listar_embeddings_pagina,
+    obter_embedding_por_id,
     contar_embeddings,
     listar_categorias,
-    deletar_embedding_por_id,
-    deletar_embeddings_por_categoria,
+    deletar_embeddings_por_documento,
+    deletar_embeddings_por_ids,
+    deletar_embeddings_por_periodo,
+    listar_documentos,
+    listar_dimensoes,
+    listar_estatisticas_categorias,
     obter_estatisticas
 )
-from src.db.conection import get_vector_conn
+from src.rag.generate import DIMENSOES_EMBEDDING
 
 
 # ============================
@@ -33,57 +40,128 @@ st.markdown("---")
 # FUNÇÕES AUXILIARES
 # ============================
 
-def dividir_em_blocos(texto: str, tamanho: int = 800) -> list[str]:
-    """Divide texto em blocos menores."""
-    palavras = texto.split()
-    blocos = []
-    atual = []
+def opcoes_divisao(chave: str) -> dict:
+    """Controles de divisão em blocos; devolve os argumentos de iterar_blocos."""
+    nomes = {
+        "palavras": "Palavras",
+        "sentencas": "Sentenças",
+        "paragrafos": "Parágrafos",
+        "tokens": "Tokens (orçamento aproximado)",
+    }
+    estrategia = st.selectbox(
+        "Estratégia de divisão",
+        ESTRATEGIAS,
+        format_func=nomes.get,
+        key=f"estrategia_{chave}",
+        help="Sentenças e parágrafos não cortam o texto no meio de uma frase"
+    )
 
-    for palavra in palavras:
-        atual.append(palavra)
-        if len(" ".join(atual)) >= tamanho:
-            blocos.append(" ".join(atual))
-            atual = []
+    if estrategia == "tokens":
+        tamanho = st.slider(
+            "Tamanho do bloco (tokens)",
+            min_value=100,
+            max_value=1000,
+            value=250,
+            step=50,
+            key=f"tamanho_{chave}",
+            help="Quanto maior o bloco, mais contexto por embedding"
+        )
+    else:
+        tamanho = st.slider(
+            "Tamanho do bloco (caracteres)",
+            min_value=400,
+            max_value=1500,
+            value=800,
+            step=100,
+            key=f"tamanho_{chave}",
+            help="Quanto maior o bloco, mais contexto por embedding"
+        )
 
-    if atual:
-        blocos.append(" ".join(atual))
+    sobreposicao = st.slider(
+        "Sobreposição entre blocos (%)",
+        min_value=0,
+        max_value=50,
+        value=0,
+        step=5,
+        key=f"sobreposicao_{chave}",
+        help="Repete o final de um bloco no início do próximo"
+    )
 
-    return blocos
+    return {
+        "tamanho": tamanho,
+        "sobreposicao": tamanho * sobreposicao // 100,
+        "estrategia": estrategia,
+    }
 
 
-def inserir_embeddings_no_banco(textos: list[str], categoria: str) -> tuple[bool, str]:
-    """Insere embeddings no banco de dados."""
-    conn = get_vector_conn()
-    cursor = conn.cursor()
+def descrever_resultado(resultado: dict) -> str:
+    """Resumo do resultado de um job de ingestão ou de exclusão."""
+    if "removidos" in resultado:
+        descricao = f"{resultado['removidos']} trechos removidos em {resultado['lotes']} lotes ({resultado['segundos']:.1f}s)."
+        if resultado.get("indices_reconstruidos"):
+            descricao += f" Índices reconstruídos: {', '.join(resultado['indices_reconstruidos'])}."
+        return descricao
+    if "paginas_alteradas" in resultado:
+        return (
+            f"{resultado['paginas_alteradas']} páginas novas ou alteradas, "
+            f"{resultado['paginas_inalteradas']} inalteradas e "
+            f"{resultado['paginas_removidas']} removidas. "
+            f"{resultado['linhas']} embeddings novos inseridos, "
+            f"{resultado['reaproveitados']} reaproveitados e "
+            f"{resultado['trechos_removidos']} trechos antigos removidos."
+        )
+    return (
+        f"{resultado['linhas']} embeddings novos inseridos, "
+        f"{resultado['reaproveitados']} blocos já existiam e foram reaproveitados "
+        f"({resultado['linhas_por_segundo']:.0f} embeddings gravados/s)"
+    )
 
-    sql = """
-        INSERT INTO rag_embeddings (content, categoria, embedding)
-        VALUES (%s, %s, %s)
-    """
 
-    try:
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        for i, texto in enumerate(textos, 1):
-            status_text.text(f"⏳ Processando bloco {i}/{len(textos)}...")
-            embedding = gerar_embedding(texto)
-            cursor.execute(sql, (texto, categoria, embedding))
-            progress_bar.progress(i / len(textos))
-
-        conn.commit()
-        progress_bar.empty()
-        status_text.empty()
-        
-        return True, f"✅ {len(textos)} embeddings inseridos com sucesso!"
+@st.fragment(run_every=2)
+def painel_jobs(chave: str, tipos: tuple[str, ...]):
+    """Status dos processamentos na fila, atualizado a cada 2 segundos."""
+    st.subheader("📋 Processamentos")
+
+    jobs = listar_jobs(limite=10, tipos=tipos)
+    if not jobs:
+        st.caption("Nenhum processamento enviado ainda.")
+        return
 
-    except Exception as e:
-        conn.rollback()
-        return False, f"❌ Erro ao inserir embeddings: {e}"
+    icones = {"pendente": "🕒", "processando": "⏳", "concluido": "✅", "erro": "❌", "cancelado": "🚫"}
+
+    for job in jobs:
+        if job["tipo"] == "exclusao_categoria":
+            origem = "Exclusão"
+        else:
+            origem = job["arquivo"] or "Texto manual"
+        titulo = f"{icones[job['status']]} #{job['id']} · {origem} · categoria **{job['categoria']}**"
+
+        with st.container(border=True):
+            st.markdown(titulo)
+
+            if job["status"] == "pendente" and job["erro"]:
+                st.caption(f"Nova tentativa agendada após erro: {job['erro']}")
+            elif job["status"] == "pendente":
+                st.caption("Aguardando um worker disponível...")
+            elif job["status"] == "processando":
+                if job["total"]:
+                    st.progress(min(job["progresso"] / job["total"], 1.0))
+                if job["cancelamento_solicitado"]:
+                    st.caption("Cancelando...")
+                else:
+                    st.caption(job["mensagem"] or "Iniciando...")
+            elif job["status"] == "concluido":
+                st.caption(descrever_resultado(job["resultado"] or {}))
+            elif job["status"] == "cancelado":
+                resultado = job["resultado"] or {}
+                st.caption(f"Cancelado. {descrever_resultado(resultado) if resultado else ''}")
+            else:
+                st.error(f"Erro: {job['erro']}")
 
-    finally:
-        cursor.close()
-        conn.close()
+            if job["status"] in ("pendente", "processando") and not job["cancelamento_solicitado"]:
+                if st.button("Cancelar", key=f"cancelar_{chave}_{job['id']}"):
+                    cancelar_job(job["id"])
+                    st.rerun(scope="fragment")
 
 
 # ============================
@@ -139,14 +217,7 @@ with tab1:
                             st.text(f"{key}: {value}")
             
             # Configurações de processamento
-            tamanho_bloco = st.slider(
-                "Tamanho do bloco (caracteres)",
-                min_value=400,
-                max_value=1500,
-                value=800,
-                step=100,
-                help="Quanto maior o bloco, mais contexto por embedding"
-            )
+            divisao = opcoes_divisao("pdf")
             
             # Botão de processar
             if st.button("🚀 Processar PDF e Gerar Embeddings", type="primary"):
@@ -154,27 +225,19 @@ with tab1:
                     st.error("⚠️ Por favor, preencha a categoria!")
                 else:
                     try:
-                        with st.spinner("Extraindo texto do PDF..."):
-                            uploaded_file.seek(0)  # Reset do ponteiro
-                            texto = extrair_texto_pdf(uploaded_file)
-                        
-                        st.info(f"📝 Texto extraído: {len(texto)} caracteres")
-                        
-                        # Divide em blocos
-                        blocos = dividir_em_blocos(texto, tamanho=tamanho_bloco)
-                        st.info(f"📦 Total de blocos gerados: {len(blocos)}")
-                        
-                        # Insere no banco
-                        sucesso, mensagem = inserir_embeddings_no_banco(blocos, categoria_input)
-                        
-                        if sucesso:
-                            st.success(mensagem)
-                            st.balloons()
-                        else:
-                            st.error(mensagem)
+                        # O processamento roda num worker (python -m src.worker):
+                        # fechar a aba ou recarregar a página não interrompe o job
+                        job_id = enfileirar_job(
+                            "pdf",
+                            categoria_input,
+                            uploaded_file.getvalue(),
+                            arquivo=uploaded_file.name,
+                            parametros={"divisao": divisao},
+                        )
+                        st.success(f"✅ PDF enviado para processamento (job #{job_id})")
                     
                     except Exception as e:
-                        st.error(f"❌ Erro ao processar PDF: {e}")
+                        st.error(f"❌ Erro ao enviar PDF para processamento: {e}")
     
     # Texto Manual
     else:
@@ -186,14 +249,7 @@ with tab1:
         )
         
         # Configurações de processamento
-        tamanho_bloco = st.slider(
-            "Tamanho do bloco (caracteres)",
-            min_value=400,
-            max_value=1500,
-            value=800,
-            step=100,
-            help="Quanto maior o bloco, mais contexto por embedding"
-        )
+        divisao = opcoes_divisao("texto")
         
         # Botão de processar
         if st.button("🚀 Gerar Embeddings do Texto", type="primary"):
@@ -205,21 +261,19 @@ with tab1:
                 try:
                     st.info(f"📝 Texto digitado: {len(texto_manual)} caracteres")
                     
-                    # Divide em blocos
-                    blocos = dividir_em_blocos(texto_manual, tamanho=tamanho_bloco)
-                    st.info(f"📦 Total de blocos gerados: {len(blocos)}")
-                    
-                    # Insere no banco
-                    sucesso, mensagem = inserir_embeddings_no_banco(blocos, categoria_input)
-                    
-                    if sucesso:
-                        st.success(mensagem)
-                        st.balloons()
-                    else:
-                        st.error(mensagem)
+                    job_id = enfileirar_job(
+                        "texto",
+                        categoria_input,
+                        texto_manual.encode("utf-8"),
+                        parametros={"divisao": divisao},
+                    )
+                    st.success(f"✅ Texto enviado para processamento (job #{job_id})")
                 
                 except Exception as e:
-                    st.error(f"❌ Erro ao processar texto: {e}")
+                    st.error(f"❌ Erro ao enviar texto para processamento: {e}")
+
+    st.markdown("---")
+    painel_jobs("adicionar", ("pdf", "texto"))
 
 
 # ============================
@@ -252,6 +306,28 @@ with tab2:
             st.metric("Último Registro", stats["ultimo_registro"].strftime("%d/%m/%Y"))
         else:
             st.metric("Último Registro", "N/A")
+
+    with st.expander("📂 Trechos por Categoria"):
+        por_categoria = listar_estatisticas_categorias()
+        if por_categoria:
+            df_categorias = pd.DataFrame(por_categoria)
+            df_categorias.columns = ["Categoria", "Trechos", "Primeiro Registro", "Último Registro"]
+            st.dataframe(df_categorias, width='stretch', hide_index=True)
+        else:
+            st.info("ℹ️ Nenhuma categoria cadastrada.")
+
+    dimensoes = listar_dimensoes()
+    dimensao_configurada = DIMENSOES_EMBEDDING or 1536
+    if len(dimensoes) > 1:
+        st.warning(
+            f"⚠️ O corpus mistura vetores de {', '.join(map(str, dimensoes))} dimensões; "
+            "buscas só comparam vetores da mesma largura. Reprocesse os embeddings antigos."
+        )
+    elif dimensoes and dimensoes[0] != dimensao_configurada:
+        st.warning(
+            f"⚠️ O corpus tem vetores de {dimensoes[0]} dimensões, mas EMBEDDING_DIMENSOES "
+            f"pede {dimensao_configurada}."
+        )
     
     st.markdown("---")
     
@@ -269,16 +345,27 @@ with tab2:
         )
     
     with col2:
-        limite_registros = st.number_input(
-            "Limite de Registros",
+        registros_por_pagina = st.number_input(
+            "Registros por Página",
             min_value=10,
             max_value=500,
             value=100,
             step=10
         )
     
+    categoria_selecionada = None if categoria_filtro == "Todas" else categoria_filtro
+
+    # Cursores (created_at, id) do início de cada página visitada; mudar o
+    # filtro ou o tamanho da página volta para a primeira
+    filtro_atual = (categoria_selecionada, registros_por_pagina)
+    if st.session_state.get("paginacao_filtro") != filtro_atual:
+        st.session_state.paginacao_filtro = filtro_atual
+        st.session_state.paginacao_cursores = [None]
+    cursores = st.session_state.paginacao_cursores
+
     # Botão de atualizar
     if st.button("🔄 Atualizar Listagem"):
+        st.session_state.paginacao_cursores = [None]
         st.rerun()
     
     st.markdown("---")
@@ -286,8 +373,24 @@ with tab2:
     # Listagem de embeddings
     st.subheader("📋 Embeddings Cadastrados")
     
-    categoria_selecionada = None if categoria_filtro == "Todas" else categoria_filtro
-    embeddings = listar_embeddings(categoria=categoria_selecionada, limite=limite_registros)
+    pagina = listar_embeddings_pagina(
+        categoria=categoria_selecionada,
+        tamanho=registros_por_pagina,
+        apos=cursores[-1]
+    )
+    embeddings = pagina["itens"]
+
+    col_anterior, col_pagina, col_proxima = st.columns([1, 2, 1])
+    with col_anterior:
+        if st.button("⬅️ Anterior", disabled=len(cursores) == 1, width="stretch"):
+            cursores.pop()
+            st.rerun()
+    with col_pagina:
+        st.markdown(f"<div style='text-align: center'>Página {len(cursores)}</div>", unsafe_allow_html=True)
+    with col_proxima:
+        if st.button("Próxima ➡️", disabled=pagina["proximo"] is None, width="stretch"):
+            cursores.append(pagina["proximo"])
+            st.rerun()
     
     if embeddings:
         # Converte para DataFrame
@@ -296,11 +399,8 @@ with tab2:
         # Formata a coluna de data
         df["created_at"] = pd.to_datetime(df["created_at"]).dt.strftime("%d/%m/%Y %H:%M")
         
-        # Trunca o conteúdo para exibição
-        df["preview"] = df["content"].str[:100] + "..."
-        
-        # Reordena colunas
-        df_display = df[["id", "categoria", "preview", "created_at"]]
+        # Reordena colunas (a prévia já vem cortada do banco)
+        df_display = df[["id", "categoria", "previa", "created_at"]]
         df_display.columns = ["ID", "Categoria", "Prévia do Conteúdo", "Data de Criação"]
         
         # Exibe tabela
@@ -310,14 +410,16 @@ with tab2:
             hide_index=True
         )
         
-        # Detalhes expandíveis
+        # Detalhes expandíveis: o conteúdo completo só é buscado após escolher o ID
         with st.expander("🔍 Ver Conteúdo Completo de um Embedding"):
             id_selecionado = st.selectbox(
                 "Selecione o ID do embedding:",
-                options=df["id"].tolist()
+                options=df["id"].tolist(),
+                index=None,
+                placeholder="Escolha um ID"
             )
             
-            embedding_selecionado = next((e for e in embeddings if e["id"] == id_selecionado), None)
+            embedding_selecionado = obter_embedding_por_id(id_selecionado) if id_selecionado is not None else None
             
             if embedding_selecionado:
                 st.markdown(f"**Categoria:** {embedding_selecionado['categoria']}")
@@ -336,13 +438,17 @@ with tab3:
     st.header("Gerenciamento de Embeddings")
     
     st.warning("⚠️ **Atenção:** As operações de exclusão são permanentes e não podem ser desfeitas!")
+
+    # Guardada antes do st.rerun() que atualiza as listas, exibida uma vez aqui
+    if mensagem_exclusao := st.session_state.pop("mensagem_exclusao", None):
+        st.success(mensagem_exclusao)
     
     st.markdown("---")
     
     # Opção de gerenciamento
     opcao_gerenciamento = st.radio(
         "Escolha o tipo de exclusão:",
-        ["🗑️ Deletar por ID", "🗂️ Deletar por Categoria"],
+        ["🗑️ Deletar por ID", "📅 Deletar por Período", "📄 Deletar por Documento", "🗂️ Deletar por Categoria"],
         horizontal=True
     )
     
@@ -350,53 +456,127 @@ with tab3:
     
     # Deletar por ID
     if opcao_gerenciamento == "🗑️ Deletar por ID":
-        st.subheader("Deletar Embedding Específico")
+        st.subheader("Deletar Embeddings Selecionados")
         
         embeddings_list = listar_embeddings(limite=500)
         
         if embeddings_list:
-            # Cria opções para o selectbox
-            opcoes_embeddings = [
-                f"ID: {e['id']} | {e['categoria']} | {e['content'][:50]}..."
-                for e in embeddings_list
-            ]
-            
-            embedding_selecionado = st.selectbox(
-                "Selecione o embedding para deletar:",
-                options=opcoes_embeddings,
-                index=0
+            # Rótulos montados com a prévia; os IDs vêm direto das opções escolhidas
+            previas = {e["id"]: e for e in embeddings_list}
+            ids_para_deletar = st.multiselect(
+                "Selecione os embeddings para deletar:",
+                options=list(previas),
+                format_func=lambda i: f"ID: {i} | {previas[i]['categoria']} | {previas[i]['previa'][:50]}...",
+                placeholder="Escolha um ou mais embeddings"
             )
             
-            # Extrai o ID (pode ser UUID ou INT)
-            id_para_deletar = embedding_selecionado.split(" | ")[0].replace("ID: ", "").strip()
-            
-            # Preview do que será deletado
-            embedding_preview = next((e for e in embeddings_list if e["id"] == id_para_deletar), None)
-            
-            if embedding_preview:
-                with st.expander("👁️ Preview do Embedding"):
-                    st.markdown(f"**ID:** {embedding_preview['id']}")
-                    st.markdown(f"**Categoria:** {embedding_preview['categoria']}")
-                    st.markdown(f"**Data:** {embedding_preview['created_at']}")
-                    st.text_area("Conteúdo completo:", embedding_preview["content"], height=150, disabled=True, label_visibility="visible")
+            # Preview do que será deletado (conteúdo completo só ao abrir)
+            if ids_para_deletar:
+                with st.expander(f"👁️ Preview dos {len(ids_para_deletar)} Embeddings"):
+                    df_selecionados = pd.DataFrame([previas[i] for i in ids_para_deletar])
+                    df_selecionados = df_selecionados[["id", "categoria", "previa", "created_at"]]
+                    df_selecionados.columns = ["ID", "Categoria", "Prévia do Conteúdo", "Data de Criação"]
+                    st.dataframe(df_selecionados, width='stretch', hide_index=True)
+
+                    if len(ids_para_deletar) == 1 and st.toggle("Carregar conteúdo completo"):
+                        embedding_preview = obter_embedding_por_id(ids_para_deletar[0])
+                        if embedding_preview:
+                            st.text_area("Conteúdo completo:", embedding_preview["content"], height=150, disabled=True, label_visibility="visible")
             
             # Confirmação e botão de deletar
             col1, col2 = st.columns([3, 1])
             
             with col1:
-                confirmar = st.checkbox("✅ Confirmo que quero deletar este embedding")
+                confirmar = st.checkbox(f"✅ Confirmo que quero deletar {len(ids_para_deletar)} embedding(s)")
             
             with col2:
-                if st.button("🗑️ Deletar", type="primary", disabled=not confirmar):
-                    if deletar_embedding_por_id(id_para_deletar):
-                        st.success(f"✅ Embedding ID {id_para_deletar} deletado com sucesso!")
+                if st.button("🗑️ Deletar", type="primary", disabled=not (confirmar and ids_para_deletar)):
+                    num_deletados = deletar_embeddings_por_ids(ids_para_deletar)
+                    if num_deletados > 0:
+                        st.session_state.mensagem_exclusao = f"✅ {num_deletados} embedding(s) deletado(s) com sucesso!"
                         st.rerun()
                     else:
-                        st.error("❌ Erro ao deletar embedding.")
+                        st.error("❌ Erro ao deletar embeddings.")
         
         else:
             st.info("ℹ️ Nenhum embedding disponível para deletar.")
     
+    # Deletar por Período
+    elif opcao_gerenciamento == "📅 Deletar por Período":
+        st.subheader("Deletar Embeddings Criados num Período")
+
+        col1, col2 = st.columns([2, 1])
+
+        with col1:
+            periodo = st.date_input(
+                "Período (datas inclusivas)",
+                value=(datetime.now().date(), datetime.now().date()),
+                format="DD/MM/YYYY"
+            )
+
+        with col2:
+            categoria_periodo = st.selectbox(
+                "Categoria",
+                options=["Todas"] + listar_categorias(),
+                key="categoria_periodo"
+            )
+
+        if isinstance(periodo, (tuple, list)) and len(periodo) == 2:
+            inicio_periodo, fim_periodo = periodo
+            categoria_periodo = None if categoria_periodo == "Todas" else categoria_periodo
+
+            col1, col2 = st.columns([3, 1])
+
+            with col1:
+                confirmar_periodo = st.checkbox(
+                    f"✅ Confirmo que quero deletar os embeddings de {inicio_periodo:%d/%m/%Y} a {fim_periodo:%d/%m/%Y}"
+                    + (f" da categoria '{categoria_periodo}'" if categoria_periodo else "")
+                )
+
+            with col2:
+                if st.button("🗑️ Deletar Período", type="primary", disabled=not confirmar_periodo):
+                    num_deletados = deletar_embeddings_por_periodo(
+                        inicio_periodo,
+                        fim_periodo + timedelta(days=1),
+                        categoria_periodo
+                    )
+                    if num_deletados > 0:
+                        st.session_state.mensagem_exclusao = f"✅ {num_deletados} embeddings deletados!"
+                        st.rerun()
+                    else:
+                        st.info("ℹ️ Nenhum embedding encontrado no período.")
+        else:
+            st.info("ℹ️ Selecione a data inicial e a final.")
+
+    # Deletar por Documento
+    elif opcao_gerenciamento == "📄 Deletar por Documento":
+        st.subheader("Deletar os Embeddings de um Documento")
+
+        documentos = listar_documentos()
+
+        if documentos:
+            documento = st.selectbox(
+                "Selecione o documento:",
+                options=documentos,
+                format_func=lambda d: f"{d['arquivo']} | {d['categoria']} | {d['total_paginas'] or 0} páginas"
+            )
+
+            col1, col2 = st.columns([3, 1])
+
+            with col1:
+                confirmar_documento = st.checkbox(f"✅ Confirmo que quero deletar todos os embeddings de '{documento['arquivo']}'")
+
+            with col2:
+                if st.button("🗑️ Deletar Documento", type="primary", disabled=not confirmar_documento):
+                    num_deletados = deletar_embeddings_por_documento(documento["id"])
+                    st.session_state.mensagem_exclusao = (
+                        f"✅ Documento '{documento['arquivo']}' removido ({num_deletados} embeddings)."
+                    )
+                    st.rerun()
+
+        else:
+            st.info("ℹ️ Nenhum documento registrado (PDFs enviados pela aba Adicionar).")
+    
     # Deletar por Categoria
     else:
         st.subheader("Deletar Todos os Embeddings de uma Categoria")
@@ -412,6 +592,13 @@ with tab3:
             # Mostra quantidade de embeddings na categoria
             total_categoria = contar_embeddings(categoria=categoria_deletar)
             st.warning(f"⚠️ Serão deletados **{total_categoria} embeddings** da categoria **{categoria_deletar}**")
+
+            manutencao = st.radio(
+                "Manutenção após a exclusão:",
+                ["Nenhuma", "VACUUM", "VACUUM + REINDEX"],
+                horizontal=True,
+                help="Libera o espaço das linhas apagadas; o REINDEX reconstrói os índices vetoriais sem bloquear as buscas"
+            )
             
             # Confirmação e botão de deletar
             col1, col2 = st.columns([3, 1])
@@ -421,16 +608,20 @@ with tab3:
             
             with col2:
                 if st.button("🗑️ Deletar Categoria", type="primary", disabled=not confirmar_categoria):
-                    num_deletados = deletar_embeddings_por_categoria(categoria_deletar)
-                    if num_deletados > 0:
-                        st.success(f"✅ {num_deletados} embeddings da categoria '{categoria_deletar}' foram deletados!")
-                        st.rerun()
-                    else:
-                        st.error("❌ Erro ao deletar embeddings.")
+                    # A exclusão roda em lotes num worker; o progresso aparece abaixo
+                    job_id = enfileirar_job(
+                        "exclusao_categoria",
+                        categoria_deletar,
+                        b"",
+                        parametros={"manutencao": {"Nenhuma": None, "VACUUM": "vacuum", "VACUUM + REINDEX": "reindex"}[manutencao]}
+                    )
+                    st.success(f"✅ Exclusão da categoria '{categoria_deletar}' enviada (job #{job_id}).")
         
         else:
             st.info("ℹ️ Nenhuma categoria disponível para deletar.")
 
+        painel_jobs("gerenciar", ("exclusao_categoria",))
+
 
 # ============================
 # FOOTER
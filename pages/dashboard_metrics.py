@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from src.db.conection import get_vector_conn
+from src.db.conection import vector_conn
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from src.pdf.metrics_pdf import create_pdf_report
@@ -50,134 +50,130 @@ st.markdown("""
 @st.cache_data(ttl=300)  # Cache por 5 minutos
 def get_general_stats():
     """Retorna estatísticas gerais do sistema"""
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    stats = {}
-    
-    # Total de sessões únicas
-    cursor.execute("SELECT COUNT(DISTINCT session_id) as total FROM chat_ia")
-    stats['total_sessions'] = cursor.fetchone()['total']
-    
-    # Total de mensagens
-    cursor.execute("SELECT COUNT(*) as total FROM chat_ia")
-    stats['total_messages'] = cursor.fetchone()['total']
-    
-    # Total de usuários únicos
-    cursor.execute("SELECT COUNT(*) as total FROM users")
-    stats['total_users'] = cursor.fetchone()['total']
-    
-    # Total de agendamentos
-    cursor.execute("SELECT COUNT(*) as total FROM calendar_events")
-    stats['total_events'] = cursor.fetchone()['total']
-    
-    # Mensagens nas últimas 24h
-    cursor.execute("""
-        SELECT COUNT(*) as total 
-        FROM chat_ia 
-        WHERE created_at >= NOW() - INTERVAL '24 hours'
-    """)
-    stats['messages_24h'] = cursor.fetchone()['total']
-    
-    # Sessões ativas (últimas 24h)
-    cursor.execute("""
-        SELECT COUNT(DISTINCT session_id) as total 
-        FROM chat_ia 
-        WHERE created_at >= NOW() - INTERVAL '24 hours'
-    """)
-    stats['active_sessions_24h'] = cursor.fetchone()['total']
-    
-    # Agendamentos nas últimas 24h
-    cursor.execute("""
-        SELECT COUNT(*) as total 
-        FROM calendar_events 
-        WHERE created_at >= NOW() - INTERVAL '24 hours'
-    """)
-    stats['events_24h'] = cursor.fetchone()['total']
-    
-    # Média de mensagens por sessão
-    cursor.execute("""
-        SELECT AVG(msg_count) as avg_messages
-        FROM (
-            SELECT session_id, COUNT(*) as msg_count
-            FROM chat_ia
-            GROUP BY session_id
-        ) as session_counts
-    """)
-    result = cursor.fetchone()
-    stats['avg_messages_per_session'] = float(result['avg_messages']) if result['avg_messages'] else 0
-    
-    cursor.close()
-    conn.close()
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        
+        stats = {}
+        
+        # Total de sessões únicas
+        cursor.execute("SELECT COUNT(DISTINCT session_id) as total FROM chat_ia")
+        stats['total_sessions'] = cursor.fetchone()['total']
+        
+        # Total de mensagens
+        cursor.execute("SELECT COUNT(*) as total FROM chat_ia")
+        stats['total_messages'] = cursor.fetchone()['total']
+        
+        # Total de usuários únicos
+        cursor.execute("SELECT COUNT(*) as total FROM users")
+        stats['total_users'] = cursor.fetchone()['total']
+        
+        # Total de agendamentos
+        cursor.execute("SELECT COUNT(*) as total FROM calendar_events")
+        stats['total_events'] = cursor.fetchone()['total']
+        
+        # Mensagens nas últimas 24h
+        cursor.execute("""
+            SELECT COUNT(*) as total 
+            FROM chat_ia 
+            WHERE created_at >= NOW() - INTERVAL '24 hours'
+        """)
+        stats['messages_24h'] = cursor.fetchone()['total']
+        
+        # Sessões ativas (últimas 24h)
+        cursor.execute("""
+            SELECT COUNT(DISTINCT session_id) as total 
+            FROM chat_ia 
+            WHERE created_at >= NOW() - INTERVAL '24 hours'
+        """)
+        stats['active_sessions_24h'] = cursor.fetchone()['total']
+        
+        # Agendamentos nas últimas 24h
+        cursor.execute("""
+            SELECT COUNT(*) as total 
+            FROM calendar_events 
+            WHERE created_at >= NOW() - INTERVAL '24 hours'
+        """)
+        stats['events_24h'] = cursor.fetchone()['total']
+        
+        # Média de mensagens por sessão
+        cursor.execute("""
+            SELECT AVG(msg_count) as avg_messages
+            FROM (
+                SELECT session_id, COUNT(*) as msg_count
+                FROM chat_ia
+                GROUP BY session_id
+            ) as session_counts
+        """)
+        result = cursor.fetchone()
+        stats['avg_messages_per_session'] = float(result['avg_messages']) if result['avg_messages'] else 0
+        
+        cursor.close()
     
     return stats
 
 @st.cache_data(ttl=300)
 def get_messages_over_time(days=30):
     """Retorna mensagens ao longo do tempo"""
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            DATE(created_at) as data,
-            COUNT(*) as total_mensagens,
-            COUNT(DISTINCT session_id) as sessoes_unicas
-        FROM chat_ia
-        WHERE created_at >= NOW() - INTERVAL '%s days'
-        GROUP BY DATE(created_at)
-        ORDER BY data
-    """ % days)
-    
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT 
+                DATE(created_at) as data,
+                COUNT(*) as total_mensagens,
+                COUNT(DISTINCT session_id) as sessoes_unicas
+            FROM chat_ia
+            WHERE created_at >= NOW() - INTERVAL '%s days'
+            GROUP BY DATE(created_at)
+            ORDER BY data
+        """ % days)
+        
+        results = cursor.fetchall()
+        cursor.close()
     
     return pd.DataFrame(results) if results else pd.DataFrame()
 
 @st.cache_data(ttl=300)
 def get_hourly_distribution():
     """Retorna distribuição de mensagens por hora do dia"""
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            EXTRACT(HOUR FROM created_at) as hora,
-            COUNT(*) as quantidade
-        FROM chat_ia
-        WHERE created_at >= NOW() - INTERVAL '30 days'
-        GROUP BY EXTRACT(HOUR FROM created_at)
-        ORDER BY hora
-    """)
-    
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT 
+                EXTRACT(HOUR FROM created_at) as hora,
+                COUNT(*) as quantidade
+            FROM chat_ia
+            WHERE created_at >= NOW() - INTERVAL '30 days'
+            GROUP BY EXTRACT(HOUR FROM created_at)
+            ORDER BY hora
+        """)
+        
+        results = cursor.fetchall()
+        cursor.close()
     
     return pd.DataFrame(results) if results else pd.DataFrame()
 
 @st.cache_data(ttl=60)
 def get_recent_conversations(limit=20):
     """Retorna conversas recentes"""
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            c.session_id,
-            u.nome_completo,
-            c.message,
-            c.created_at
-        FROM chat_ia c
-        LEFT JOIN users u ON c.session_id = u.phone_number
-        ORDER BY c.created_at DESC
-        LIMIT %s
-    """, (limit,))
-    
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT 
+                c.session_id,
+                u.nome_completo,
+                c.message,
+                c.created_at
+            FROM chat_ia c
+            LEFT JOIN users u ON c.session_id = u.phone_number
+            ORDER BY c.created_at DESC
+            LIMIT %s
+        """, (limit,))
+        
+        results = cursor.fetchall()
+        cursor.close()
     
     return results
 
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-from src.db.conection import get_vector_conn
+from src.db.conection import vector_conn
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import requests
@@ -65,66 +65,64 @@ def calcular_custo(input_tokens: int, output_tokens: int, em_real: bool = True)
 @st.cache_data(ttl=300)
 def get_token_stats(em_real=True):
     """Retorna estatísticas gerais de tokens"""
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    stats = {}
-    
-    # Total de tokens
-    cursor.execute("""
-        SELECT 
-            COALESCE(SUM(input_tokens), 0) as total_input,
-            COALESCE(SUM(output_tokens), 0) as total_output,
-            COALESCE(SUM(total_tokens), 0) as total_tokens
-        FROM agent_token_usage
-    """)
-    result = cursor.fetchone()
-    stats['total_input'] = int(result['total_input'])
-    stats['total_output'] = int(result['total_output'])
-    stats['total_tokens'] = int(result['total_tokens'])
-    stats['total_cost'] = calcular_custo(stats['total_input'], stats['total_output'], em_real)
-    
-    # Tokens nas últimas 24h
-    cursor.execute("""
-        SELECT 
-            COALESCE(SUM(input_tokens), 0) as input_24h,
-            COALESCE(SUM(output_tokens), 0) as output_24h,
-            COALESCE(SUM(total_tokens), 0) as total_24h
-        FROM agent_token_usage
-        WHERE created_at >= NOW() - INTERVAL '24 hours'
-    """)
-    result = cursor.fetchone()
-    stats['input_24h'] = int(result['input_24h'])
-    stats['output_24h'] = int(result['output_24h'])
-    stats['total_24h'] = int(result['total_24h'])
-    stats['cost_24h'] = calcular_custo(stats['input_24h'], stats['output_24h'], em_real)
-    
-    cursor.close()
-    conn.close()
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        
+        stats = {}
+        
+        # Total de tokens
+        cursor.execute("""
+            SELECT 
+                COALESCE(SUM(input_tokens), 0) as total_input,
+                COALESCE(SUM(output_tokens), 0) as total_output,
+                COALESCE(SUM(total_tokens), 0) as total_tokens
+            FROM agent_token_usage
+        """)
+        result = cursor.fetchone()
+        stats['total_input'] = int(result['total_input'])
+        stats['total_output'] = int(result['total_output'])
+        stats['total_tokens'] = int(result['total_tokens'])
+        stats['total_cost'] = calcular_custo(stats['total_input'], stats['total_output'], em_real)
+        
+        # Tokens nas últimas 24h
+        cursor.execute("""
+            SELECT 
+                COALESCE(SUM(input_tokens), 0) as input_24h,
+                COALESCE(SUM(output_tokens), 0) as output_24h,
+                COALESCE(SUM(total_tokens), 0) as total_24h
+            FROM agent_token_usage
+            WHERE created_at >= NOW() - INTERVAL '24 hours'
+        """)
+        result = cursor.fetchone()
+        stats['input_24h'] = int(result['input_24h'])
+        stats['output_24h'] = int(result['output_24h'])
+        stats['total_24h'] = int(result['total_24h'])
+        stats['cost_24h'] = calcular_custo(stats['input_24h'], stats['output_24h'], em_real)
+        
+        cursor.close()
     
     return stats
 
 @st.cache_data(ttl=300)
 def get_tokens_over_time(days=30, em_real=True):
     """Retorna consumo de tokens ao longo do tempo"""
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT 
-            DATE(created_at) as data,
-            SUM(input_tokens) as input_tokens,
-            SUM(output_tokens) as output_tokens,
-            SUM(total_tokens) as total_tokens
-        FROM agent_token_usage
-        WHERE created_at >= NOW() - INTERVAL '%s days'
-        GROUP BY DATE(created_at)
-        ORDER BY data
-    """ % days)
-    
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute("""
+            SELECT 
+                DATE(created_at) as data,
+                SUM(input_tokens) as input_tokens,
+                SUM(output_tokens) as output_tokens,
+                SUM(total_tokens) as total_tokens
+            FROM agent_token_usage
+            WHERE created_at >= NOW() - INTERVAL '%s days'
+            GROUP BY DATE(created_at)
+            ORDER BY data
+        """ % days)
+        
+        results = cursor.fetchall()
+        cursor.close()
     
     if results:
         df = pd.DataFrame(results)
@@ -1,7 +1,14 @@
 import os
+import select
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
+import psycopg2.pool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,3 +23,263 @@ def get_vector_conn():
         dbname=os.getenv('POSTGRES_DB'),
         cursor_factory=psycopg2.extras.RealDictCursor,
     )
+
+
+class PoolTimeoutError(psycopg2.pool.PoolError):
+    """Nenhuma conexão ficou livre dentro do tempo de espera."""
+
+
+class VectorConnectionPool:
+    """
+    Pool de conexões thread-safe com verificação de saúde no empréstimo.
+
+    Args:
+        minconn: Conexões abertas e mantidas ociosas no pool
+        maxconn: Limite de conexões simultâneas (emprestadas + ociosas)
+        factory: Função que abre uma nova conexão
+        check_after: Segundos ociosos após os quais a conexão é testada com SELECT 1;
+            antes disso ela só é testada se o socket tiver dados pendentes ou se
+            outra conexão do pool tiver caído
+        timeout: Segundos máximos de espera por uma conexão livre
+    """
+
+    def __init__(
+        self,
+        minconn: int = 1,
+        maxconn: int = 10,
+        factory=get_vector_conn,
+        check_after: float = 30.0,
+        timeout: float = 30.0,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Parâmetros inválidos: exige 0 <= minconn <= maxconn e maxconn >= 1")
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.factory = factory
+        self.check_after = check_after
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._idle = deque()  # (conexão, instante em que foi devolvida)
+        self._in_use = set()
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "wait_total_s": 0.0,
+            "wait_max_s": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "reconnects": 0,
+        }
+
+        for _ in range(minconn):
+            self._idle.append((self._open(), time.monotonic()))
+
+    def _open(self):
+        conn = self.factory()
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats["discarded"] += 1
+
+    @staticmethod
+    def _has_pending_data(conn) -> bool:
+        """
+        Uma conexão ociosa não tem nada a ler; dados no socket (ou EOF) são,
+        em geral, o aviso de encerramento enviado pelo servidor ao reiniciar.
+        """
+        try:
+            legiveis, _, _ = select.select([conn], [], [], 0)
+        except (OSError, ValueError, TypeError):
+            return True
+        return bool(legiveis)
+
+    def _is_healthy(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        status = conn.info.transaction_status
+        if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        recente = time.monotonic() - idle_since < self.check_after
+        if recente and status == psycopg2.extensions.TRANSACTION_STATUS_IDLE and not self._has_pending_data(conn):
+            return True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self, timeout: float | None = None):
+        """Empresta uma conexão saudável, esperando por uma vaga se o pool estiver cheio."""
+        if self._closed:
+            raise psycopg2.pool.PoolError("Pool de conexões fechado")
+
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.monotonic()
+        acquired = self._slots.acquire(timeout=timeout)
+        espera = time.monotonic() - inicio
+
+        with self._lock:
+            self._stats["wait_total_s"] += espera
+            self._stats["wait_max_s"] = max(self._stats["wait_max_s"], espera)
+            if not acquired:
+                self._stats["timeouts"] += 1
+            else:
+                self._stats["checkouts"] += 1
+
+        if not acquired:
+            raise PoolTimeoutError(f"Nenhuma conexão livre após {timeout:.1f}s")
+
+        try:
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+
+                if item is None:
+                    conn = self._open()
+                    break
+
+                conn, idle_since = item
+                if self._is_healthy(conn, idle_since):
+                    break
+
+                self._close_quietly(conn)
+                with self._lock:
+                    self._stats["reconnects"] += 1
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._in_use.add(id(conn))
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Devolve a conexão ao pool, descartando-a se estiver quebrada."""
+        with self._lock:
+            if id(conn) not in self._in_use:
+                raise psycopg2.pool.PoolError("Conexão não pertence a este pool")
+            self._in_use.discard(id(conn))
+
+        try:
+            if not discard and not conn.closed:
+                status = conn.info.transaction_status
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        discard = True
+
+            keep = not (discard or conn.closed or self._closed)
+            if keep:
+                with self._lock:
+                    keep = len(self._idle) < self.maxconn
+                    if keep:
+                        self._idle.append((conn, time.monotonic()))
+            if not keep:
+                self._close_quietly(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        """Empresta uma conexão durante o bloco `with` e a devolve ao final."""
+        conn = self.getconn(timeout)
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            # Provável queda ou troca do servidor: as ociosas, abertas antes
+            # dela, são testadas no próximo empréstimo mesmo antes de check_after
+            self._suspect_idle()
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def _suspect_idle(self):
+        with self._lock:
+            self._idle = deque((conn, float("-inf")) for conn, _ in self._idle)
+
+    def stats(self) -> dict:
+        """Retorna contadores de uso e de tempo de espera do pool."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = len(self._in_use)
+        checkouts = stats["checkouts"]
+        stats["wait_avg_s"] = stats["wait_total_s"] / checkouts if checkouts else 0.0
+        return stats
+
+    def closeall(self):
+        """Fecha todas as conexões ociosas; as emprestadas são fechadas ao serem devolvidas."""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+
+_pool: VectorConnectionPool | None = None
+_pool_pid: int | None = None
+_pool_lock = threading.Lock()
+
+
+def get_vector_pool() -> VectorConnectionPool:
+    """
+    Retorna o pool de conexões do processo, criando-o no primeiro uso.
+
+    O tamanho é configurado por POSTGRES_POOL_MIN / POSTGRES_POOL_MAX. Após um
+    fork o pool herdado é ignorado e um novo é criado para o processo filho.
+    """
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = VectorConnectionPool(
+                minconn=int(os.getenv('POSTGRES_POOL_MIN', '1')),
+                maxconn=int(os.getenv('POSTGRES_POOL_MAX', '10')),
+                timeout=float(os.getenv('POSTGRES_POOL_TIMEOUT', '30')),
+            )
+            _pool_pid = pid
+    return _pool
+
+
+@contextmanager
+def vector_conn(timeout: float | None = None):
+    """
+    Empresta uma conexão do pool do processo.
+
+    Uso:
+        with vector_conn() as conn:
+            cursor = conn.cursor()
+            ...
+
+    Transações não finalizadas são desfeitas na devolução.
+    """
+    with get_vector_pool().connection(timeout) as conn:
+        yield conn
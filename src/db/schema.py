@@ -0,0 +1,973 @@
+"""
+Migrações e provisionamento dos índices de rag_embeddings.
+
+Uso:
+    python -m src.db.schema migrar
+    python -m src.db.schema preencher
+    python -m src.db.schema duplicatas [--remover]
+    python -m src.db.schema listar
+    python -m src.db.schema indice-vetorial --tipo hnsw --m 16 --ef-construction 64
+    python -m src.db.schema indice-vetorial --tipo ivfflat --listas 200 --recriar
+    python -m src.db.schema indice-vetorial --precisao halfvec
+    python -m src.db.schema indice-vetorial --precisao bit
+    python -m src.db.schema indice-categoria
+    python -m src.db.schema reindexar
+    python -m src.db.schema manutencao --reindexar
+"""
+import argparse
+import math
+import os
+from contextlib import contextmanager
+
+from src.db.conection import vector_conn
+
+TABELA = "rag_embeddings"
+INDICE_VETORIAL = "rag_embeddings_embedding_idx"
+INDICE_CATEGORIA = "rag_embeddings_categoria_idx"
+
+TIPOS_INDICE = ("hnsw", "ivfflat")
+
+# Precisão dos vetores no índice. A tabela continua com o vetor completo
+# (float32), usado para reordenar os candidatos com a distância exata;
+# halfvec (float16) e bit (quantização binária) são índices de expressão.
+PRECISOES = ("vector", "halfvec", "bit")
+INDICES_VETORIAIS = {
+    "vector": INDICE_VETORIAL,
+    "halfvec": "rag_embeddings_embedding_halfvec_idx",
+    "bit": "rag_embeddings_embedding_bit_idx",
+}
+DIMENSOES_PADRAO = 1536
+
+# Parâmetros de construção do HNSW quando não informados
+HNSW_M_PADRAO = int(os.getenv("RAG_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION_PADRAO = int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "64"))
+
+
+def expressao_indice(precisao: str, dimensoes: int) -> tuple[str, str]:
+    """
+    Expressão indexada e classe de operadores de cada precisão.
+
+    A busca precisa usar exatamente a mesma expressão (ver
+    expressao_distancia) para o planejador escolher o índice.
+    """
+    if precisao == "vector":
+        return "embedding", "vector_cosine_ops"
+    if precisao == "halfvec":
+        return f"(embedding::halfvec({int(dimensoes)}))", "halfvec_cosine_ops"
+    if precisao == "bit":
+        return f"(binary_quantize(embedding)::bit({int(dimensoes)}))", "bit_hamming_ops"
+    raise ValueError(f"Precisão inválida: {precisao}")
+
+
+def expressao_distancia(precisao: str, dimensoes: int, parametro: str = "%(vetor)s") -> str:
+    """Distância entre a coluna e o vetor `parametro` servida pelo índice da precisão."""
+    expressao, _ = expressao_indice(precisao, dimensoes)
+    if precisao == "vector":
+        return f"embedding <=> {parametro}::vector"
+    if precisao == "halfvec":
+        return f"{expressao} <=> {parametro}::halfvec({int(dimensoes)})"
+    return f"{expressao} <~> binary_quantize({parametro}::vector)"
+
+# Migrações aplicadas em ordem por aplicar_migracoes(); nunca altere uma
+# entrada já publicada, acrescente outra ao final.
+#
+# Colunas novas em rag_embeddings devem ser comuns (ADD COLUMN sem valor
+# volátil não reescreve a tabela), com um trigger para as linhas novas e o
+# preenchimento das antigas em COLUNAS_DERIVADAS. GENERATED ... STORED
+# reescreve a tabela inteira sob ACCESS EXCLUSIVE: buscas e ingestões
+# ficam paradas até o fim.
+MIGRACOES = [
+    (
+        "001_geracao_corpus",
+        # Incrementada após cada escrita no corpus; invalida caches de busca
+        "CREATE SEQUENCE IF NOT EXISTS rag_corpus_geracao",
+    ),
+    (
+        "002_busca_lexical",
+        # tsvector do texto para a perna lexical da busca híbrida. Coluna
+        # comum preenchida por trigger; linhas antigas e o índice GIN ficam
+        # com preencher_colunas e criar_indices_derivados
+        """
+        ALTER TABLE rag_embeddings ADD COLUMN IF NOT EXISTS content_tsv tsvector;
+
+        CREATE OR REPLACE FUNCTION rag_preencher_content_tsv() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.content_tsv := to_tsvector('portuguese', NEW.content);
+            RETURN NEW;
+        END
+        $$;
+
+        DROP TRIGGER IF EXISTS rag_preencher_content_tsv ON rag_embeddings;
+        CREATE TRIGGER rag_preencher_content_tsv BEFORE INSERT OR UPDATE OF content ON rag_embeddings
+            FOR EACH ROW EXECUTE FUNCTION rag_preencher_content_tsv();
+        """,
+    ),
+    (
+        "003_funcao_busca_hibrida",
+        # Roda as duas pernas da busca híbrida num único round trip e mede
+        # cada uma no servidor. As linhas 'tempo_*' trazem a duração em ms
+        # no campo score. SQL dinâmico evita conflito entre as colunas de
+        # RETURNS TABLE e as da tabela, e gera plano específico por filtro.
+        """
+        CREATE OR REPLACE FUNCTION rag_busca_hibrida(
+            p_vetor text,
+            p_consulta text,
+            p_categoria text,
+            p_limite int
+        )
+        RETURNS TABLE (
+            fonte text,
+            posicao int,
+            id text,
+            content text,
+            categoria text,
+            similaridade double precision,
+            score double precision
+        )
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            inicio timestamptz;
+            filtro text := CASE WHEN p_categoria IS NULL THEN '' ELSE 'AND categoria = $2' END;
+        BEGIN
+            inicio := clock_timestamp();
+            RETURN QUERY EXECUTE format($q$
+                SELECT 'vetorial'::text, (row_number() OVER (ORDER BY distancia))::int,
+                       id::text, content, categoria, 1 - distancia, 1 - distancia
+                FROM (
+                    SELECT id, content, categoria, embedding <=> $1::vector AS distancia
+                    FROM rag_embeddings
+                    WHERE true %s
+                    ORDER BY distancia
+                    LIMIT $3
+                ) AS candidatos
+            $q$, filtro) USING p_vetor, p_categoria, p_limite;
+            RETURN QUERY SELECT 'tempo_vetorial'::text, 0, NULL::text, NULL::text, NULL::text, NULL::float8,
+                extract(epoch FROM clock_timestamp() - inicio)::float8 * 1000;
+
+            inicio := clock_timestamp();
+            RETURN QUERY EXECUTE format($q$
+                SELECT 'lexical'::text, (row_number() OVER (ORDER BY rank DESC))::int,
+                       id::text, content, categoria, 1 - (embedding <=> $1::vector), rank::float8
+                FROM (
+                    SELECT id, content, categoria, embedding, ts_rank_cd(content_tsv, consulta) AS rank
+                    FROM rag_embeddings, websearch_to_tsquery('portuguese', $4) AS consulta
+                    WHERE content_tsv @@ consulta %s
+                    ORDER BY rank DESC
+                    LIMIT $3
+                ) AS candidatos
+            $q$, filtro) USING p_vetor, p_categoria, p_limite, p_consulta;
+            RETURN QUERY SELECT 'tempo_lexical'::text, 0, NULL::text, NULL::text, NULL::text, NULL::float8,
+                extract(epoch FROM clock_timestamp() - inicio)::float8 * 1000;
+        END;
+        $$;
+        """,
+    ),
+    (
+        "004_hash_conteudo",
+        # Hash do texto, para deduplicar trechos por categoria na ingestão.
+        # Coluna comum mais o trigger que a preenche nas linhas novas; as
+        # linhas existentes, o índice único e a remoção de duplicatas ficam
+        # fora da migração (preencher_colunas, criar_indices_derivados e
+        # remover_duplicatas)
+        """
+        ALTER TABLE rag_embeddings ADD COLUMN IF NOT EXISTS content_hash text;
+
+        CREATE OR REPLACE FUNCTION rag_preencher_content_hash() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.content_hash := md5(NEW.content);
+            RETURN NEW;
+        END
+        $$;
+
+        DROP TRIGGER IF EXISTS rag_preencher_content_hash ON rag_embeddings;
+        CREATE TRIGGER rag_preencher_content_hash BEFORE INSERT OR UPDATE OF content ON rag_embeddings
+            FOR EACH ROW EXECUTE FUNCTION rag_preencher_content_hash();
+        """,
+    ),
+    (
+        "005_registro_documentos",
+        # Arquivo de origem e hash de cada página, para reingestão incremental
+        """
+        CREATE TABLE IF NOT EXISTS rag_documentos (
+            id bigserial PRIMARY KEY,
+            categoria text NOT NULL,
+            arquivo text NOT NULL,
+            total_paginas int NOT NULL DEFAULT 0,
+            criado_em timestamptz NOT NULL DEFAULT now(),
+            atualizado_em timestamptz NOT NULL DEFAULT now(),
+            UNIQUE (categoria, arquivo)
+        );
+        CREATE TABLE IF NOT EXISTS rag_documento_paginas (
+            documento_id bigint NOT NULL REFERENCES rag_documentos (id) ON DELETE CASCADE,
+            pagina int NOT NULL,
+            hash text NOT NULL,
+            PRIMARY KEY (documento_id, pagina)
+        );
+        ALTER TABLE rag_embeddings
+            ADD COLUMN IF NOT EXISTS documento_id bigint REFERENCES rag_documentos (id) ON DELETE CASCADE,
+            ADD COLUMN IF NOT EXISTS pagina int;
+        CREATE INDEX IF NOT EXISTS rag_embeddings_documento_pagina_idx
+            ON rag_embeddings (documento_id, pagina);
+        """,
+    ),
+    (
+        "006_fila_ingestao",
+        # Fila de jobs consumida pelos workers (python -m src.worker)
+        """
+        CREATE TABLE IF NOT EXISTS rag_jobs (
+            id bigserial PRIMARY KEY,
+            tipo text NOT NULL,
+            status text NOT NULL DEFAULT 'pendente'
+                CHECK (status IN ('pendente', 'processando', 'concluido', 'erro')),
+            categoria text NOT NULL,
+            arquivo text,
+            parametros jsonb NOT NULL DEFAULT '{}',
+            conteudo bytea,
+            progresso int NOT NULL DEFAULT 0,
+            total int,
+            mensagem text,
+            resultado jsonb,
+            erro text,
+            tentativas int NOT NULL DEFAULT 0,
+            worker text,
+            criado_em timestamptz NOT NULL DEFAULT now(),
+            iniciado_em timestamptz,
+            heartbeat_em timestamptz,
+            concluido_em timestamptz
+        );
+        CREATE INDEX IF NOT EXISTS rag_jobs_pendentes_idx
+            ON rag_jobs (criado_em) WHERE status IN ('pendente', 'processando');
+        """,
+    ),
+    (
+        "007_jobs_reagendamento",
+        # Jobs que falharam voltam para a fila após uma espera
+        """
+        ALTER TABLE rag_jobs
+            ADD COLUMN IF NOT EXISTS disponivel_em timestamptz NOT NULL DEFAULT now();
+        """,
+    ),
+    (
+        "008_dimensao_embedding",
+        # Largura de cada vetor, para detectar corpus com dimensões misturadas
+        # (EMBEDDING_DIMENSOES alterado sem reprocessar o corpus). Coluna
+        # comum preenchida por trigger; linhas antigas e índice ficam com
+        # preencher_colunas e criar_indices_derivados
+        """
+        ALTER TABLE rag_embeddings ADD COLUMN IF NOT EXISTS embedding_dim int;
+
+        CREATE OR REPLACE FUNCTION rag_preencher_embedding_dim() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.embedding_dim := vector_dims(NEW.embedding);
+            RETURN NEW;
+        END
+        $$;
+
+        DROP TRIGGER IF EXISTS rag_preencher_embedding_dim ON rag_embeddings;
+        CREATE TRIGGER rag_preencher_embedding_dim BEFORE INSERT OR UPDATE OF embedding ON rag_embeddings
+            FOR EACH ROW EXECUTE FUNCTION rag_preencher_embedding_dim();
+        """,
+    ),
+    (
+        "009_paginacao_embeddings",
+        # Paginação por cursor (created_at, id) na listagem do dashboard
+        """
+        CREATE INDEX IF NOT EXISTS rag_embeddings_created_at_id_idx
+            ON rag_embeddings (created_at DESC, id DESC);
+        CREATE INDEX IF NOT EXISTS rag_embeddings_categoria_created_at_id_idx
+            ON rag_embeddings (categoria, created_at DESC, id DESC);
+        """,
+    ),
+    (
+        "010_estatisticas_categorias",
+        # Catálogo de categorias com contagem e primeiro/último registro.
+        # Triggers de comando (um por INSERT/COPY/DELETE, com as linhas
+        # afetadas nas tabelas de transição) só acrescentam variações em
+        # rag_categorias_stats_deltas: nenhuma transação de escrita trava a
+        # linha da categoria, que rag_stats_consolidar() atualiza depois num
+        # commit curto. A view rag_categorias_stats_atuais soma as variações
+        # ainda pendentes.
+        """
+        CREATE TABLE IF NOT EXISTS rag_categorias_stats (
+            categoria text PRIMARY KEY,
+            total bigint NOT NULL,
+            primeiro_registro timestamptz,
+            ultimo_registro timestamptz
+        );
+
+        CREATE TABLE IF NOT EXISTS rag_categorias_stats_deltas (
+            id bigserial PRIMARY KEY,
+            categoria text NOT NULL,
+            total bigint NOT NULL,
+            primeiro_registro timestamptz,
+            ultimo_registro timestamptz,
+            -- Houve exclusão: os limites só são conhecidos relendo a categoria
+            recalcular_limites boolean NOT NULL DEFAULT false
+        );
+
+        CREATE OR REPLACE FUNCTION rag_stats_inserir() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO rag_categorias_stats_deltas (categoria, total, primeiro_registro, ultimo_registro)
+            SELECT categoria, count(*), min(created_at), max(created_at)
+            FROM novas
+            GROUP BY categoria;
+            RETURN NULL;
+        END
+        $$;
+
+        CREATE OR REPLACE FUNCTION rag_stats_remover() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO rag_categorias_stats_deltas (categoria, total, recalcular_limites)
+            SELECT categoria, -count(*), true
+            FROM antigas
+            GROUP BY categoria;
+            RETURN NULL;
+        END
+        $$;
+
+        CREATE OR REPLACE FUNCTION rag_stats_atualizar() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            -- A maioria dos UPDATEs (ex.: documento_id) não muda as estatísticas
+            IF NOT EXISTS (
+                SELECT 1 FROM antigas a JOIN novas n USING (id)
+                WHERE a.categoria IS DISTINCT FROM n.categoria
+                   OR a.created_at IS DISTINCT FROM n.created_at
+            ) THEN
+                RETURN NULL;
+            END IF;
+
+            INSERT INTO rag_categorias_stats_deltas
+                (categoria, total, primeiro_registro, ultimo_registro, recalcular_limites)
+            SELECT categoria, sum(delta), min(created_at), max(created_at), bool_or(delta < 0)
+            FROM (
+                SELECT categoria, 1 AS delta, created_at FROM novas
+                UNION ALL
+                SELECT categoria, -1, NULL FROM antigas
+            ) AS mudancas
+            GROUP BY categoria;
+            RETURN NULL;
+        END
+        $$;
+
+        CREATE OR REPLACE FUNCTION rag_stats_truncar() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            DELETE FROM rag_categorias_stats;
+            DELETE FROM rag_categorias_stats_deltas;
+            RETURN NULL;
+        END
+        $$;
+
+        -- Soma as variações pendentes no catálogo e devolve quantas
+        -- categorias mudaram. Uma consolidação por vez; as demais chamadas
+        -- voltam na hora com 0.
+        CREATE OR REPLACE FUNCTION rag_stats_consolidar() RETURNS int
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            categorias text[];
+            totais bigint[];
+            primeiros timestamptz[];
+            ultimos timestamptz[];
+            recalcular text[];
+        BEGIN
+            IF NOT pg_try_advisory_xact_lock(hashtext('rag_stats_consolidar')) THEN
+                RETURN 0;
+            END IF;
+
+            WITH consumidas AS (
+                DELETE FROM rag_categorias_stats_deltas RETURNING *
+            )
+            SELECT array_agg(categoria ORDER BY categoria), array_agg(total ORDER BY categoria),
+                   array_agg(primeiro ORDER BY categoria), array_agg(ultimo ORDER BY categoria),
+                   array_agg(categoria ORDER BY categoria) FILTER (WHERE recalcular)
+            INTO categorias, totais, primeiros, ultimos, recalcular
+            FROM (
+                SELECT categoria, sum(total) AS total, min(primeiro_registro) AS primeiro,
+                       max(ultimo_registro) AS ultimo, bool_or(recalcular_limites) AS recalcular
+                FROM consumidas
+                GROUP BY categoria
+            ) AS somadas;
+
+            IF categorias IS NULL THEN
+                RETURN 0;
+            END IF;
+
+            INSERT INTO rag_categorias_stats AS s (categoria, total, primeiro_registro, ultimo_registro)
+            SELECT * FROM unnest(categorias, totais, primeiros, ultimos)
+            ON CONFLICT (categoria) DO UPDATE SET
+                total = s.total + EXCLUDED.total,
+                primeiro_registro = LEAST(s.primeiro_registro, EXCLUDED.primeiro_registro),
+                ultimo_registro = GREATEST(s.ultimo_registro, EXCLUDED.ultimo_registro);
+
+            DELETE FROM rag_categorias_stats
+            WHERE total <= 0 AND categoria = ANY(categorias);
+
+            -- Os limites das categorias com exclusões são relidos pelo índice
+            -- (categoria, created_at), uma descida na árvore por categoria
+            UPDATE rag_categorias_stats AS s
+            SET primeiro_registro = (SELECT min(created_at) FROM rag_embeddings e WHERE e.categoria = s.categoria),
+                ultimo_registro = (SELECT max(created_at) FROM rag_embeddings e WHERE e.categoria = s.categoria)
+            WHERE s.categoria = ANY(recalcular);
+
+            RETURN cardinality(categorias);
+        END
+        $$;
+
+        -- Catálogo com as variações ainda não consolidadas. Os limites de
+        -- uma categoria com exclusões pendentes podem estar mais largos que
+        -- os reais até a próxima consolidação.
+        CREATE OR REPLACE VIEW rag_categorias_stats_atuais AS
+        SELECT categoria, sum(total)::bigint AS total,
+               min(primeiro_registro) AS primeiro_registro, max(ultimo_registro) AS ultimo_registro
+        FROM (
+            SELECT categoria, total, primeiro_registro, ultimo_registro FROM rag_categorias_stats
+            UNION ALL
+            SELECT categoria, total, primeiro_registro, ultimo_registro FROM rag_categorias_stats_deltas
+        ) AS combinadas
+        GROUP BY categoria
+        HAVING sum(total) > 0;
+
+        DROP TRIGGER IF EXISTS rag_stats_inserir ON rag_embeddings;
+        CREATE TRIGGER rag_stats_inserir AFTER INSERT ON rag_embeddings
+            REFERENCING NEW TABLE AS novas
+            FOR EACH STATEMENT EXECUTE FUNCTION rag_stats_inserir();
+
+        DROP TRIGGER IF EXISTS rag_stats_remover ON rag_embeddings;
+        CREATE TRIGGER rag_stats_remover AFTER DELETE ON rag_embeddings
+            REFERENCING OLD TABLE AS antigas
+            FOR EACH STATEMENT EXECUTE FUNCTION rag_stats_remover();
+
+        DROP TRIGGER IF EXISTS rag_stats_atualizar ON rag_embeddings;
+        CREATE TRIGGER rag_stats_atualizar AFTER UPDATE ON rag_embeddings
+            REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+            FOR EACH STATEMENT EXECUTE FUNCTION rag_stats_atualizar();
+
+        DROP TRIGGER IF EXISTS rag_stats_truncar ON rag_embeddings;
+        CREATE TRIGGER rag_stats_truncar AFTER TRUNCATE ON rag_embeddings
+            FOR EACH STATEMENT EXECUTE FUNCTION rag_stats_truncar();
+
+        -- Carga inicial (CREATE TRIGGER já bloqueia escritas até o commit)
+        DELETE FROM rag_categorias_stats_deltas;
+        DELETE FROM rag_categorias_stats;
+        INSERT INTO rag_categorias_stats (categoria, total, primeiro_registro, ultimo_registro)
+        SELECT categoria, count(*), min(created_at), max(created_at)
+        FROM rag_embeddings
+        GROUP BY categoria;
+        """,
+    ),
+    (
+        "011_jobs_cancelamento",
+        # Jobs longos (ex.: exclusão de categoria) podem ser cancelados pela UI
+        """
+        ALTER TABLE rag_jobs
+            ADD COLUMN IF NOT EXISTS cancelamento_solicitado boolean NOT NULL DEFAULT false;
+        ALTER TABLE rag_jobs DROP CONSTRAINT IF EXISTS rag_jobs_status_check;
+        ALTER TABLE rag_jobs ADD CONSTRAINT rag_jobs_status_check
+            CHECK (status IN ('pendente', 'processando', 'concluido', 'erro', 'cancelado'));
+        """,
+    ),
+    (
+        "012_trechos_documento",
+        # Páginas que usam cada trecho. A unicidade por (categoria,
+        # content_hash) guarda um trecho repetido em várias páginas uma vez
+        # só; rag_embeddings.documento_id/pagina é apenas o dono atual, e o
+        # trecho só sai quando nenhuma página o usa mais. A carga usa
+        # md5(content): content_hash das linhas antigas pode ainda não ter
+        # sido preenchido.
+        """
+        CREATE TABLE IF NOT EXISTS rag_documento_trechos (
+            documento_id bigint NOT NULL REFERENCES rag_documentos (id) ON DELETE CASCADE,
+            pagina int NOT NULL,
+            content_hash text NOT NULL,
+            PRIMARY KEY (documento_id, pagina, content_hash)
+        );
+        CREATE INDEX IF NOT EXISTS rag_documento_trechos_hash_idx
+            ON rag_documento_trechos (content_hash);
+        INSERT INTO rag_documento_trechos (documento_id, pagina, content_hash)
+        SELECT documento_id, pagina, md5(content)
+        FROM rag_embeddings
+        WHERE documento_id IS NOT NULL AND pagina IS NOT NULL
+        ON CONFLICT DO NOTHING;
+        """,
+    ),
+]
+
+
+@contextmanager
+def _autocommit():
+    """Conexão em autocommit, exigido por CREATE/DROP/REINDEX ... CONCURRENTLY."""
+    with vector_conn() as conn:
+        conn.autocommit = True
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            # Não devolve ao pool configurações de sessão alteradas aqui
+            cursor.execute("RESET ALL")
+            cursor.close()
+            conn.autocommit = False
+
+
+def aplicar_migracoes() -> list[str]:
+    """
+    Aplica as migrações pendentes, cada uma em sua própria transação.
+
+    Roda na subida do app e dos workers, então só pode conter mudanças
+    rápidas; preenchimentos e índices grandes ficam em preencher_colunas e
+    criar_indices_derivados.
+
+    Returns:
+        Nomes das migrações aplicadas nesta execução
+    """
+    aplicadas = []
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS rag_schema_migracoes (
+                    nome text PRIMARY KEY,
+                    aplicada_em timestamptz NOT NULL DEFAULT now()
+                )
+            """)
+            conn.commit()
+
+            for nome, sql in MIGRACOES:
+                # Serializa processos que sobem ao mesmo tempo (app e workers)
+                cursor.execute("SELECT pg_advisory_xact_lock(hashtext('rag_schema_migracoes'))")
+                cursor.execute("SELECT 1 FROM rag_schema_migracoes WHERE nome = %s", (nome,))
+                if cursor.fetchone():
+                    conn.rollback()
+                    continue
+
+                cursor.execute(sql)
+                cursor.execute("INSERT INTO rag_schema_migracoes (nome) VALUES (%s)", (nome,))
+                conn.commit()
+                aplicadas.append(nome)
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+    return aplicadas
+
+
+# Colunas de rag_embeddings calculadas a partir de outras. A migração de
+# cada uma cria a coluna comum e o trigger que a preenche nas linhas novas;
+# as linhas que já existiam são preenchidas por preencher_colunas().
+COLUNAS_DERIVADAS = {
+    "content_tsv": "to_tsvector('portuguese', content)",
+    "content_hash": "md5(content)",
+    "embedding_dim": "vector_dims(embedding)",
+}
+
+# Índices sobre as colunas derivadas (nome, único, definição), criados com
+# CONCURRENTLY por criar_indices_derivados() depois do preenchimento
+INDICES_DERIVADOS = [
+    ("rag_embeddings_content_tsv_idx", False, "USING gin (content_tsv)"),
+    ("rag_embeddings_categoria_hash_key", True, "(categoria, content_hash)"),
+    ("rag_embeddings_embedding_dim_idx", False, "(embedding_dim)"),
+]
+
+TAMANHO_LOTE_PREENCHIMENTO = 5000
+
+
+def preencher_colunas(tamanho_lote: int = TAMANHO_LOTE_PREENCHIMENTO) -> dict[str, int]:
+    """
+    Preenche as colunas derivadas nas linhas anteriores às suas migrações.
+
+    Percorre rag_embeddings pela chave primária, um lote por transação: cada
+    lote bloqueia só as próprias linhas, e buscas e ingestões continuam
+    durante o preenchimento. Pode ser interrompido e rodado de novo.
+
+    Returns:
+        Linhas preenchidas por coluna
+    """
+    preenchidas = {}
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = %s AND column_name = ANY(%s)",
+                (TABELA, list(COLUNAS_DERIVADAS))
+            )
+            existentes = {row["column_name"] for row in cursor.fetchall()}
+            conn.commit()
+
+            for coluna, expressao in COLUNAS_DERIVADAS.items():
+                if coluna not in existentes:
+                    continue
+
+                preenchidas[coluna] = 0
+                ultimo = None
+                while True:
+                    filtro = "" if ultimo is None else "WHERE id > %(ultimo)s"
+                    cursor.execute(
+                        f"SELECT id FROM {TABELA} {filtro} ORDER BY id LIMIT %(limite)s",
+                        {"ultimo": ultimo, "limite": tamanho_lote}
+                    )
+                    ids = [row["id"] for row in cursor.fetchall()]
+                    if not ids:
+                        conn.commit()
+                        break
+
+                    cursor.execute(f"""
+                        UPDATE {TABELA} SET {coluna} = {expressao}
+                        WHERE id BETWEEN %(primeiro)s AND %(ultimo)s AND {coluna} IS NULL
+                    """, {"primeiro": ids[0], "ultimo": ids[-1]})
+                    preenchidas[coluna] += cursor.rowcount
+                    conn.commit()
+                    ultimo = ids[-1]
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+    return preenchidas
+
+
+def contar_duplicatas() -> dict:
+    """
+    Conteúdos repetidos dentro de uma mesma categoria, que impedem o índice
+    único (categoria, content_hash). Só considera linhas já preenchidas.
+
+    Returns:
+        {"grupos": conteúdos repetidos, "excedentes": cópias além da primeira}
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT count(*) AS grupos, COALESCE(sum(total - 1), 0) AS excedentes
+                FROM (
+                    SELECT count(*) AS total
+                    FROM {TABELA}
+                    WHERE content_hash IS NOT NULL
+                    GROUP BY categoria, content_hash
+                    HAVING count(*) > 1
+                ) AS repetidos
+            """)
+            return dict(cursor.fetchone())
+        finally:
+            cursor.close()
+
+
+def remover_duplicatas() -> int:
+    """
+    Apaga as cópias repetidas de cada conteúdo por categoria, mantendo a
+    mais antiga. Rodar depois de conferir contar_duplicatas(); nunca roda
+    sozinha na subida da aplicação.
+
+    Returns:
+        Linhas removidas
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f"""
+                DELETE FROM {TABELA} AS novo
+                USING {TABELA} AS antigo
+                WHERE novo.categoria = antigo.categoria
+                  AND novo.content_hash = antigo.content_hash
+                  AND (novo.created_at, novo.ctid) > (antigo.created_at, antigo.ctid)
+            """)
+            removidas = cursor.rowcount
+            if removidas:
+                cursor.execute("SELECT nextval('rag_corpus_geracao')")
+            conn.commit()
+            return removidas
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+
+def criar_indices_derivados() -> list[str]:
+    """
+    Cria com CONCURRENTLY os índices das colunas derivadas, sem bloquear
+    leituras nem escritas. Um índice deixado inválido por uma tentativa
+    anterior é descartado e refeito; o índice único só é criado quando não
+    há duplicatas (ver contar_duplicatas).
+
+    Returns:
+        Nomes dos índices prontos
+    """
+    prontos = []
+
+    with _autocommit() as cursor:
+        for nome, unico, definicao in INDICES_DERIVADOS:
+            cursor.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", (nome,))
+            row = cursor.fetchone()
+            if row and row["indisvalid"]:
+                prontos.append(nome)
+                continue
+            if row:
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {nome}")
+
+            if unico:
+                cursor.execute(f"""
+                    SELECT 1 FROM {TABELA}
+                    WHERE content_hash IS NOT NULL
+                    GROUP BY categoria, content_hash
+                    HAVING count(*) > 1
+                    LIMIT 1
+                """)
+                if cursor.fetchone():
+                    print(f"⚠️ {nome} não criado: há conteúdo repetido na mesma categoria "
+                          "(confira com `python -m src.db.schema duplicatas`)")
+                    continue
+
+            cursor.execute(f"""
+                CREATE {'UNIQUE' if unico else ''} INDEX CONCURRENTLY IF NOT EXISTS {nome}
+                ON {TABELA} {definicao}
+            """)
+            prontos.append(nome)
+
+    return prontos
+
+
+def _listas_ivfflat(cursor) -> int:
+    """Heurística do pgvector: linhas/1000 até 1M de linhas, raiz quadrada acima disso."""
+    cursor.execute(f"SELECT COUNT(*) AS total FROM {TABELA}")
+    total = cursor.fetchone()["total"]
+    if total <= 1_000_000:
+        return max(1, total // 1000)
+    return int(math.sqrt(total))
+
+
+def dimensoes_corpus(cursor) -> int:
+    """Dimensões dos vetores gravados (DIMENSOES_PADRAO se a tabela estiver vazia)."""
+    cursor.execute(f"SELECT vector_dims(embedding) AS dimensoes FROM {TABELA} LIMIT 1")
+    row = cursor.fetchone()
+    return row["dimensoes"] if row else DIMENSOES_PADRAO
+
+
+def _sql_indice_vetorial(
+    nome: str,
+    tipo: str,
+    m: int,
+    ef_construction: int,
+    listas: int,
+    concorrente: bool,
+    precisao: str = "vector",
+    dimensoes: int = DIMENSOES_PADRAO,
+) -> str:
+    if tipo == "hnsw":
+        opcoes = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    else:
+        opcoes = f"lists = {int(listas)}"
+
+    expressao, operadores = expressao_indice(precisao, dimensoes)
+    return f"""
+        CREATE INDEX {'CONCURRENTLY' if concorrente else ''} IF NOT EXISTS {nome}
+        ON {TABELA} USING {tipo} ({expressao} {operadores})
+        WITH ({opcoes})
+    """
+
+
+def criar_indice_vetorial(
+    tipo: str = "hnsw",
+    m: int = HNSW_M_PADRAO,
+    ef_construction: int = HNSW_EF_CONSTRUCTION_PADRAO,
+    listas: int | None = None,
+    recriar: bool = False,
+    concorrente: bool = True,
+    maintenance_work_mem: str | None = None,
+    precisao: str = "vector",
+) -> str:
+    """
+    Cria o índice ANN de rag_embeddings.embedding (distância de cosseno).
+
+    Com precisao "halfvec" ou "bit" o índice guarda o vetor em meia precisão
+    ou quantizado (cerca de 1/2 e 1/32 do tamanho); a busca usa o índice para
+    escolher candidatos e reordena com o vetor completo da tabela.
+
+    Args:
+        tipo: "hnsw" ou "ivfflat"
+        m: Conexões por nó do HNSW (padrão: RAG_HNSW_M)
+        ef_construction: Tamanho da lista de candidatos na construção do HNSW
+            (padrão: RAG_HNSW_EF_CONSTRUCTION)
+        listas: Número de listas do IVFFlat (padrão: calculado pelo tamanho da tabela)
+        recriar: Se já existir, constrói um novo índice com os parâmetros dados e
+            troca pelo antigo sem bloquear leituras nem escritas
+        concorrente: Usa CREATE INDEX CONCURRENTLY
+        maintenance_work_mem: Memória para a construção (ex.: "2GB")
+        precisao: "vector", "halfvec" ou "bit"
+
+    Returns:
+        Nome do índice criado
+    """
+    if tipo not in TIPOS_INDICE:
+        raise ValueError(f"Tipo de índice inválido: {tipo}")
+    if precisao not in PRECISOES:
+        raise ValueError(f"Precisão inválida: {precisao}")
+
+    nome = INDICES_VETORIAIS[precisao]
+
+    with _autocommit() as cursor:
+        if maintenance_work_mem:
+            cursor.execute("SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,))
+
+        if tipo == "ivfflat" and listas is None:
+            listas = _listas_ivfflat(cursor)
+        dimensoes = dimensoes_corpus(cursor)
+
+        if not recriar:
+            cursor.execute(_sql_indice_vetorial(nome, tipo, m, ef_construction, listas, concorrente, precisao, dimensoes))
+            return nome
+
+        novo = f"{nome}_novo"
+        cursor.execute(f"DROP INDEX {'CONCURRENTLY' if concorrente else ''} IF EXISTS {novo}")
+        cursor.execute(_sql_indice_vetorial(novo, tipo, m, ef_construction, listas, concorrente, precisao, dimensoes))
+        cursor.execute(f"DROP INDEX {'CONCURRENTLY' if concorrente else ''} IF EXISTS {nome}")
+        cursor.execute(f"ALTER INDEX {novo} RENAME TO {nome}")
+        return nome
+
+
+def reindexar_indice_vetorial(concorrente: bool = True, precisao: str = "vector"):
+    """Reconstrói o índice vetorial com os parâmetros atuais (ex.: após muitas exclusões)."""
+    with _autocommit() as cursor:
+        cursor.execute(f"REINDEX INDEX {'CONCURRENTLY' if concorrente else ''} {INDICES_VETORIAIS[precisao]}")
+
+
+def criar_indice_categoria(concorrente: bool = True) -> str:
+    """Cria o índice b-tree de rag_embeddings.categoria."""
+    with _autocommit() as cursor:
+        cursor.execute(f"""
+            CREATE INDEX {'CONCURRENTLY' if concorrente else ''} IF NOT EXISTS {INDICE_CATEGORIA}
+            ON {TABELA} (categoria)
+        """)
+    return INDICE_CATEGORIA
+
+
+def manter_tabela(reindexar: bool = False) -> list[str]:
+    """
+    Manutenção após exclusões grandes: VACUUM (ANALYZE) de rag_embeddings e,
+    opcionalmente, REINDEX CONCURRENTLY dos índices vetoriais existentes.
+
+    O VACUUM libera as linhas mortas e remove seus vizinhos do grafo HNSW;
+    o REINDEX reconstrói o índice compacto, sem bloquear as buscas.
+
+    Returns:
+        Nomes dos índices reconstruídos
+    """
+    with _autocommit() as cursor:
+        cursor.execute(f"VACUUM (ANALYZE) {TABELA}")
+        if not reindexar:
+            return []
+
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname = ANY(%s)",
+            (TABELA, list(INDICES_VETORIAIS.values()))
+        )
+        nomes = [row["indexname"] for row in cursor.fetchall()]
+        for nome in nomes:
+            cursor.execute(f"REINDEX INDEX CONCURRENTLY {nome}")
+        return nomes
+
+
+def listar_indices() -> list[dict]:
+    """Lista os índices de rag_embeddings com definição e tamanho."""
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT
+                    i.indexname AS nome,
+                    i.indexdef AS definicao,
+                    pg_size_pretty(pg_relation_size(c.oid)) AS tamanho
+                FROM pg_indexes i
+                JOIN pg_class c ON c.relname = i.indexname
+                WHERE i.tablename = %s
+                ORDER BY i.indexname
+            """, (TABELA,))
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    comandos.add_parser("migrar", help="Aplica as migrações pendentes")
+    comandos.add_parser(
+        "preencher", help="Preenche as colunas derivadas em lotes e cria seus índices sem bloquear a tabela"
+    )
+    duplicatas = comandos.add_parser("duplicatas", help="Relata conteúdo repetido na mesma categoria")
+    duplicatas.add_argument("--remover", action="store_true", help="Apaga as cópias, mantendo a mais antiga")
+    comandos.add_parser("listar", help="Lista os índices de rag_embeddings")
+
+    vetorial = comandos.add_parser("indice-vetorial", help="Cria (ou recria) o índice ANN")
+    vetorial.add_argument("--tipo", choices=TIPOS_INDICE, default="hnsw")
+    vetorial.add_argument("--m", type=int, default=HNSW_M_PADRAO)
+    vetorial.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION_PADRAO)
+    vetorial.add_argument("--listas", type=int, default=None)
+    vetorial.add_argument("--recriar", action="store_true")
+    vetorial.add_argument("--maintenance-work-mem", default=None)
+    vetorial.add_argument("--precisao", choices=PRECISOES, default="vector")
+
+    comandos.add_parser("indice-categoria", help="Cria o índice b-tree de categoria")
+    reindexar = comandos.add_parser("reindexar", help="Reconstrói o índice ANN")
+    reindexar.add_argument("--precisao", choices=PRECISOES, default="vector")
+
+    manutencao = comandos.add_parser("manutencao", help="VACUUM (ANALYZE) após exclusões grandes")
+    manutencao.add_argument("--reindexar", action="store_true", help="Também reconstrói os índices vetoriais")
+
+    args = parser.parse_args()
+
+    if args.comando == "migrar":
+        aplicadas = aplicar_migracoes()
+        print(f"✅ {len(aplicadas)} migrações aplicadas" + (f": {', '.join(aplicadas)}" if aplicadas else ""))
+    elif args.comando == "preencher":
+        aplicar_migracoes()
+        for coluna, total in preencher_colunas().items():
+            print(f"✅ {coluna}: {total} linhas preenchidas")
+        print(f"✅ Índices prontos: {', '.join(criar_indices_derivados()) or 'nenhum'}")
+    elif args.comando == "duplicatas":
+        contagem = contar_duplicatas()
+        print(f"{contagem['grupos']} conteúdos repetidos, {contagem['excedentes']} cópias excedentes")
+        if args.remover and contagem["excedentes"]:
+            print(f"✅ {remover_duplicatas()} cópias removidas")
+    elif args.comando == "listar":
+        for indice in listar_indices():
+            print(f"{indice['nome']} ({indice['tamanho']})\n    {indice['definicao']}")
+    elif args.comando == "indice-vetorial":
+        nome = criar_indice_vetorial(
+            tipo=args.tipo,
+            m=args.m,
+            ef_construction=args.ef_construction,
+            listas=args.listas,
+            recriar=args.recriar,
+            maintenance_work_mem=args.maintenance_work_mem,
+            precisao=args.precisao,
+        )
+        print(f"✅ Índice {nome} pronto")
+    elif args.comando == "indice-categoria":
+        print(f"✅ Índice {criar_indice_categoria()} pronto")
+    elif args.comando == "reindexar":
+        reindexar_indice_vetorial(precisao=args.precisao)
+        print(f"✅ Índice {INDICES_VETORIAIS[args.precisao]} reconstruído")
+    elif args.comando == "manutencao":
+        reconstruidos = manter_tabela(reindexar=args.reindexar)
+        print(f"✅ VACUUM concluído; índices reconstruídos: {', '.join(reconstruidos) or 'nenhum'}")
+
+
+if __name__ == "__main__":
+    main()
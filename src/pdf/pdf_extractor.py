@@ -1,70 +1,153 @@
+import io
+import multiprocessing
+import os
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 from pypdf import PdfReader
 
+# Processos da extração paralela (0 = um por núcleo, 1 = sempre serial)
+PROCESSOS_EXTRACAO = int(os.getenv("PDF_EXTRACAO_PROCESSOS", "0"))
+
+# Abaixo disso o custo de subir os processos supera o ganho
+MIN_PAGINAS_PARALELO = int(os.getenv("PDF_EXTRACAO_MIN_PAGINAS", "32"))
+
+# Páginas extraídas por tarefa enviada ao pool
+PAGINAS_POR_TAREFA = 8
+
+_reader_worker = None
+
+
+def _iniciar_worker(fonte):
+    # Cada processo abre o PDF uma única vez e atende vários intervalos
+    global _reader_worker
+    _reader_worker = PdfReader(io.BytesIO(fonte) if isinstance(fonte, bytes) else fonte)
+
+
+def _extrair_intervalo(inicio: int, fim: int) -> list[str]:
+    return [_reader_worker.pages[i].extract_text() for i in range(inicio, fim)]
+
+
+def _ler_fonte(arquivo_pdf):
+    """Caminho ou bytes do PDF, que podem ser enviados aos processos do pool."""
+    if isinstance(arquivo_pdf, (str, os.PathLike)):
+        return arquivo_pdf
+    if hasattr(arquivo_pdf, "getvalue"):
+        return arquivo_pdf.getvalue()
+    return arquivo_pdf.read()
+
+
+def _textos_em_paralelo(fonte, total_paginas: int, processos: int) -> Iterator[str]:
+    """Extrai intervalos de páginas num pool de processos e devolve os textos em ordem."""
+    intervalos = [
+        (inicio, min(inicio + PAGINAS_POR_TAREFA, total_paginas))
+        for inicio in range(0, total_paginas, PAGINAS_POR_TAREFA)
+    ]
+    # spawn: fork a partir do servidor do Streamlit (multithread) não é seguro
+    contexto = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(
+        max_workers=processos,
+        mp_context=contexto,
+        initializer=_iniciar_worker,
+        initargs=(fonte,),
+    ) as executor:
+        # Janela limitada de tarefas: a memória não cresce com o tamanho do PDF
+        pendentes = deque(
+            executor.submit(_extrair_intervalo, inicio, fim)
+            for inicio, fim in islice(intervalos, processos * 2)
+        )
+        restantes = iter(intervalos[processos * 2:])
+        try:
+            while pendentes:
+                textos = pendentes.popleft().result()
+                proximo = next(restantes, None)
+                if proximo is not None:
+                    pendentes.append(executor.submit(_extrair_intervalo, *proximo))
+                yield from textos
+        finally:
+            for futuro in pendentes:
+                futuro.cancel()
+
 
-def extrair_texto_pdf(arquivo_pdf) -> str:
+def iterar_paginas_pdf(arquivo_pdf, processos: int | None = None) -> Iterator[dict]:
+    """
+    Extrai o texto de um PDF página a página, à medida que cada uma é decodificada.
+
+    Só a página atual fica em memória, então quem consome o gerador (ex.:
+    iterar_blocos + executar_ingestao) pode começar a trabalhar na primeira
+    página enquanto as seguintes ainda não foram lidas.
+
+    Com mais de um processo e pelo menos MIN_PAGINAS_PARALELO páginas, os
+    intervalos de páginas são extraídos em paralelo e devolvidos em ordem.
+
+    Args:
+        arquivo_pdf: Objeto de arquivo PDF (pode ser do streamlit ou caminho)
+        processos: Processos da extração (padrão: PDF_EXTRACAO_PROCESSOS;
+            0 = um por núcleo, 1 = serial)
+
+    Yields:
+        Dicionários com {'pagina': int, 'texto': str}, pulando páginas sem texto
+    """
+    processos = PROCESSOS_EXTRACAO if processos is None else processos
+    processos = processos or os.cpu_count() or 1
+
+    try:
+        if processos > 1:
+            fonte = _ler_fonte(arquivo_pdf)
+            reader = PdfReader(io.BytesIO(fonte) if isinstance(fonte, bytes) else fonte)
+        else:
+            reader = PdfReader(arquivo_pdf)
+        total_paginas = len(reader.pages)
+    except Exception as e:
+        raise Exception(f"Erro ao extrair texto do PDF: {str(e)}")
+
+    if processos > 1 and total_paginas >= MIN_PAGINAS_PARALELO:
+        textos = _textos_em_paralelo(fonte, total_paginas, min(processos, total_paginas))
+    else:
+        textos = (pagina.extract_text() for pagina in reader.pages)
+
+    encontrou_texto = False
+    try:
+        for pagina_num, texto in enumerate(textos, 1):
+            if texto.strip():  # Só devolve se tiver conteúdo
+                encontrou_texto = True
+                yield {"pagina": pagina_num, "texto": texto}
+    except Exception as e:
+        raise Exception(f"Erro ao extrair texto do PDF: {str(e)}")
+
+    if not encontrou_texto:
+        raise Exception("Erro ao extrair texto do PDF: PDF não contém texto extraível")
+
+
+def extrair_texto_pdf(arquivo_pdf, processos: int | None = None) -> str:
     """
     Extrai todo o texto de um arquivo PDF.
     
     Args:
         arquivo_pdf: Objeto de arquivo PDF (pode ser do streamlit ou caminho)
+        processos: Processos da extração (ver iterar_paginas_pdf)
     
     Returns:
         String com todo o texto extraído do PDF
     """
-    try:
-        # Cria o leitor de PDF
-        reader = PdfReader(arquivo_pdf)
-        
-        # Extrai texto de todas as páginas
-        texto_completo = []
-        
-        for pagina_num, pagina in enumerate(reader.pages, 1):
-            texto = pagina.extract_text()
-            if texto.strip():  # Só adiciona se tiver conteúdo
-                texto_completo.append(texto)
-        
-        # Junta todo o texto
-        texto_final = "\n\n".join(texto_completo)
-        
-        if not texto_final.strip():
-            raise ValueError("PDF não contém texto extraível")
-        
-        return texto_final
-    
-    except Exception as e:
-        raise Exception(f"Erro ao extrair texto do PDF: {str(e)}")
+    return "\n\n".join(pagina["texto"] for pagina in iterar_paginas_pdf(arquivo_pdf, processos))
 
 
-def extrair_texto_pdf_por_paginas(arquivo_pdf) -> list[dict]:
+def extrair_texto_pdf_por_paginas(arquivo_pdf, processos: int | None = None) -> list[dict]:
     """
     Extrai texto de um PDF separado por páginas.
     
     Args:
         arquivo_pdf: Objeto de arquivo PDF
+        processos: Processos da extração (ver iterar_paginas_pdf)
     
     Returns:
         Lista de dicionários com {'pagina': int, 'texto': str}
     """
-    try:
-        reader = PdfReader(arquivo_pdf)
-        
-        paginas = []
-        
-        for pagina_num, pagina in enumerate(reader.pages, 1):
-            texto = pagina.extract_text()
-            if texto.strip():
-                paginas.append({
-                    "pagina": pagina_num,
-                    "texto": texto
-                })
-        
-        if not paginas:
-            raise ValueError("PDF não contém texto extraível")
-        
-        return paginas
-    
-    except Exception as e:
-        raise Exception(f"Erro ao extrair texto do PDF: {str(e)}")
+    return list(iterar_paginas_pdf(arquivo_pdf, processos))
 
 
 def obter_info_pdf(arquivo_pdf) -> dict:
@@ -0,0 +1,136 @@
+import hashlib
+import io
+import struct
+import time
+from collections.abc import Iterable
+from itertools import islice
+
+import numpy as np
+import psycopg2.extras
+
+COLUNAS_PADRAO = ("content", "categoria", "embedding")
+
+# Tipo de cada coluna no formato binário do COPY
+TIPOS_COLUNAS = {
+    "content": "text",
+    "categoria": "text",
+    "embedding": "vector",
+    "documento_id": "int8",
+    "pagina": "int4",
+}
+
+_CABECALHO_COPY = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_TRAILER_COPY = struct.pack("!h", -1)
+_NULO = struct.pack("!i", -1)
+
+
+def _codificar_campo(valor, tipo: str) -> bytes:
+    if valor is None:
+        return _NULO
+
+    if tipo == "text":
+        dados = str(valor).encode("utf-8")
+    elif tipo == "vector":
+        # Formato binário do pgvector: int16 dimensões, int16 reservado, float4 big-endian
+        vetor = np.asarray(valor, dtype=">f4")
+        dados = struct.pack("!hh", vetor.shape[0], 0) + vetor.tobytes()
+    elif tipo == "int2":
+        dados = struct.pack("!h", valor)
+    elif tipo == "int4":
+        dados = struct.pack("!i", valor)
+    elif tipo == "int8":
+        dados = struct.pack("!q", valor)
+    elif tipo == "bytea":
+        dados = bytes(valor)
+    else:
+        raise ValueError(f"Tipo de coluna sem codificação binária: {tipo}")
+
+    return struct.pack("!i", len(dados)) + dados
+
+
+def _buffer_copy(linhas: list[tuple], tipos: list[str]) -> io.BytesIO:
+    partes = [_CABECALHO_COPY]
+    quantidade = struct.pack("!h", len(tipos))
+
+    for linha in linhas:
+        partes.append(quantidade)
+        for valor, tipo in zip(linha, tipos):
+            partes.append(_codificar_campo(valor, tipo))
+
+    partes.append(_TRAILER_COPY)
+    return io.BytesIO(b"".join(partes))
+
+
+def hash_conteudo(texto: str) -> str:
+    """Mesmo valor que o trigger grava em content_hash (md5 do texto em UTF-8)."""
+    return hashlib.md5(texto.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+def literal_vetor(valor) -> str:
+    """Representação textual do pgvector ('[x,y,...]') para envio como parâmetro."""
+    return "[" + ",".join(repr(float(x)) for x in valor) + "]"
+
+
+def inserir_em_massa(
+    cursor,
+    linhas: Iterable[tuple],
+    colunas: tuple[str, ...] = COLUNAS_PADRAO,
+    metodo: str = "copy",
+    tamanho_lote: int = 1000,
+    tabela: str = "rag_embeddings",
+    conflito: str = "",
+) -> dict:
+    """
+    Grava linhas em lote, sem commit (a transação fica a cargo de quem chama).
+
+    Args:
+        cursor: Cursor de uma conexão emprestada do pool
+        linhas: Tuplas com os valores na ordem de `colunas`
+        colunas: Colunas de destino; o tipo de cada uma vem de TIPOS_COLUNAS
+        metodo: "copy" (COPY binário) ou "values" (INSERT com VALUES de várias linhas)
+        tamanho_lote: Linhas enviadas por comando
+        tabela: Tabela de destino
+        conflito: Cláusula ON CONFLICT acrescentada ao INSERT (só no método "values")
+
+    Returns:
+        Dicionário com 'linhas' (gravadas), 'segundos' e 'linhas_por_segundo'
+    """
+    if metodo not in ("copy", "values"):
+        raise ValueError(f"Método de inserção inválido: {metodo}")
+    if conflito and metodo != "values":
+        raise ValueError("ON CONFLICT só é suportado no método 'values'")
+
+    tipos = [TIPOS_COLUNAS[coluna] for coluna in colunas]
+    lista_colunas = ", ".join(colunas)
+
+    sql_copy = f"COPY {tabela} ({lista_colunas}) FROM STDIN WITH (FORMAT binary)"
+    sql_values = f"INSERT INTO {tabela} ({lista_colunas}) VALUES %s {conflito}"
+    template = "(" + ", ".join("%s::vector" if tipo == "vector" else "%s" for tipo in tipos) + ")"
+
+    total = 0
+    inicio = time.perf_counter()
+    iterador = iter(linhas)
+
+    while True:
+        lote = list(islice(iterador, tamanho_lote))
+        if not lote:
+            break
+
+        if metodo == "copy":
+            cursor.copy_expert(sql_copy, _buffer_copy(lote, tipos))
+            total += len(lote)
+        else:
+            valores = [
+                tuple(literal_vetor(v) if tipo == "vector" and v is not None else v for v, tipo in zip(linha, tipos))
+                for linha in lote
+            ]
+            psycopg2.extras.execute_values(cursor, sql_values, valores, template=template, page_size=len(lote))
+            # Um único comando por lote: rowcount desconta as linhas ignoradas pelo ON CONFLICT
+            total += cursor.rowcount if cursor.rowcount >= 0 else len(lote)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "linhas": total,
+        "segundos": segundos,
+        "linhas_por_segundo": total / segundos if segundos > 0 else 0.0,
+    }
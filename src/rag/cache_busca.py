@@ -0,0 +1,156 @@
+import copy
+import os
+import threading
+import time
+
+import psycopg2
+from cachetools import TTLCache
+from dotenv import load_dotenv
+
+from src.db.conection import vector_conn
+from src.rag.generate import gerar_embeddings_em_lote
+
+load_dotenv()
+
+# TTL em segundos; 0 desabilita o cache de busca
+TTL_CACHE_BUSCA = float(os.getenv("RAG_CACHE_TTL", "600"))
+MAX_ITENS_CACHE_BUSCA = int(os.getenv("RAG_CACHE_MAX_ITENS", "1000"))
+
+# Segundos em que a geração lida do banco é reaproveitada pelas buscas
+TTL_GERACAO = float(os.getenv("RAG_CACHE_GERACAO_TTL", "1"))
+
+_lock = threading.Lock()
+_embeddings_perguntas = TTLCache(maxsize=MAX_ITENS_CACHE_BUSCA, ttl=TTL_CACHE_BUSCA or 1)
+_resultados = TTLCache(maxsize=MAX_ITENS_CACHE_BUSCA, ttl=TTL_CACHE_BUSCA or 1)
+_geracao: tuple[int, float] | None = None  # (geração, instante da leitura)
+
+
+def cache_habilitado() -> bool:
+    return TTL_CACHE_BUSCA > 0
+
+
+def obter_geracao_corpus(cursor) -> int | None:
+    """
+    Lê a geração atual do corpus (sequência rag_corpus_geracao).
+
+    Returns:
+        A geração, ou None se a sequência ainda não existir (migrações pendentes)
+    """
+    try:
+        cursor.execute("SELECT last_value, is_called FROM rag_corpus_geracao")
+        row = cursor.fetchone()
+        return row["last_value"] if row["is_called"] else 0
+    except psycopg2.Error:
+        cursor.connection.rollback()
+        return None
+
+
+def geracao_recente() -> int | None:
+    """
+    Geração do corpus, relida do banco no máximo a cada RAG_CACHE_GERACAO_TTL s.
+
+    Poupa uma conexão do pool e um round trip por busca, inclusive nos
+    acertos de cache. Escritas deste processo valem na hora
+    (invalidar_cache_busca descarta o valor guardado); as de outros
+    processos aparecem em até RAG_CACHE_GERACAO_TTL segundos.
+
+    Returns:
+        A geração, ou None se a sequência ainda não existir
+    """
+    global _geracao
+
+    with _lock:
+        if _geracao is not None and time.monotonic() - _geracao[1] < TTL_GERACAO:
+            return _geracao[0]
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            geracao = obter_geracao_corpus(cursor)
+        finally:
+            cursor.close()
+
+    if geracao is not None:
+        with _lock:
+            _geracao = (geracao, time.monotonic())
+    return geracao
+
+
+def invalidar_cache_busca(cursor=None):
+    """
+    Avança a geração do corpus, invalidando as buscas em cache de todos os processos.
+
+    Deve ser chamada depois do commit de qualquer escrita em rag_embeddings.
+    nextval não é transacional, então o incremento vale mesmo que a conexão
+    seja usada para outra transação em seguida.
+    """
+    global _geracao
+
+    with _lock:
+        _resultados.clear()
+        _geracao = None
+
+    try:
+        if cursor is not None:
+            try:
+                cursor.execute("SELECT nextval('rag_corpus_geracao')")
+            except psycopg2.Error:
+                cursor.connection.rollback()
+                raise
+            return
+
+        with vector_conn() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT nextval('rag_corpus_geracao')")
+                conn.commit()
+            finally:
+                cursor.close()
+
+    except psycopg2.Error as e:
+        print(f"⚠️ Não foi possível avançar a geração do corpus: {e}")
+
+
+def embeddings_perguntas(perguntas: list[str]) -> list[list[float]]:
+    """Embeddings das perguntas, reaproveitando os gerados recentemente neste processo."""
+    if not cache_habilitado():
+        return gerar_embeddings_em_lote(perguntas)
+
+    with _lock:
+        embeddings = [_embeddings_perguntas.get(pergunta) for pergunta in perguntas]
+
+    faltantes = [pergunta for pergunta, embedding in zip(perguntas, embeddings) if embedding is None]
+    if faltantes:
+        novos = dict(zip(faltantes, gerar_embeddings_em_lote(faltantes)))
+        with _lock:
+            _embeddings_perguntas.update(novos)
+        embeddings = [embedding if embedding is not None else novos[pergunta]
+                      for pergunta, embedding in zip(perguntas, embeddings)]
+
+    return embeddings
+
+
+def obter_resultado(chave: tuple):
+    """Resultado em cache para a chave (que deve incluir a geração do corpus), ou None."""
+    if not cache_habilitado():
+        return None
+    with _lock:
+        resultado = _resultados.get(chave)
+    return copy.deepcopy(resultado) if resultado is not None else None
+
+
+def salvar_resultado(chave: tuple, resultado):
+    if not cache_habilitado():
+        return
+    with _lock:
+        _resultados[chave] = copy.deepcopy(resultado)
+
+
+def limpar_cache_busca():
+    """Esvazia os caches deste processo (não altera a geração do corpus)."""
+    global _geracao
+
+    with _lock:
+        _embeddings_perguntas.clear()
+        _resultados.clear()
+        _geracao = None
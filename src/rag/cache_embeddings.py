@@ -0,0 +1,204 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+BASE_PATH = Path(__file__).resolve().parents[2]
+CAMINHO_PADRAO = BASE_PATH / ".cache" / "embeddings.sqlite3"
+
+# SQLite limita o número de parâmetros por consulta
+_MAX_PARAMETROS = 500
+
+
+def chave_embedding(modelo: str, dimensoes: int | None, texto: str) -> bytes:
+    """Chave de conteúdo: hash de (modelo, dimensões, texto)."""
+    bruto = f"{modelo}\x00{dimensoes or 'nativo'}\x00{texto}".encode("utf-8")
+    return hashlib.sha256(bruto).digest()
+
+
+def _serializar(embedding: list[float]) -> bytes:
+    return array("f", embedding).tobytes()
+
+
+def _desserializar(dados: bytes) -> list[float]:
+    vetor = array("f")
+    vetor.frombytes(dados)
+    return vetor.tolist()
+
+
+class CacheEmbeddings:
+    """
+    Cache persistente de embeddings em SQLite, endereçado por conteúdo.
+
+    Os vetores são guardados como float32 e a política de remoção é LRU,
+    limitada pelo tamanho do arquivo. O modo WAL permite que vários
+    processos do Streamlit leiam e escrevam no mesmo arquivo.
+
+    Args:
+        caminho: Arquivo SQLite do cache
+        max_bytes: Tamanho máximo ocupado pelos dados antes da remoção LRU
+    """
+
+    def __init__(self, caminho: str | Path = CAMINHO_PADRAO, max_bytes: int = 1024 * 1024 * 1024):
+        self.caminho = Path(caminho)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conexao()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                chave BLOB PRIMARY KEY,
+                vetor BLOB NOT NULL,
+                acesso REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_acesso ON embeddings (acesso)")
+        conn.commit()
+
+    def _conexao(self) -> sqlite3.Connection:
+        # Conexões SQLite não podem ser compartilhadas entre threads nem após fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def obter_varios(self, chaves: list[bytes]) -> list[list[float] | None]:
+        """
+        Busca vários embeddings de uma vez, marcando os encontrados como usados.
+
+        Returns:
+            Lista alinhada com `chaves`, com None onde não houve acerto
+        """
+        conn = self._conexao()
+        encontrados = {}
+
+        for inicio in range(0, len(chaves), _MAX_PARAMETROS):
+            parte = chaves[inicio:inicio + _MAX_PARAMETROS]
+            marcadores = ",".join("?" * len(parte))
+            linhas = conn.execute(
+                f"SELECT chave, vetor FROM embeddings WHERE chave IN ({marcadores})", parte
+            ).fetchall()
+            encontrados.update(linhas)
+
+        if encontrados:
+            agora = time.time()
+            conn.executemany(
+                "UPDATE embeddings SET acesso = ? WHERE chave = ?",
+                [(agora, chave) for chave in encontrados]
+            )
+            conn.commit()
+
+        resultado = [
+            _desserializar(encontrados[chave]) if chave in encontrados else None
+            for chave in chaves
+        ]
+
+        acertos = sum(1 for item in resultado if item is not None)
+        with self._lock:
+            self.hits += acertos
+            self.misses += len(chaves) - acertos
+
+        return resultado
+
+    def salvar_varios(self, chaves: list[bytes], embeddings: list[list[float]]):
+        """Grava vários embeddings e aplica a remoção LRU se o limite for excedido."""
+        if not chaves:
+            return
+
+        conn = self._conexao()
+        agora = time.time()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (chave, vetor, acesso) VALUES (?, ?, ?)",
+            [(chave, _serializar(embedding), agora) for chave, embedding in zip(chaves, embeddings)]
+        )
+        conn.commit()
+        self._remover_excedente(conn)
+
+    def _tamanho_bytes(self, conn: sqlite3.Connection) -> int:
+        pagina = conn.execute("PRAGMA page_size").fetchone()[0]
+        total = conn.execute("PRAGMA page_count").fetchone()[0]
+        livres = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return (total - livres) * pagina
+
+    def _remover_excedente(self, conn: sqlite3.Connection):
+        tamanho = self._tamanho_bytes(conn)
+        if tamanho <= self.max_bytes:
+            return
+
+        # Remove os menos usados até ficar em 90% do limite
+        entradas = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        remover = math.ceil(entradas * (1 - 0.9 * self.max_bytes / tamanho))
+        conn.execute(
+            """
+            DELETE FROM embeddings WHERE rowid IN (
+                SELECT rowid FROM embeddings ORDER BY acesso LIMIT ?
+            )
+            """,
+            (remover,)
+        )
+        conn.commit()
+
+    def estatisticas(self) -> dict:
+        """Retorna acertos e falhas deste processo, além do tamanho atual do cache."""
+        conn = self._conexao()
+        entradas = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        consultas = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "taxa_acerto": hits / consultas if consultas else 0.0,
+            "entradas": entradas,
+            "bytes": self._tamanho_bytes(conn),
+        }
+
+    def limpar(self):
+        """Remove todas as entradas do cache."""
+        conn = self._conexao()
+        conn.execute("DELETE FROM embeddings")
+        conn.commit()
+
+
+_cache: CacheEmbeddings | None = None
+_cache_lock = threading.Lock()
+
+
+def get_cache_embeddings() -> CacheEmbeddings | None:
+    """
+    Retorna o cache do processo, ou None se estiver desabilitado.
+
+    Configurado por EMBEDDING_CACHE_PATH (vazio desabilita) e
+    EMBEDDING_CACHE_MAX_MB.
+    """
+    global _cache
+
+    caminho = os.getenv("EMBEDDING_CACHE_PATH", str(CAMINHO_PADRAO))
+    if not caminho:
+        return None
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheEmbeddings(
+                    caminho,
+                    max_bytes=int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+                )
+    return _cache
@@ -0,0 +1,199 @@
+"""
+Divisão de textos em blocos para embedding, usada por todos os caminhos de ingestão.
+
+Estratégias:
+    palavras: blocos de palavras com pelo menos `tamanho` caracteres (comportamento original)
+    sentencas: agrupa sentenças inteiras em blocos de até `tamanho` caracteres
+    paragrafos: agrupa parágrafos inteiros em blocos de até `tamanho` caracteres
+    tokens: blocos de palavras com até `tamanho` tokens (estimados)
+
+Unidades maiores que o limite (uma sentença ou parágrafo enorme) são quebradas
+por palavras, e palavras maiores que o limite, por caracteres. Todas as estratégias consomem e produzem fluxos: só o bloco
+atual e a última unidade incompleta ficam em memória.
+"""
+import re
+from collections.abc import Iterable, Iterator
+
+ESTRATEGIAS = ("palavras", "sentencas", "paragrafos", "tokens")
+
+_FIM_DE_SENTENCA = re.compile(r"(?<=[.!?…])\s+")
+_FIM_DE_PARAGRAFO = re.compile(r"\n\s*\n")
+
+
+def estimar_tokens(texto: str) -> int:
+    """
+    Estimativa conservadora de tokens (cl100k_base fica perto de 4 caracteres
+    por token em português; usar 3 deixa folga para números e siglas).
+    """
+    return len(texto) // 3 + 1
+
+
+def _caracteres_por_tokens(tokens: int) -> int:
+    """Maior texto (em caracteres) cuja estimativa de estimar_tokens cabe em `tokens`."""
+    caracteres = max(tokens, 0) * 3
+    while caracteres > 0 and estimar_tokens("x" * caracteres) > tokens:
+        caracteres -= 1
+    return caracteres
+
+
+def _palavras(textos: Iterable[str], limite: int | None = None) -> Iterator[str]:
+    for texto in textos:
+        if limite is None:
+            yield from texto.split()
+        else:
+            yield from _palavras_limitadas(texto, limite)
+
+
+def _palavras_limitadas(texto: str, limite: int) -> Iterator[str]:
+    """Palavras de `texto`; as maiores que `limite` (URLs, base64...) são cortadas por caracteres."""
+    for palavra in texto.split():
+        if len(palavra) <= limite:
+            yield palavra
+        else:
+            for inicio in range(0, len(palavra), limite):
+                yield palavra[inicio:inicio + limite]
+
+
+def _unidades(textos: Iterable[str], separador: re.Pattern, limite: int) -> Iterator[str]:
+    """
+    Sentenças ou parágrafos de um fluxo de textos, inclusive os que cruzam a
+    fronteira entre dois textos.
+
+    Uma unidade ainda incompleta maior que `limite` seria quebrada por
+    palavras de qualquer forma; ela sai sem a última palavra (que pode
+    continuar no próximo texto), para o resto não crescer sem limite nem ser
+    dividido de novo a cada texto.
+    """
+    resto = ""
+    for texto in textos:
+        partes = separador.split(f"{resto}\n{texto}" if resto else texto)
+        resto = partes.pop()
+        for parte in partes:
+            if parte.strip():
+                yield " ".join(parte.split())
+
+        if len(resto) > limite:
+            palavras = resto.split()
+            if len(palavras) > 1:
+                yield " ".join(palavras[:-1])
+                resto = palavras[-1]
+    if resto.strip():
+        yield " ".join(resto.split())
+
+
+def _blocos_de_palavras(palavras: Iterable[str], tamanho: int, sobreposicao: int) -> Iterator[str]:
+    """Emite um bloco assim que ele atinge `tamanho` caracteres."""
+    atual = []
+    comprimento = 0
+    novas = 0  # palavras do bloco atual que não vieram da sobreposição
+
+    for palavra in palavras:
+        # Comprimento de " ".join(atual) mantido de forma incremental
+        comprimento += len(palavra) + (1 if atual else 0)
+        atual.append(palavra)
+        novas += 1
+        if comprimento >= tamanho:
+            yield " ".join(atual)
+            atual, comprimento = _cauda(atual, sobreposicao, 1)
+            novas = 0
+
+    if novas:
+        yield " ".join(atual)
+
+
+def _cauda(unidades: list[str], sobreposicao: int, separador: int) -> tuple[list[str], int]:
+    """Últimas unidades que somam até `sobreposicao` caracteres, para o início do próximo bloco."""
+    cauda = []
+    comprimento = 0
+    for unidade in reversed(unidades):
+        acrescimo = len(unidade) + (separador if cauda else 0)
+        if comprimento + acrescimo > sobreposicao:
+            break
+        cauda.append(unidade)
+        comprimento += acrescimo
+    cauda.reverse()
+    return cauda, comprimento
+
+
+def _empacotar(
+    unidades: Iterable[str],
+    limite: int,
+    sobreposicao: int,
+    separador: str,
+) -> Iterator[str]:
+    """Agrupa unidades inteiras em blocos de até `limite` caracteres."""
+    atual = []
+    comprimento = 0
+
+    for unidade in unidades:
+        if len(unidade) > limite:
+            # Unidade maior que o limite: quebra por palavras, que já vêm
+            # no máximo com `limite` caracteres (a chamada não volta aqui)
+            pedacos = _empacotar(_palavras_limitadas(unidade, limite), limite, 0, " ")
+        else:
+            pedacos = (unidade,)
+
+        for pedaco in pedacos:
+            if atual and comprimento + len(separador) + len(pedaco) > limite:
+                yield separador.join(atual)
+                atual, comprimento = _cauda(atual, sobreposicao, len(separador))
+                if atual and comprimento + len(separador) + len(pedaco) > limite:
+                    atual, comprimento = [], 0
+
+            comprimento += (len(separador) if atual else 0) + len(pedaco)
+            atual.append(pedaco)
+
+    if atual:
+        yield separador.join(atual)
+
+
+def iterar_blocos(
+    textos: Iterable[str] | str,
+    tamanho: int = 800,
+    sobreposicao: int = 0,
+    estrategia: str = "palavras",
+) -> Iterator[str]:
+    """
+    Divide um texto ou um fluxo de textos (ex.: páginas de um PDF) em blocos.
+
+    Os textos são tratados como partes consecutivas de um mesmo documento:
+    palavras, sentenças e parágrafos continuam através das fronteiras.
+
+    Args:
+        textos: Texto único, lista ou iterador de textos
+        tamanho: Tamanho do bloco (caracteres; tokens na estratégia "tokens")
+        sobreposicao: Quanto do fim de um bloco é repetido no início do próximo,
+            na mesma unidade de `tamanho` (sempre em unidades inteiras)
+        estrategia: Uma de ESTRATEGIAS
+
+    Yields:
+        Blocos de texto
+    """
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f"Estratégia de divisão inválida: {estrategia}")
+    if tamanho <= 0 or not 0 <= sobreposicao < tamanho:
+        raise ValueError("A sobreposição deve ser menor que o tamanho do bloco")
+
+    if isinstance(textos, str):
+        textos = (textos,)
+
+    if estrategia == "palavras":
+        # Sem o corte, uma palavra enorme viraria um bloco inteiro além do limite da API
+        return _blocos_de_palavras(_palavras(textos, tamanho), tamanho, sobreposicao)
+    if estrategia == "tokens":
+        return _empacotar(
+            _palavras(textos), _caracteres_por_tokens(tamanho), _caracteres_por_tokens(sobreposicao), " "
+        )
+    if estrategia == "sentencas":
+        return _empacotar(_unidades(textos, _FIM_DE_SENTENCA, tamanho), tamanho, sobreposicao, " ")
+    return _empacotar(_unidades(textos, _FIM_DE_PARAGRAFO, tamanho), tamanho, sobreposicao, "\n\n")
+
+
+def dividir_em_blocos(
+    texto: str,
+    tamanho: int = 800,
+    sobreposicao: int = 0,
+    estrategia: str = "palavras",
+) -> list[str]:
+    """Versão em lista de iterar_blocos, para textos que já estão em memória."""
+    return list(iterar_blocos(texto, tamanho, sobreposicao, estrategia))
@@ -1,63 +1,168 @@
-from src.db.conection import get_vector_conn
+import os
+import time
+from collections.abc import Callable
+
+from src.db.conection import vector_conn
+from src.db.schema import manter_tabela
+from src.rag.cache_busca import invalidar_cache_busca
+
+# Linhas apagadas por transação na exclusão de categoria
+TAMANHO_LOTE_EXCLUSAO = int(os.getenv("RAG_LOTE_EXCLUSAO", "2000"))
+
+MANUTENCOES = ("vacuum", "reindex")
+
+# Caracteres de conteúdo devolvidos pelas listagens; o texto completo vem de
+# obter_embedding_por_id. Um caractere a mais indica que houve corte.
+TAMANHO_PREVIA = 100
+
+_COLUNAS_LISTAGEM = f"id, categoria, created_at, left(content, {TAMANHO_PREVIA + 1}) AS previa"
+
+
+def _item_listagem(row) -> dict:
+    previa = row["previa"]
+    if len(previa) > TAMANHO_PREVIA:
+        previa = previa[:TAMANHO_PREVIA] + "..."
+    return {
+        "id": row["id"],
+        "categoria": row["categoria"],
+        "previa": previa,
+        "created_at": row["created_at"]
+    }
 
 
 def listar_embeddings(categoria: str | None = None, limite: int = 100):
     """
-    Lista embeddings do banco de dados.
+    Lista embeddings do banco de dados, sem o conteúdo completo.
     
     Args:
         categoria: Filtro opcional por categoria
         limite: Número máximo de resultados
     
     Returns:
-        Lista de dicionários com dados dos embeddings
+        Lista de dicionários com 'id', 'categoria', 'previa' (início do
+        conteúdo, calculado no banco) e 'created_at'
     """
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    try:
-        if categoria:
-            sql = """
-                SELECT id, content, categoria, created_at
-                FROM rag_embeddings
-                WHERE categoria = %s
-                ORDER BY created_at DESC
-                LIMIT %s
-            """
-            cursor.execute(sql, (categoria, limite))
-        else:
-            sql = """
-                SELECT id, content, categoria, created_at
-                FROM rag_embeddings
-                ORDER BY created_at DESC
-                LIMIT %s
-            """
-            cursor.execute(sql, (limite,))
+    with vector_conn() as conn:
+        cursor = conn.cursor()
         
-        resultados = cursor.fetchall()
+        try:
+            if categoria:
+                sql = f"""
+                    SELECT {_COLUNAS_LISTAGEM}
+                    FROM rag_embeddings
+                    WHERE categoria = %s
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """
+                cursor.execute(sql, (categoria, limite))
+            else:
+                sql = f"""
+                    SELECT {_COLUNAS_LISTAGEM}
+                    FROM rag_embeddings
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """
+                cursor.execute(sql, (limite,))
+            
+            return [_item_listagem(row) for row in cursor.fetchall()]
         
-        return [
-            {
-                "id": row["id"],
-                "content": row["content"],
-                "categoria": row["categoria"],
-                "created_at": row["created_at"]
-            }
-            for row in resultados
-        ]
-    
-    except Exception as e:
-        print(f"❌ Erro ao listar embeddings: {e}")
-        return []
-    
-    finally:
-        cursor.close()
-        conn.close()
+        except Exception as e:
+            print(f"❌ Erro ao listar embeddings: {e}")
+            return []
+        
+        finally:
+            cursor.close()
+
+
+def listar_embeddings_pagina(
+    categoria: str | None = None,
+    tamanho: int = 100,
+    apos: tuple | None = None,
+) -> dict:
+    """
+    Lista uma página de embeddings, do mais recente para o mais antigo.
+
+    Paginação por cursor (keyset) em (created_at, id): a página seguinte
+    começa logo após a última linha da anterior, sem OFFSET, então qualquer
+    página custa uma leitura curta do índice, por mais fundo que esteja.
+
+    Args:
+        categoria: Filtro opcional por categoria
+        tamanho: Registros por página
+        apos: Cursor (created_at, id) devolvido em 'proximo' pela página anterior;
+            None para a primeira página
+
+    Returns:
+        Dicionário com 'itens' (como listar_embeddings) e 'proximo' (cursor da
+        página seguinte, ou None se esta for a última)
+    """
+    condicoes = []
+    parametros = {"limite": tamanho + 1}
+    if categoria:
+        condicoes.append("categoria = %(categoria)s")
+        parametros["categoria"] = categoria
+    if apos is not None:
+        condicoes.append("(created_at, id) < (%(created_at)s, %(id)s)")
+        parametros["created_at"], parametros["id"] = apos
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(f"""
+                SELECT {_COLUNAS_LISTAGEM}
+                FROM rag_embeddings
+                {"WHERE " + " AND ".join(condicoes) if condicoes else ""}
+                ORDER BY created_at DESC, id DESC
+                LIMIT %(limite)s
+            """, parametros)
+            resultados = cursor.fetchall()
+
+            itens = [_item_listagem(row) for row in resultados[:tamanho]]
+            # A linha extra só indica que existe uma próxima página
+            proximo = (itens[-1]["created_at"], itens[-1]["id"]) if len(resultados) > tamanho else None
+            return {"itens": itens, "proximo": proximo}
+
+        except Exception as e:
+            print(f"❌ Erro ao listar embeddings: {e}")
+            return {"itens": [], "proximo": None}
+
+        finally:
+            cursor.close()
+
+
+def obter_embedding_por_id(embedding_id) -> dict | None:
+    """
+    Busca um embedding com o conteúdo completo (as listagens trazem só a prévia).
+
+    Args:
+        embedding_id: ID do embedding
+
+    Returns:
+        Dicionário com 'id', 'content', 'categoria' e 'created_at', ou None se não existir
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                "SELECT id, content, categoria, created_at FROM rag_embeddings WHERE id = %s",
+                (embedding_id,)
+            )
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+        except Exception as e:
+            print(f"❌ Erro ao buscar embedding: {e}")
+            return None
+
+        finally:
+            cursor.close()
 
 
 def contar_embeddings(categoria: str | None = None):
     """
-    Conta total de embeddings no banco.
+    Conta total de embeddings no banco (lido do catálogo de categorias).
     
     Args:
         categoria: Filtro opcional por categoria
@@ -65,57 +170,176 @@ def contar_embeddings(categoria: str | None = None):
     Returns:
         Número total de embeddings
     """
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    try:
-        if categoria:
-            sql = "SELECT COUNT(*) as total FROM rag_embeddings WHERE categoria = %s"
-            cursor.execute(sql, (categoria,))
-        else:
-            sql = "SELECT COUNT(*) as total FROM rag_embeddings"
-            cursor.execute(sql)
+    with vector_conn() as conn:
+        cursor = conn.cursor()
         
-        resultado = cursor.fetchone()
-        return resultado["total"] if resultado else 0
-    
-    except Exception as e:
-        print(f"❌ Erro ao contar embeddings: {e}")
-        return 0
-    
-    finally:
-        cursor.close()
-        conn.close()
+        try:
+            if categoria:
+                sql = "SELECT total FROM rag_categorias_stats_atuais WHERE categoria = %s"
+                cursor.execute(sql, (categoria,))
+            else:
+                sql = "SELECT COALESCE(SUM(total), 0)::bigint as total FROM rag_categorias_stats_atuais"
+                cursor.execute(sql)
+            
+            resultado = cursor.fetchone()
+            return resultado["total"] if resultado else 0
+        
+        except Exception as e:
+            print(f"❌ Erro ao contar embeddings: {e}")
+            return 0
+        
+        finally:
+            cursor.close()
+
+
+def listar_estatisticas_categorias() -> list[dict]:
+    """
+    Lista as categorias com total de trechos e primeiro/último registro.
+
+    Returns:
+        Lista de dicionários com 'categoria', 'total', 'primeiro_registro' e
+        'ultimo_registro', em ordem de categoria
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                SELECT categoria, total, primeiro_registro, ultimo_registro
+                FROM rag_categorias_stats_atuais
+                ORDER BY categoria
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            print(f"❌ Erro ao listar estatísticas por categoria: {e}")
+            return []
+
+        finally:
+            cursor.close()
+
+
+def consolidar_estatisticas() -> int:
+    """
+    Soma no catálogo rag_categorias_stats as variações acumuladas pelos
+    triggers de rag_embeddings (ver rag_stats_consolidar). Os workers
+    chamam entre um job e outro; as leituras já enxergam as pendentes.
+
+    Returns:
+        Número de categorias atualizadas
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("SELECT rag_stats_consolidar() AS categorias")
+            categorias = cursor.fetchone()["categorias"]
+            conn.commit()
+            return categorias
+
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Erro ao consolidar estatísticas: {e}")
+            return 0
+
+        finally:
+            cursor.close()
 
 
 def listar_categorias():
     """
-    Lista todas as categorias únicas no banco.
+    Lista todas as categorias únicas no banco (catálogo de categorias).
     
     Returns:
         Lista de strings com nomes das categorias
     """
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    try:
-        sql = """
-            SELECT DISTINCT categoria 
-            FROM rag_embeddings 
-            ORDER BY categoria
-        """
-        cursor.execute(sql)
+    with vector_conn() as conn:
+        cursor = conn.cursor()
         
-        resultados = cursor.fetchall()
-        return [row["categoria"] for row in resultados]
-    
-    except Exception as e:
-        print(f"❌ Erro ao listar categorias: {e}")
-        return []
-    
-    finally:
-        cursor.close()
-        conn.close()
+        try:
+            sql = """
+                SELECT categoria
+                FROM rag_categorias_stats_atuais
+                ORDER BY categoria
+            """
+            cursor.execute(sql)
+            
+            resultados = cursor.fetchall()
+            return [row["categoria"] for row in resultados]
+        
+        except Exception as e:
+            print(f"❌ Erro ao listar categorias: {e}")
+            return []
+        
+        finally:
+            cursor.close()
+
+
+def _deletar_onde(condicao: str, parametros: dict, documento_id: int | None = None) -> int:
+    """
+    Deleta, num único comando, os embeddings que atendem `condicao`.
+
+    As páginas de origem (o dono do trecho e as demais que o usam, ver
+    rag_documento_trechos) saem do registro de documentos para que o próximo
+    upload do arquivo volte a gerar os trechos removidos. Com `documento_id`,
+    o próprio documento sai do registro no mesmo comando; antes, os trechos
+    dele que outros documentos também usam passam para um desses documentos.
+
+    Returns:
+        Número de embeddings deletados
+    """
+    remover_documento = """, documento AS (
+            DELETE FROM rag_documentos WHERE id = %(documento_id)s
+        )""" if documento_id is not None else ""
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            if documento_id is not None:
+                cursor.execute("""
+                    UPDATE rag_embeddings e
+                    SET documento_id = t.documento_id, pagina = t.pagina
+                    FROM rag_documento_trechos t
+                    JOIN rag_documentos d ON d.id = t.documento_id
+                    WHERE e.documento_id = %(documento_id)s
+                      AND t.documento_id <> %(documento_id)s
+                      AND d.categoria = e.categoria
+                      AND t.content_hash = e.content_hash
+                """, {"documento_id": documento_id})
+
+            cursor.execute(f"""
+                WITH removido AS (
+                    DELETE FROM rag_embeddings WHERE {condicao}
+                    RETURNING categoria, content_hash, documento_id, pagina
+                ), pagina AS (
+                    DELETE FROM rag_documento_paginas p
+                    USING removido r
+                    WHERE (p.documento_id = r.documento_id AND p.pagina = r.pagina)
+                       OR EXISTS (
+                           SELECT 1
+                           FROM rag_documento_trechos t
+                           JOIN rag_documentos d ON d.id = t.documento_id
+                           WHERE t.documento_id = p.documento_id
+                             AND t.pagina = p.pagina
+                             AND t.content_hash = r.content_hash
+                             AND d.categoria = r.categoria
+                       )
+                ){remover_documento}
+                SELECT COUNT(*) AS removidos FROM removido
+            """, {**parametros, "documento_id": documento_id})
+            removidos = cursor.fetchone()["removidos"]
+            conn.commit()
+            if removidos:
+                invalidar_cache_busca(cursor)
+            return removidos
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
 
 
 def deletar_embedding_por_id(embedding_id):
@@ -128,29 +352,232 @@ def deletar_embedding_por_id(embedding_id):
     Returns:
         True se deletado com sucesso, False caso contrário
     """
-    conn = get_vector_conn()
-    cursor = conn.cursor()
+    return deletar_embeddings_por_ids([embedding_id]) > 0
+
+
+def deletar_embeddings_por_ids(ids: list) -> int:
+    """
+    Deleta vários embeddings por ID, num único comando e numa única transação.
     
+    Args:
+        ids: IDs dos embeddings (int ou UUID string)
+    
+    Returns:
+        Número de embeddings deletados
+    """
+    if not ids:
+        return 0
+
+    # psycopg2 envia listas de str como text[]; UUIDs precisam do cast
+    ids = [int(i) if isinstance(i, str) and i.isdigit() else i for i in ids]
+    conversao = "::uuid[]" if any(isinstance(i, str) for i in ids) else ""
+
     try:
-        sql = "DELETE FROM rag_embeddings WHERE id = %s"
-        cursor.execute(sql, (embedding_id,))
-        conn.commit()
-        
-        return cursor.rowcount > 0
+        return _deletar_onde(f"id = ANY(%(ids)s{conversao})", {"ids": ids})
+
+    except Exception as e:
+        print(f"❌ Erro ao deletar embeddings: {e}")
+        return 0
+
+
+def deletar_embeddings_por_periodo(inicio, fim, categoria: str | None = None) -> int:
+    """
+    Deleta os embeddings criados em [inicio, fim), num único comando.
+    
+    Args:
+        inicio: Data/hora inicial (inclusiva)
+        fim: Data/hora final (exclusiva)
+        categoria: Filtro opcional por categoria
+    
+    Returns:
+        Número de embeddings deletados
+    """
+    condicao = "created_at >= %(inicio)s AND created_at < %(fim)s"
+    if categoria:
+        condicao += " AND categoria = %(categoria)s"
+
+    try:
+        return _deletar_onde(condicao, {"inicio": inicio, "fim": fim, "categoria": categoria})
+
+    except Exception as e:
+        print(f"❌ Erro ao deletar embeddings por período: {e}")
+        return 0
+
+
+def deletar_embeddings_por_documento(documento_id: int) -> int:
+    """
+    Deleta os embeddings de um documento e o remove do registro, num único comando.
+    
+    Args:
+        documento_id: ID em rag_documentos (ver listar_documentos)
     
+    Returns:
+        Número de embeddings deletados
+    """
+    try:
+        return _deletar_onde("documento_id = %(documento_id)s", {}, documento_id=documento_id)
+
     except Exception as e:
-        conn.rollback()
-        print(f"❌ Erro ao deletar embedding: {e}")
-        return False
+        print(f"❌ Erro ao deletar embeddings do documento: {e}")
+        return 0
+
+
+def listar_documentos(categoria: str | None = None) -> list[dict]:
+    """
+    Lista os documentos registrados (arquivos ingeridos por página).
+    
+    Args:
+        categoria: Filtro opcional por categoria
     
-    finally:
-        cursor.close()
-        conn.close()
+    Returns:
+        Lista de dicionários com 'id', 'categoria', 'arquivo', 'total_paginas'
+        e 'atualizado_em'
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            filtro = "WHERE categoria = %s" if categoria else ""
+            cursor.execute(f"""
+                SELECT id, categoria, arquivo, total_paginas, atualizado_em
+                FROM rag_documentos
+                {filtro}
+                ORDER BY categoria, arquivo
+            """, (categoria,) if categoria else None)
+            return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            print(f"❌ Erro ao listar documentos: {e}")
+            return []
+
+        finally:
+            cursor.close()
+
+
+def _sql_lote_exclusao(com_cursor: bool) -> str:
+    # Percorre a categoria do mais novo para o mais antigo pelo índice
+    # (categoria, created_at, id); começar abaixo do último lote evita
+    # reler as entradas de índice das linhas já apagadas (mortas até o VACUUM).
+    # A página de origem sai do registro de documentos, como em
+    # deletar_embedding_por_id.
+    cursor_lote = "AND (created_at, id) < (%(created_at)s, %(id)s)" if com_cursor else ""
+    return f"""
+        WITH lote AS (
+            SELECT id FROM rag_embeddings
+            WHERE categoria = %(categoria)s {cursor_lote}
+            ORDER BY created_at DESC, id DESC
+            LIMIT %(tamanho)s
+        ), removido AS (
+            DELETE FROM rag_embeddings e
+            USING lote
+            WHERE e.id = lote.id
+            RETURNING e.id, e.created_at, e.documento_id, e.pagina
+        ), pagina AS (
+            DELETE FROM rag_documento_paginas p
+            USING removido r
+            WHERE p.documento_id = r.documento_id AND p.pagina = r.pagina
+        )
+        SELECT count(*) OVER () AS removidos, created_at, id
+        FROM removido
+        ORDER BY created_at, id
+        LIMIT 1
+    """
+
+
+def deletar_categoria_em_lotes(
+    categoria: str,
+    tamanho_lote: int | None = None,
+    ao_progredir: Callable[[int], None] | None = None,
+    cancelado: Callable[[], bool] | None = None,
+    manutencao: str | None = None,
+) -> dict:
+    """
+    Deleta os embeddings de uma categoria em lotes, cada um na sua transação.
+
+    Transações curtas não seguram travas nem atrasam as buscas concorrentes
+    por muito tempo; cada lote já commitado fica valendo mesmo se a exclusão
+    for cancelada ou falhar no meio. Linhas gravadas na categoria durante a
+    exclusão também saem: ela só termina quando uma passada desde a linha
+    mais nova não encontra mais nada.
+
+    Args:
+        categoria: Nome da categoria a ser deletada
+        tamanho_lote: Linhas por transação (padrão: RAG_LOTE_EXCLUSAO)
+        ao_progredir: Callback com o total de linhas removidas após cada lote
+        cancelado: Consultado antes de cada lote; True interrompe a exclusão
+        manutencao: None, "vacuum" ou "reindex" (VACUUM + REINDEX dos índices
+            vetoriais), executada no fim se algo foi removido
+
+    Returns:
+        Dicionário com 'removidos', 'lotes', 'segundos', 'cancelado' e
+        'indices_reconstruidos'
+    """
+    if manutencao is not None and manutencao not in MANUTENCOES:
+        raise ValueError(f"Manutenção inválida: {manutencao}")
+
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE_EXCLUSAO
+    resultado = {"removidos": 0, "lotes": 0, "segundos": 0.0, "cancelado": False, "indices_reconstruidos": []}
+    inicio = time.perf_counter()
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            parametros = {"categoria": categoria, "tamanho": tamanho_lote}
+            com_cursor = False
+
+            while True:
+                if cancelado and cancelado():
+                    resultado["cancelado"] = True
+                    break
+
+                cursor.execute(_sql_lote_exclusao(com_cursor), parametros)
+                row = cursor.fetchone()
+                conn.commit()
+                if row is None:
+                    if not com_cursor:
+                        break
+                    # O cursor desce do mais novo para o mais antigo: linhas
+                    # gravadas durante a exclusão ficam acima dele. Recomeça
+                    # do topo até uma passada sem cursor não achar nada.
+                    com_cursor = False
+                    continue
+
+                resultado["removidos"] += row["removidos"]
+                resultado["lotes"] += 1
+                parametros["created_at"], parametros["id"] = row["created_at"], row["id"]
+                com_cursor = True
+                invalidar_cache_busca(cursor)
+
+                if ao_progredir:
+                    ao_progredir(resultado["removidos"])
+
+            if not resultado["cancelado"]:
+                # ON DELETE CASCADE só alcança trechos ligados a um documento;
+                # os gravados durante a exclusão já saíram nas passadas acima
+                cursor.execute("DELETE FROM rag_documentos WHERE categoria = %s", (categoria,))
+                conn.commit()
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+    if manutencao and resultado["removidos"]:
+        resultado["indices_reconstruidos"] = manter_tabela(reindexar=manutencao == "reindex")
+
+    resultado["segundos"] = time.perf_counter() - inicio
+    return resultado
 
 
 def deletar_embeddings_por_categoria(categoria: str):
     """
     Deleta todos os embeddings de uma categoria.
+
+    Para categorias grandes, prefira o job "exclusao_categoria" (progresso e
+    cancelamento); ambos usam deletar_categoria_em_lotes.
     
     Args:
         categoria: Nome da categoria a ser deletada
@@ -158,73 +585,99 @@ def deletar_embeddings_por_categoria(categoria: str):
     Returns:
         Número de embeddings deletados
     """
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
     try:
-        sql = "DELETE FROM rag_embeddings WHERE categoria = %s"
-        cursor.execute(sql, (categoria,))
-        conn.commit()
-        
-        return cursor.rowcount
-    
+        return deletar_categoria_em_lotes(categoria)["removidos"]
+
     except Exception as e:
-        conn.rollback()
         print(f"❌ Erro ao deletar embeddings por categoria: {e}")
         return 0
-    
-    finally:
-        cursor.close()
-        conn.close()
 
 
 def obter_estatisticas():
     """
     Obtém estatísticas gerais dos embeddings.
+
+    Lê o catálogo rag_categorias_stats_atuais, mantido por triggers em
+    rag_embeddings: custa uma linha por categoria (mais as variações ainda
+    não consolidadas), não uma por trecho.
     
     Returns:
         Dicionário com estatísticas
     """
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-    
-    try:
-        sql = """
-            SELECT 
-                COUNT(*) as total,
-                COUNT(DISTINCT categoria) as total_categorias,
-                MIN(created_at) as primeiro_registro,
-                MAX(created_at) as ultimo_registro
-            FROM rag_embeddings
-        """
-        cursor.execute(sql)
+    with vector_conn() as conn:
+        cursor = conn.cursor()
         
-        resultado = cursor.fetchone()
+        try:
+            sql = """
+                SELECT 
+                    COALESCE(SUM(total), 0)::bigint as total,
+                    COUNT(*) as total_categorias,
+                    MIN(primeiro_registro) as primeiro_registro,
+                    MAX(ultimo_registro) as ultimo_registro
+                FROM rag_categorias_stats_atuais
+            """
+            cursor.execute(sql)
+            
+            resultado = cursor.fetchone()
+            
+            if resultado:
+                return {
+                    "total": resultado["total"],
+                    "total_categorias": resultado["total_categorias"],
+                    "primeiro_registro": resultado["primeiro_registro"],
+                    "ultimo_registro": resultado["ultimo_registro"]
+                }
+            
+            return {
+                "total": 0,
+                "total_categorias": 0,
+                "primeiro_registro": None,
+                "ultimo_registro": None
+            }
         
-        if resultado:
+        except Exception as e:
+            print(f"❌ Erro ao obter estatísticas: {e}")
             return {
-                "total": resultado["total"],
-                "total_categorias": resultado["total_categorias"],
-                "primeiro_registro": resultado["primeiro_registro"],
-                "ultimo_registro": resultado["ultimo_registro"]
+                "total": 0,
+                "total_categorias": 0,
+                "primeiro_registro": None,
+                "ultimo_registro": None
             }
         
-        return {
-            "total": 0,
-            "total_categorias": 0,
-            "primeiro_registro": None,
-            "ultimo_registro": None
-        }
-    
-    except Exception as e:
-        print(f"❌ Erro ao obter estatísticas: {e}")
-        return {
-            "total": 0,
-            "total_categorias": 0,
-            "primeiro_registro": None,
-            "ultimo_registro": None
-        }
-    
-    finally:
-        cursor.close()
-        conn.close()
\ No newline at end of file
+        finally:
+            cursor.close()
+
+
+def listar_dimensoes() -> list[int]:
+    """
+    Lista as larguras de vetor presentes no corpus.
+
+    Mais de um valor indica corpus misturado (EMBEDDING_DIMENSOES alterado
+    sem reprocessar os embeddings antigos). Percorre o índice de
+    embedding_dim pulando de valor em valor, sem ler a tabela inteira.
+
+    Returns:
+        Dimensões distintas em ordem crescente
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("""
+                WITH RECURSIVE dimensoes AS (
+                    SELECT min(embedding_dim) AS dim FROM rag_embeddings
+                    UNION ALL
+                    SELECT (SELECT min(embedding_dim) FROM rag_embeddings WHERE embedding_dim > dimensoes.dim)
+                    FROM dimensoes
+                    WHERE dimensoes.dim IS NOT NULL
+                )
+                SELECT dim FROM dimensoes WHERE dim IS NOT NULL
+            """)
+            return [row["dim"] for row in cursor.fetchall()]
+
+        except Exception as e:
+            print(f"❌ Erro ao listar dimensões: {e}")
+            return []
+
+        finally:
+            cursor.close()
@@ -0,0 +1,324 @@
+import json
+import os
+from collections.abc import Callable, Iterable
+
+from src.db.conection import vector_conn
+from src.rag.bulk import hash_conteudo
+from src.rag.cache_busca import invalidar_cache_busca
+from src.rag.chunking import iterar_blocos
+from src.rag.pipeline import ingerir_na_transacao
+
+# Blocos acumulados (em páginas inteiras) antes de cada commit
+BLOCOS_POR_CHECKPOINT = int(os.getenv("RAG_BLOCOS_POR_CHECKPOINT", "512"))
+
+
+def hash_pagina(texto: str, divisao: dict | None = None) -> str:
+    """
+    Hash de uma página para detectar mudanças entre uploads.
+
+    Os parâmetros de divisão entram no hash: mudar o tamanho ou a estratégia
+    dos blocos também conta como mudança e a página é dividida de novo.
+    """
+    parametros = json.dumps(divisao or {}, sort_keys=True)
+    return hash_conteudo(parametros + "\n" + " ".join(texto.split()))
+
+
+def _somar_resultados(total: dict, parcial: dict):
+    for chave in ("linhas", "reaproveitados", "segundos", "limites_atingidos"):
+        total[chave] += parcial[chave]
+
+
+def _trocar_trechos(
+    cursor,
+    documento_id: int,
+    categoria: str,
+    paginas: list[int],
+    trechos: list[tuple[int, str]],
+) -> int:
+    """
+    Troca os trechos registrados de `paginas` por `trechos` ((página, content_hash)).
+
+    Um trecho é guardado uma vez por categoria, mesmo que várias páginas o
+    usem. Um trecho antigo só sai de rag_embeddings quando nenhuma página
+    (deste ou de outro documento da categoria) o usa mais; os que continuam
+    em uso passam a ter como dono uma página que ainda os usa.
+
+    Returns:
+        Número de trechos apagados
+    """
+    # Reingestões da categoria se alternam só neste passo final (a trava
+    # dura até o commit do grupo), não durante a geração dos embeddings
+    cursor.execute(
+        "SELECT pg_advisory_xact_lock(hashtext('rag_documento_trechos'), hashtext(%s))",
+        (categoria,)
+    )
+    cursor.execute(
+        "DELETE FROM rag_documento_trechos WHERE documento_id = %s AND pagina = ANY(%s) RETURNING content_hash",
+        (documento_id, paginas)
+    )
+    antigos = sorted({row["content_hash"] for row in cursor.fetchall()})
+
+    if trechos:
+        cursor.execute("""
+            INSERT INTO rag_documento_trechos (documento_id, pagina, content_hash)
+            SELECT %s, pagina, content_hash
+            FROM unnest(%s::int[], %s::text[]) AS t (pagina, content_hash)
+            ON CONFLICT DO NOTHING
+        """, (documento_id, [pagina for pagina, _ in trechos], [hash_ for _, hash_ in trechos]))
+
+    if not antigos:
+        return 0
+
+    parametros = {"categoria": categoria, "antigos": antigos}
+    cursor.execute("""
+        DELETE FROM rag_embeddings e
+        WHERE e.categoria = %(categoria)s
+          AND e.content_hash = ANY(%(antigos)s)
+          AND NOT EXISTS (
+              SELECT 1
+              FROM rag_documento_trechos t
+              JOIN rag_documentos d ON d.id = t.documento_id
+              WHERE d.categoria = e.categoria AND t.content_hash = e.content_hash
+          )
+    """, parametros)
+    removidos = cursor.rowcount
+
+    cursor.execute("""
+        UPDATE rag_embeddings e
+        SET documento_id = t.documento_id, pagina = t.pagina
+        FROM rag_documento_trechos t
+        JOIN rag_documentos d ON d.id = t.documento_id
+        WHERE e.categoria = %(categoria)s
+          AND e.content_hash = ANY(%(antigos)s)
+          AND d.categoria = e.categoria
+          AND t.content_hash = e.content_hash
+          AND NOT EXISTS (
+              SELECT 1 FROM rag_documento_trechos dono
+              WHERE dono.documento_id = e.documento_id
+                AND dono.pagina = e.pagina
+                AND dono.content_hash = e.content_hash
+          )
+    """, parametros)
+    return removidos
+
+
+def _hashes_ausentes(cursor, categoria: str, hashes: list[str]) -> set[str]:
+    """Hashes que não estão em rag_embeddings na categoria."""
+    cursor.execute("""
+        SELECT h.content_hash
+        FROM unnest(%s::text[]) AS h (content_hash)
+        WHERE NOT EXISTS (
+            SELECT 1 FROM rag_embeddings e
+            WHERE e.categoria = %s AND e.content_hash = h.content_hash
+        )
+    """, (hashes, categoria))
+    return {row["content_hash"] for row in cursor.fetchall()}
+
+
+def reingerir_documento(
+    paginas: Iterable[dict],
+    categoria: str,
+    arquivo: str,
+    divisao: dict | None = None,
+    max_workers: int | None = None,
+    ao_progredir: Callable[[int, int | None], None] | None = None,
+    blocos_por_checkpoint: int | None = None,
+) -> dict:
+    """
+    Ingere um documento registrado por arquivo, reprocessando só as páginas que mudaram.
+
+    O registro (rag_documentos / rag_documento_paginas) guarda o hash de cada
+    página do último upload, e rag_documento_trechos os trechos que cada
+    página usa. Páginas com o mesmo hash são puladas; páginas alteradas são
+    divididas e embeddadas de novo; trechos que nenhuma página usa mais são
+    apagados (um trecho repetido em outra página continua).
+
+    As páginas alteradas são gravadas em grupos de cerca de
+    `blocos_por_checkpoint` blocos, cada grupo numa transação que troca os
+    trechos e atualiza o hash das suas páginas. O registro serve de
+    checkpoint: se a execução falhar, os grupos commitados ficam e uma nova
+    execução pula essas páginas, retomando do primeiro grupo não gravado
+    (os embeddings já calculados vêm do cache local de embeddings).
+
+    Args:
+        paginas: Dicionários {'pagina': int, 'texto': str} (ex.: iterar_paginas_pdf)
+        categoria: Categoria dos embeddings
+        arquivo: Nome do arquivo de origem, que identifica o documento na categoria
+        divisao: Argumentos de iterar_blocos (tamanho, sobreposicao, estrategia)
+        max_workers: Requisições simultâneas de embedding
+        ao_progredir: Callback com (blocos concluídos, total desconhecido)
+        blocos_por_checkpoint: Tamanho dos grupos (padrão: RAG_BLOCOS_POR_CHECKPOINT)
+
+    Returns:
+        Dicionário com 'linhas', 'reaproveitados', 'segundos',
+        'linhas_por_segundo', 'limites_atingidos', 'documento_id',
+        'paginas_alteradas', 'paginas_inalteradas', 'paginas_removidas',
+        'trechos_removidos' e 'checkpoints'
+    """
+    divisao = divisao or {}
+    blocos_por_checkpoint = blocos_por_checkpoint or BLOCOS_POR_CHECKPOINT
+    resultado = {
+        "linhas": 0,
+        "reaproveitados": 0,
+        "segundos": 0.0,
+        "limites_atingidos": 0,
+        "paginas_alteradas": 0,
+        "paginas_inalteradas": 0,
+        "paginas_removidas": 0,
+        "trechos_removidos": 0,
+        "checkpoints": 0,
+    }
+    concluidos = 0
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        trava = None
+
+        try:
+            cursor.execute("""
+                INSERT INTO rag_documentos (categoria, arquivo)
+                VALUES (%s, %s)
+                ON CONFLICT (categoria, arquivo) DO UPDATE SET atualizado_em = now()
+                RETURNING id
+            """, (categoria, arquivo))
+            documento_id = cursor.fetchone()["id"]
+            conn.commit()
+
+            # Dois uploads do mesmo arquivo ao mesmo tempo são serializados
+            # (trava de sessão: vale entre os vários commits). A forma de duas
+            # chaves int4 com o namespace não colide com travas de outros módulos;
+            # ids além de int4 só passam a dividir a trava com outro documento
+            trava = documento_id % 2**31
+            cursor.execute("SELECT pg_advisory_lock(hashtext('rag_documentos'), %s)", (trava,))
+
+            cursor.execute(
+                "SELECT pagina, hash FROM rag_documento_paginas WHERE documento_id = %s",
+                (documento_id,)
+            )
+            anteriores = {row["pagina"]: row["hash"] for row in cursor.fetchall()}
+            conn.commit()
+
+            def progredir(feitos: int, _total):
+                if ao_progredir:
+                    ao_progredir(concluidos + feitos, None)
+
+            def gravar_grupo(grupo: list[tuple[int, str, list[str]]]):
+                """Troca os trechos das páginas do grupo e registra seus hashes, num único commit."""
+                nonlocal concluidos
+                numeros = [numero for numero, _, _ in grupo]
+
+                for numero, _, blocos in grupo:
+                    # Trechos gravados antes do registro existir passam a
+                    # pertencer a esta página em vez de ficarem órfãos
+                    cursor.execute("""
+                        UPDATE rag_embeddings
+                        SET documento_id = %s, pagina = %s
+                        WHERE categoria = %s AND documento_id IS NULL AND content_hash = ANY(%s)
+                    """, (documento_id, numero, categoria, [hash_conteudo(bloco) for bloco in blocos]))
+
+                itens = [(bloco, documento_id, numero) for numero, _, blocos in grupo for bloco in blocos]
+                parcial = ingerir_na_transacao(
+                    cursor,
+                    itens,
+                    categoria,
+                    colunas_extras=("documento_id", "pagina"),
+                    max_workers=max_workers,
+                    total=None,
+                    ao_progredir=progredir,
+                )
+
+                trechos = [(numero, hash_conteudo(bloco)) for bloco, _, numero in itens]
+                resultado["trechos_removidos"] += _trocar_trechos(
+                    cursor, documento_id, categoria, numeros, trechos
+                )
+
+                # Um trecho já existente não foi regravado acima; se outra
+                # reingestão da categoria o apagou antes da trava, volta agora
+                ausentes = _hashes_ausentes(cursor, categoria, sorted({hash_ for _, hash_ in trechos}))
+                if ausentes:
+                    _somar_resultados(resultado, ingerir_na_transacao(
+                        cursor,
+                        [item for item, (_, hash_) in zip(itens, trechos) if hash_ in ausentes],
+                        categoria,
+                        colunas_extras=("documento_id", "pagina"),
+                        max_workers=max_workers,
+                    ))
+
+                cursor.executemany("""
+                    INSERT INTO rag_documento_paginas (documento_id, pagina, hash)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (documento_id, pagina) DO UPDATE SET hash = EXCLUDED.hash
+                """, [(documento_id, numero, hash_atual) for numero, hash_atual, _ in grupo])
+                conn.commit()
+
+                _somar_resultados(resultado, parcial)
+                resultado["checkpoints"] += 1
+                concluidos += len(itens)
+
+            grupo = []
+            blocos_no_grupo = 0
+            vistas = set()
+
+            for pagina in paginas:
+                numero = pagina["pagina"]
+                vistas.add(numero)
+                hash_atual = hash_pagina(pagina["texto"], divisao)
+                if anteriores.get(numero) == hash_atual:
+                    resultado["paginas_inalteradas"] += 1
+                    continue
+
+                resultado["paginas_alteradas"] += 1
+                blocos = list(iterar_blocos(pagina["texto"], **divisao))
+                grupo.append((numero, hash_atual, blocos))
+                blocos_no_grupo += len(blocos)
+
+                if blocos_no_grupo >= blocos_por_checkpoint:
+                    gravar_grupo(grupo)
+                    grupo, blocos_no_grupo = [], 0
+
+            if grupo:
+                gravar_grupo(grupo)
+
+            removidas = sorted(set(anteriores) - vistas)
+            if removidas:
+                resultado["paginas_removidas"] = len(removidas)
+                resultado["trechos_removidos"] += _trocar_trechos(
+                    cursor, documento_id, categoria, removidas, []
+                )
+                cursor.execute(
+                    "DELETE FROM rag_documento_paginas WHERE documento_id = %s AND pagina = ANY(%s)",
+                    (documento_id, removidas)
+                )
+
+            cursor.execute(
+                "UPDATE rag_documentos SET total_paginas = %s, atualizado_em = now() WHERE id = %s",
+                (len(vistas), documento_id)
+            )
+            conn.commit()
+
+            resultado["documento_id"] = documento_id
+            resultado["linhas_por_segundo"] = (
+                resultado["linhas"] / resultado["segundos"] if resultado["segundos"] > 0 else 0.0
+            )
+            return resultado
+
+        except BaseException:
+            conn.rollback()
+            raise
+
+        finally:
+            # Cada passo tem o seu try: uma falha aqui (ex.: conexão caída)
+            # não pode encobrir a exceção que interrompeu a reingestão
+            if resultado["linhas"] or resultado["trechos_removidos"]:
+                # Também após falhas: os grupos já commitados mudaram o corpus
+                try:
+                    invalidar_cache_busca(cursor)
+                except Exception as e:
+                    print(f"⚠️ Erro ao invalidar o cache de busca: {e}")
+            if trava is not None:
+                try:
+                    cursor.execute("SELECT pg_advisory_unlock(hashtext('rag_documentos'), %s)", (trava,))
+                    conn.commit()
+                except Exception as e:
+                    print(f"⚠️ Erro ao liberar a trava do documento {documento_id}: {e}")
+            cursor.close()
@@ -1,15 +1,282 @@
 import os
+import time
+from collections.abc import Callable
+
+import openai
 from openai import OpenAI
 from dotenv import load_dotenv
 
+from src.rag.cache_embeddings import chave_embedding, get_cache_embeddings
+from src.rag.chunking import estimar_tokens
+
 load_dotenv()
 
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+MODELO_EMBEDDING = "text-embedding-3-small"
+
+# Dimensões pedidas à API (parâmetro `dimensions` dos modelos text-embedding-3);
+# vazio = largura nativa do modelo (1536). Mudar o valor exige reprocessar o
+# corpus: vetores de larguras diferentes não são comparáveis (ver
+# benchmarks/avaliar_dimensoes.py para escolher o valor).
+DIMENSOES_EMBEDDING = int(os.getenv("EMBEDDING_DIMENSOES") or 0) or None
+
+# Limites por requisição do endpoint de embeddings
+MAX_INPUTS_POR_REQUISICAO = 2048
+MAX_TOKENS_POR_REQUISICAO = 300_000
+MAX_TOKENS_POR_INPUT = 8191
+
+# Erros transitórios que justificam nova tentativa do mesmo lote
+ERROS_TRANSITORIOS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+def _argumentos_api() -> dict:
+    argumentos = {"model": MODELO_EMBEDDING, "encoding_format": "float"}
+    if DIMENSOES_EMBEDDING:
+        argumentos["dimensions"] = DIMENSOES_EMBEDDING
+    return argumentos
+
+
 def gerar_embedding(texto: str) -> list[float]:
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=texto,
-        encoding_format="float"
-    )
-    return response.data[0].embedding
\ No newline at end of file
+    cache = get_cache_embeddings()
+    chave = chave_embedding(MODELO_EMBEDDING, DIMENSOES_EMBEDDING, texto)
+
+    if cache:
+        embedding = cache.obter_varios([chave])[0]
+        if embedding is not None:
+            return embedding
+
+    response = client.embeddings.create(input=texto, **_argumentos_api())
+    embedding = response.data[0].embedding
+
+    if cache:
+        cache.salvar_varios([chave], [embedding])
+    return embedding
+
+
+def montar_lotes(
+    textos: list[str],
+    max_inputs: int = MAX_INPUTS_POR_REQUISICAO,
+    max_tokens: int = MAX_TOKENS_POR_REQUISICAO,
+) -> list[list[int]]:
+    """
+    Agrupa os índices de `textos` em lotes que respeitam os limites da API.
+
+    Returns:
+        Lista de lotes, cada um com os índices (em ordem) dos textos do lote
+    """
+    lotes = []
+    atual = []
+    tokens_atual = 0
+
+    for i, texto in enumerate(textos):
+        tokens = estimar_tokens(texto)
+        if tokens > MAX_TOKENS_POR_INPUT:
+            raise ValueError(
+                f"Texto {i} excede o limite de {MAX_TOKENS_POR_INPUT} tokens por input (~{tokens})"
+            )
+
+        if atual and (len(atual) >= max_inputs or tokens_atual + tokens > max_tokens):
+            lotes.append(atual)
+            atual = []
+            tokens_atual = 0
+
+        atual.append(i)
+        tokens_atual += tokens
+
+    if atual:
+        lotes.append(atual)
+
+    return lotes
+
+
+def _segundos_retry_after(erro: openai.RateLimitError) -> float | None:
+    try:
+        return float(erro.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _requisitar(textos: list[str], limitador=None):
+    if not limitador:
+        return client.embeddings.create(input=textos, **_argumentos_api())
+
+    limitador.adquirir()
+    try:
+        response = client.embeddings.create(input=textos, **_argumentos_api())
+    except openai.RateLimitError as e:
+        limitador.liberar(limitado=True, pausa=_segundos_retry_after(e))
+        raise
+    except Exception:
+        limitador.liberar()
+        raise
+
+    limitador.liberar(sucesso=True)
+    return response
+
+
+def _erro_de_input(erro: openai.BadRequestError) -> bool | None:
+    """
+    True se o 400 aponta um input do lote (ex.: acima do limite de tokens),
+    False se aponta outro parâmetro da requisição (model, dimensions...) e
+    None se a resposta não diz.
+    """
+    if getattr(erro, "code", None) == "context_length_exceeded":
+        return True
+    param = getattr(erro, "param", None)
+    if param:
+        return param.startswith("input")
+    return None
+
+
+def _embeddar_lote(
+    textos: list[str],
+    tentativas: int,
+    espera_inicial: float,
+    limitador=None,
+    ao_concluir: Callable[[int, list[list[float]]], None] | None = None,
+    inicio: int = 0,
+    isolando: bool = False,
+) -> list[list[float]]:
+    """
+    Envia um lote numa única requisição, tentando novamente só este lote em
+    erros transitórios. Se a API rejeitar um input do lote (400), divide ao
+    meio e reenvia cada metade, isolando o input problemático. Um 400 da
+    requisição em si (modelo ou dimensions inválidos) sobe na hora; quando a
+    resposta não diz a causa, um input é enviado sozinho antes de dividir,
+    e a rejeição dele também sobe. `isolando` indica que outra parte do lote
+    já foi aceita, ou seja, a requisição é válida.
+
+    Cada parte aceita é passada a `ao_concluir(posição, embeddings)` assim
+    que chega (ex.: para gravar no cache): se um input for rejeitado de vez,
+    o erro sobe, mas o que as outras partes já pagaram não se perde.
+
+    Com um `limitador` (ver src.rag.pipeline.LimitadorAdaptativo), a
+    concorrência e as pausas após 429 são coordenadas entre as threads.
+    """
+    if tentativas < 1:
+        raise ValueError(f"tentativas deve ser pelo menos 1 (recebido {tentativas})")
+
+    espera = espera_inicial
+
+    def dividir(partes: list[str], deslocamento_inicial: int) -> list[list[float]]:
+        # As duas metades são tentadas mesmo que a primeira seja rejeitada
+        meio = len(partes) // 2
+        resultado, rejeicao = [], None
+        for deslocamento, parte in ((0, partes[:meio]), (meio, partes[meio:])):
+            if not parte:
+                continue
+            try:
+                resultado += _embeddar_lote(
+                    parte, tentativas, espera_inicial, limitador, ao_concluir,
+                    deslocamento_inicial + deslocamento, isolando=True,
+                )
+            except openai.BadRequestError as e:
+                rejeicao = rejeicao or e
+        if rejeicao:
+            raise rejeicao
+        return resultado
+
+    for tentativa in range(1, tentativas + 1):
+        try:
+            response = _requisitar(textos, limitador)
+            dados = sorted(response.data, key=lambda item: item.index)
+            resultado = [item.embedding for item in dados]
+            if ao_concluir:
+                ao_concluir(inicio, resultado)
+            return resultado
+
+        except openai.BadRequestError as e:
+            origem = _erro_de_input(e)
+            if len(textos) == 1 or origem is False:
+                raise
+            if origem is None and not isolando:
+                # Se um input sozinho também é rejeitado, dividir o lote só
+                # multiplicaria requisições que falham
+                primeiro = _embeddar_lote(textos[:1], tentativas, espera_inicial, limitador, ao_concluir, inicio)
+                return primeiro + dividir(textos[1:], inicio + 1)
+            return dividir(textos, inicio)
+
+        except openai.RateLimitError as e:
+            if tentativa == tentativas:
+                raise
+            # Com limitador, a pausa já é aplicada a todas as threads em adquirir()
+            if not limitador:
+                time.sleep(_segundos_retry_after(e) or espera)
+            espera *= 2
+
+        except ERROS_TRANSITORIOS:
+            if tentativa == tentativas:
+                raise
+            time.sleep(espera)
+            espera *= 2
+
+
+def gerar_embeddings_em_lote(
+    textos: list[str],
+    max_inputs: int = MAX_INPUTS_POR_REQUISICAO,
+    max_tokens: int = MAX_TOKENS_POR_REQUISICAO,
+    tentativas: int = 5,
+    espera_inicial: float = 1.0,
+    ao_progredir: Callable[[int, int], None] | None = None,
+    limitador=None,
+) -> list[list[float]]:
+    """
+    Gera embeddings para vários textos agrupando-os em poucas requisições.
+
+    Textos já presentes no cache local não são reenviados à API. Se a API
+    rejeitar um input, openai.BadRequestError sobe, mas os textos embeddados
+    até ali já estão no cache e não são pagos de novo numa nova chamada.
+
+    Args:
+        textos: Textos a serem convertidos em embeddings
+        max_inputs: Máximo de textos por requisição
+        max_tokens: Máximo estimado de tokens por requisição
+        tentativas: Tentativas por lote em erros transitórios (429, timeout, 5xx), pelo menos 1
+        espera_inicial: Espera antes da primeira nova tentativa, dobrada a cada falha
+        ao_progredir: Callback opcional chamado com (concluidos, total) após cada lote
+        limitador: Limitador compartilhado entre threads (concorrência e pausas em 429)
+
+    Returns:
+        Lista de embeddings na mesma ordem de `textos`
+    """
+    cache = get_cache_embeddings()
+    chaves = [chave_embedding(MODELO_EMBEDDING, DIMENSOES_EMBEDDING, texto) for texto in textos]
+    embeddings = cache.obter_varios(chaves) if cache else [None] * len(textos)
+
+    # Textos repetidos são enviados uma única vez
+    pendentes: dict[bytes, list[int]] = {}
+    for i, (chave, embedding) in enumerate(zip(chaves, embeddings)):
+        if embedding is None:
+            pendentes.setdefault(chave, []).append(i)
+
+    unicos = [indices[0] for indices in pendentes.values()]
+    concluidos = len(textos) - sum(len(indices) for indices in pendentes.values())
+    if ao_progredir and concluidos:
+        ao_progredir(concluidos, len(textos))
+
+    for lote in montar_lotes([textos[i] for i in unicos], max_inputs, max_tokens):
+        originais = [unicos[j] for j in lote]
+
+        def guardar(inicio: int, parte: list[list[float]], originais=originais):
+            cache.salvar_varios([chaves[i] for i in originais[inicio:inicio + len(parte)]], parte)
+
+        resultado = _embeddar_lote(
+            [textos[i] for i in originais], tentativas, espera_inicial, limitador,
+            ao_concluir=guardar if cache else None,
+        )
+
+        for i, embedding in zip(originais, resultado):
+            for repetido in pendentes[chaves[i]]:
+                embeddings[repetido] = embedding
+            concluidos += len(pendentes[chaves[i]])
+
+        if ao_progredir:
+            ao_progredir(concluidos, len(textos))
+
+    return embeddings
@@ -1,11 +1,288 @@
-from src.rag.generate import gerar_embedding
-from src.db.conection import get_vector_conn
+import os
+import time
+
+from src.db.conection import vector_conn
+from src.db.schema import PRECISOES, expressao_distancia
+from src.rag.bulk import literal_vetor
+from src.rag.cache_busca import (
+    cache_habilitado,
+    embeddings_perguntas,
+    geracao_recente,
+    obter_resultado,
+    salvar_resultado,
+)
+from src.rag.indice_local import obter_indice_local
+
+
+# "postgres" (pgvector) ou "local" (cópia NumPy em memória, ver indice_local)
+BACKEND_PADRAO = os.getenv("RAG_BACKEND", "postgres")
+
+MODOS_BUSCA = ("vetorial", "hibrido")
+
+# Precisão usada para escolher os candidatos: "vector" (exata), "halfvec" ou
+# "bit" (índices quantizados criados com `schema indice-vetorial --precisao`)
+PRECISAO_PADRAO = os.getenv("RAG_PRECISAO_BUSCA", "vector")
+
+
+def _inteiro_env(nome: str) -> int | None:
+    valor = os.getenv(nome, "").strip()
+    return int(valor) if valor else None
+
+
+# ef_search (HNSW) e probes (IVFFlat) usados quando o chamador não informa;
+# vazio mantém o valor do servidor
+EF_SEARCH_PADRAO = _inteiro_env("RAG_HNSW_EF_SEARCH")
+PROBES_PADRAO = _inteiro_env("RAG_IVFFLAT_PROBES")
+
+# Varredura iterativa do pgvector (>= 0.8) nas buscas com filtro de
+# categoria. Sem ela o índice entrega só ef_search candidatos (ou os das
+# listas visitadas) e o filtro, aplicado depois, pode deixar menos que
+# `limite` linhas, ou nenhuma, numa categoria pequena. Vazio desliga
+# (pgvector anterior à 0.8 não tem o parâmetro).
+BUSCA_ITERATIVA = os.getenv("RAG_BUSCA_ITERATIVA", "relaxed_order").strip()
+
+# Candidatos buscados no índice quantizado, por resultado pedido, antes da
+# reordenação exata (a quantização binária perde mais recall que a halfvec)
+CANDIDATOS_POR_RESULTADO = {"vector": 1, "halfvec": 4, "bit": 10}
+
+# Constante k da Reciprocal Rank Fusion (valor usual da literatura)
+K_RRF = 60
+
+# Top-k ordenado pela distância (servido pelo índice HNSW/IVFFlat) e só
+# depois o corte por similaridade mínima, aplicado aos candidatos. O vetor
+# da pergunta é enviado uma única vez.
+SQL_BUSCA = """
+    SELECT content, categoria, 1 - distancia AS similaridade
+    FROM (
+        SELECT content, categoria, embedding <=> %(vetor)s::vector AS distancia
+        FROM rag_embeddings
+        {filtro}
+        ORDER BY distancia
+        LIMIT %(limite)s
+    ) AS candidatos
+    WHERE distancia <= %(distancia_maxima)s
+    ORDER BY distancia
+"""
+
+
+# Uma busca top-k por pergunta (LATERAL), todas no mesmo comando
+SQL_BUSCA_LOTE = """
+    SELECT consulta.ordem, candidatos.content, candidatos.categoria, 1 - candidatos.distancia AS similaridade
+    FROM unnest(%(vetores)s::text[]) WITH ORDINALITY AS consulta(vetor, ordem)
+    CROSS JOIN LATERAL (
+        SELECT content, categoria, embedding <=> consulta.vetor::vector AS distancia
+        FROM rag_embeddings
+        {filtro}
+        ORDER BY distancia
+        LIMIT %(limite)s
+    ) AS candidatos
+    WHERE candidatos.distancia <= %(distancia_maxima)s
+    ORDER BY consulta.ordem, candidatos.distancia
+"""
+
+
+# Candidatos pela distância quantizada (servida pelo índice halfvec/bit) e
+# reordenação pela distância exata com o vetor completo da tabela
+SQL_BUSCA_QUANTIZADA = """
+    SELECT content, categoria, 1 - distancia AS similaridade
+    FROM (
+        SELECT content, categoria, embedding <=> %(vetor)s::vector AS distancia
+        FROM (
+            SELECT content, categoria, embedding
+            FROM rag_embeddings
+            {filtro}
+            ORDER BY {distancia}
+            LIMIT %(candidatos)s
+        ) AS aproximados
+        ORDER BY distancia
+        LIMIT %(limite)s
+    ) AS candidatos
+    WHERE distancia <= %(distancia_maxima)s
+    ORDER BY distancia
+"""
+
+
+SQL_BUSCA_LOTE_QUANTIZADA = """
+    SELECT consulta.ordem, candidatos.content, candidatos.categoria, 1 - candidatos.distancia AS similaridade
+    FROM unnest(%(vetores)s::text[]) WITH ORDINALITY AS consulta(vetor, ordem)
+    CROSS JOIN LATERAL (
+        SELECT content, categoria, embedding <=> consulta.vetor::vector AS distancia
+        FROM (
+            SELECT content, categoria, embedding
+            FROM rag_embeddings
+            {filtro}
+            ORDER BY {distancia}
+            LIMIT %(candidatos)s
+        ) AS aproximados
+        ORDER BY distancia
+        LIMIT %(limite)s
+    ) AS candidatos
+    WHERE candidatos.distancia <= %(distancia_maxima)s
+    ORDER BY consulta.ordem, candidatos.distancia
+"""
+
+
+def _filtro_categoria(categoria: str | None) -> str:
+    return "WHERE categoria = %(categoria)s" if categoria else ""
+
+
+def _validar_precisao(precisao: str):
+    if precisao not in PRECISOES:
+        raise ValueError(f"Precisão de busca inválida: {precisao}")
+
+
+def montar_sql_busca(categoria: str | None = None, precisao: str = "vector", dimensoes: int | None = None) -> str:
+    """
+    Retorna o SQL da busca vetorial, com ou sem filtro de categoria.
+
+    Com precisao "halfvec" ou "bit", os %(candidatos)s mais próximos pela
+    distância quantizada são reordenados pela distância exata.
+    """
+    _validar_precisao(precisao)
+    if precisao == "vector":
+        return SQL_BUSCA.format(filtro=_filtro_categoria(categoria))
+    return SQL_BUSCA_QUANTIZADA.format(
+        filtro=_filtro_categoria(categoria),
+        distancia=expressao_distancia(precisao, dimensoes),
+    )
+
+
+def montar_sql_busca_lote(categoria: str | None = None, precisao: str = "vector", dimensoes: int | None = None) -> str:
+    """Retorna o SQL da busca vetorial de várias perguntas, com ou sem filtro de categoria."""
+    _validar_precisao(precisao)
+    if precisao == "vector":
+        return SQL_BUSCA_LOTE.format(filtro=_filtro_categoria(categoria))
+    return SQL_BUSCA_LOTE_QUANTIZADA.format(
+        filtro=_filtro_categoria(categoria),
+        distancia=expressao_distancia(precisao, dimensoes, "consulta.vetor"),
+    )
+
+
+def numero_candidatos(limite: int, precisao: str, candidatos: int | None = None) -> int:
+    """Candidatos buscados no índice antes da reordenação exata (ao menos `limite`)."""
+    if candidatos is None:
+        candidatos = limite * CANDIDATOS_POR_RESULTADO[precisao]
+        if precisao != "vector":
+            candidatos = max(candidatos, 40)
+    return max(candidatos, limite)
+
+
+def parametros_indice(
+    ef_search: int | None = None,
+    probes: int | None = None,
+    filtrado: bool = False,
+) -> tuple[str, dict]:
+    """
+    Monta os comandos que ajustam o equilíbrio latência x recall apenas para
+    a transação corrente (set_config local, equivalente a SET LOCAL).
+    Valores não informados vêm de RAG_HNSW_EF_SEARCH / RAG_IVFFLAT_PROBES.
+    Com `filtrado` (consulta com filtro de categoria), liga também a
+    varredura iterativa dos índices (RAG_BUSCA_ITERATIVA).
+
+    Returns:
+        (sql, parametros) para prefixar a consulta, enviados no mesmo round trip
+    """
+    ef_search = EF_SEARCH_PADRAO if ef_search is None else ef_search
+    probes = PROBES_PADRAO if probes is None else probes
+    sql = ""
+    parametros = {}
+    if ef_search is not None:
+        sql += "SELECT set_config('hnsw.ef_search', %(ef_search)s, true);\n"
+        parametros["ef_search"] = str(int(ef_search))
+    if probes is not None:
+        sql += "SELECT set_config('ivfflat.probes', %(probes)s, true);\n"
+        parametros["probes"] = str(int(probes))
+    if filtrado and BUSCA_ITERATIVA:
+        # O índice continua a varredura até o filtro deixar linhas suficientes;
+        # as consultas reordenam os candidatos pela distância no fim
+        sql += "SELECT set_config('hnsw.iterative_scan', %(busca_iterativa)s, true);\n"
+        sql += "SELECT set_config('ivfflat.iterative_scan', %(busca_iterativa)s, true);\n"
+        parametros["busca_iterativa"] = BUSCA_ITERATIVA
+    return sql, parametros
+
+
+def fundir_rrf(rankings: list[list[str]], k: int = K_RRF) -> list[tuple[str, float]]:
+    """
+    Reciprocal Rank Fusion: cada item soma 1 / (k + posição) em cada ranking
+    em que aparece.
+
+    Args:
+        rankings: Listas de ids, cada uma ordenada da melhor para a pior
+        k: Constante de suavização
+
+    Returns:
+        Lista de (id, score) em ordem decrescente de score
+    """
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for posicao, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + posicao)
+    return sorted(scores.items(), key=lambda par: par[1], reverse=True)
+
+
+def _executar_busca_hibrida(
+    cursor,
+    pergunta: str,
+    embedding_pergunta: list[float],
+    categoria: str | None,
+    limite: int,
+    similaridade_minima: float,
+    prefixo: str,
+    parametros: dict,
+    metricas: dict,
+) -> list[dict]:
+    """Roda rag_busca_hibrida (vetorial + lexical no mesmo round trip) e funde com RRF."""
+    cursor.execute(prefixo + "SELECT * FROM rag_busca_hibrida(%(vetor)s, %(consulta)s, %(categoria)s, %(candidatos)s)", {
+        **parametros,
+        "vetor": literal_vetor(embedding_pergunta),
+        "consulta": pergunta,
+        "categoria": categoria or None,
+        "candidatos": max(limite * 5, 20),
+    })
+
+    linhas = {}
+    rankings = {"vetorial": [], "lexical": []}
+    for row in cursor.fetchall():
+        if row["fonte"].startswith("tempo_"):
+            metricas[row["fonte"].replace("tempo_", "") + "_ms"] = row["score"]
+            continue
+        # O corte por similaridade vale só para a perna vetorial; casamentos
+        # lexicais exatos (códigos, nomes, artigos) entram mesmo com cosseno baixo
+        if row["fonte"] == "vetorial" and row["similaridade"] < similaridade_minima:
+            continue
+        rankings[row["fonte"]].append(row["id"])
+        linhas[row["id"]] = row
+
+    return [
+        {
+            "content": linhas[item]["content"],
+            "categoria": linhas[item]["categoria"],
+            "similaridade": float(linhas[item]["similaridade"]),
+            "score_rrf": score,
+        }
+        for item, score in fundir_rrf(list(rankings.values()))[:limite]
+    ]
+
+
+def _geracao_atual() -> int | None:
+    """Geração do corpus para compor a chave de cache (None = não usar cache)."""
+    if not cache_habilitado():
+        return None
+    return geracao_recente()
+
 
 def buscar_contexto_similar(
     pergunta: str,
     categoria: str | None = None,
     limite: int = 3,
-    similaridade_minima: float = 0.7
+    similaridade_minima: float = 0.7,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    backend: str | None = None,
+    modo: str = "vetorial",
+    metricas: dict | None = None,
+    precisao: str | None = None,
+    candidatos: int | None = None
 ) -> list[dict]:
     """
     Busca os textos mais similares à pergunta usando busca vetorial.
@@ -15,76 +292,183 @@ def buscar_contexto_similar(
         categoria: Filtro opcional por categoria
         limite: Número máximo de resultados
         similaridade_minima: Score mínimo de similaridade (0 a 1)
+        ef_search: Candidatos examinados pelo HNSW (maior = mais recall, mais lento)
+        probes: Listas visitadas pelo IVFFlat (maior = mais recall, mais lento)
+        backend: "postgres" ou "local" (padrão: RAG_BACKEND); o modo híbrido
+            sempre usa o PostgreSQL
+        modo: "vetorial" ou "hibrido" (vetorial + full-text em português,
+            fundidos com Reciprocal Rank Fusion)
+        metricas: Dicionário opcional preenchido com as latências em ms
+            ('embedding_ms', 'vetorial_ms', 'lexical_ms', 'total_ms')
+        precisao: "vector", "halfvec" ou "bit" (padrão: RAG_PRECISAO_BUSCA);
+            só na busca vetorial do PostgreSQL
+        candidatos: Candidatos do índice quantizado reordenados pela
+            distância exata (padrão: proporcional a `limite`)
     
     Returns:
         Lista de dicionários com 'content', 'categoria' e 'similaridade'
+        (no modo híbrido, também 'score_rrf')
     """
-    
+    if modo not in MODOS_BUSCA:
+        raise ValueError(f"Modo de busca inválido: {modo}")
+    precisao = precisao or PRECISAO_PADRAO
+    _validar_precisao(precisao)
+    if metricas is None:
+        metricas = {}
+    inicio = time.perf_counter()
+
+    if modo == "vetorial" and (backend or BACKEND_PADRAO) == "local":
+        embedding_pergunta = embeddings_perguntas([pergunta])[0]
+        metricas["embedding_ms"] = (time.perf_counter() - inicio) * 1000
+        resultados = obter_indice_local().buscar(embedding_pergunta, categoria, limite, similaridade_minima)
+        metricas["total_ms"] = (time.perf_counter() - inicio) * 1000
+        return resultados
+
+    # Resultados em cache valem enquanto a geração do corpus não mudar
+    geracao = _geracao_atual()
+    chave = (modo, precisao, candidatos, pergunta, categoria, limite, similaridade_minima, ef_search, probes, geracao)
+    if geracao is not None:
+        resultado = obter_resultado(chave)
+        if resultado is not None:
+            metricas["total_ms"] = (time.perf_counter() - inicio) * 1000
+            return resultado
+
     # Gera embedding da pergunta
-    embedding_pergunta = gerar_embedding(pergunta)
+    inicio_embedding = time.perf_counter()
+    embedding_pergunta = embeddings_perguntas([pergunta])[0]
+    metricas["embedding_ms"] = (time.perf_counter() - inicio_embedding) * 1000
     
-    conn = get_vector_conn()
-    cursor = conn.cursor()
+    with vector_conn() as conn:
+        cursor = conn.cursor()
     
-    try:
-        # SQL com busca vetorial por similaridade de cosseno
-        if categoria:
-            sql = """
-                SELECT 
-                    content,
-                    categoria,
-                    1 - (embedding <=> %s::vector) as similaridade
-                FROM rag_embeddings
-                WHERE categoria = %s
-                    AND 1 - (embedding <=> %s::vector) >= %s
-                ORDER BY embedding <=> %s::vector
-                LIMIT %s
-            """
-            cursor.execute(sql, (
-                embedding_pergunta, 
-                categoria,
-                embedding_pergunta,
-                similaridade_minima,
-                embedding_pergunta,
-                limite
-            ))
-        else:
-            sql = """
-                SELECT 
-                    content,
-                    categoria,
-                    1 - (embedding <=> %s::vector) as similaridade
-                FROM rag_embeddings
-                WHERE 1 - (embedding <=> %s::vector) >= %s
-                ORDER BY embedding <=> %s::vector
-                LIMIT %s
-            """
-            cursor.execute(sql, (
-                embedding_pergunta,
-                embedding_pergunta,
-                similaridade_minima,
-                embedding_pergunta,
-                limite
-            ))
+        try:
+            candidatos = numero_candidatos(limite, precisao, candidatos)
+            if modo == "vetorial" and precisao != "vector" and ef_search is None:
+                # O HNSW devolve no máximo ef_search linhas
+                ef_search = candidatos
+            prefixo, parametros = parametros_indice(ef_search, probes, filtrado=bool(categoria))
+
+            if modo == "hibrido":
+                resultados = _executar_busca_hibrida(
+                    cursor, pergunta, embedding_pergunta, categoria, limite,
+                    similaridade_minima, prefixo, parametros, metricas
+                )
+            else:
+                inicio_sql = time.perf_counter()
+                cursor.execute(prefixo + montar_sql_busca(categoria, precisao, len(embedding_pergunta)), {
+                    **parametros,
+                    "vetor": literal_vetor(embedding_pergunta),
+                    "categoria": categoria,
+                    "limite": limite,
+                    "candidatos": candidatos,
+                    "distancia_maxima": 1 - similaridade_minima,
+                })
         
-        resultados = cursor.fetchall()
+                resultados = [
+                    {
+                        "content": row["content"],
+                        "categoria": row["categoria"],
+                        "similaridade": float(row["similaridade"])
+                    }
+                    for row in cursor.fetchall()
+                ]
+                metricas["vetorial_ms"] = (time.perf_counter() - inicio_sql) * 1000
         
-        return [
-            {
-                "content": row["content"],
-                "categoria": row["categoria"],
-                "similaridade": float(row["similaridade"])
-            }
-            for row in resultados
-        ]
+            metricas["total_ms"] = (time.perf_counter() - inicio) * 1000
+            if geracao is not None:
+                salvar_resultado(chave, resultados)
+            return resultados
     
-    except Exception as e:
-        print(f"❌ Erro na busca semântica: {e}")
-        return []
+        except Exception as e:
+            print(f"❌ Erro na busca semântica: {e}")
+            return []
     
-    finally:
-        cursor.close()
-        conn.close()
+        finally:
+            cursor.close()
+
+
+def buscar_contexto_similar_lote(
+    perguntas: list[str],
+    categoria: str | None = None,
+    limite: int = 3,
+    similaridade_minima: float = 0.7,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    backend: str | None = None,
+    precisao: str | None = None,
+    candidatos: int | None = None
+) -> list[list[dict]]:
+    """
+    Busca contexto para várias perguntas com uma chamada de embedding e uma consulta.
+
+    Args:
+        perguntas: Perguntas (ou sub-perguntas) do usuário
+        categoria: Filtro opcional por categoria
+        limite: Número máximo de resultados por pergunta
+        similaridade_minima: Score mínimo de similaridade (0 a 1)
+        ef_search: Candidatos examinados pelo HNSW
+        probes: Listas visitadas pelo IVFFlat
+        backend: "postgres" ou "local" (padrão: RAG_BACKEND)
+        precisao: "vector", "halfvec" ou "bit" (padrão: RAG_PRECISAO_BUSCA)
+        candidatos: Candidatos por pergunta reordenados pela distância exata
+
+    Returns:
+        Uma lista de resultados por pergunta, na ordem de entrada, cada um no
+        formato de buscar_contexto_similar
+    """
+    if not perguntas:
+        return []
+    precisao = precisao or PRECISAO_PADRAO
+    _validar_precisao(precisao)
+
+    if (backend or BACKEND_PADRAO) == "local":
+        embeddings = embeddings_perguntas(perguntas)
+        return obter_indice_local().buscar_lote(embeddings, categoria, limite, similaridade_minima)
+
+    geracao = _geracao_atual()
+    chave = ("lote", precisao, candidatos, tuple(perguntas), categoria, limite, similaridade_minima, ef_search, probes, geracao)
+    if geracao is not None:
+        resultado = obter_resultado(chave)
+        if resultado is not None:
+            return resultado
+
+    embeddings = embeddings_perguntas(perguntas)
+    respostas = [[] for _ in perguntas]
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            candidatos = numero_candidatos(limite, precisao, candidatos)
+            if precisao != "vector" and ef_search is None:
+                ef_search = candidatos
+            prefixo, parametros = parametros_indice(ef_search, probes, filtrado=bool(categoria))
+            cursor.execute(prefixo + montar_sql_busca_lote(categoria, precisao, len(embeddings[0])), {
+                **parametros,
+                "vetores": [literal_vetor(embedding) for embedding in embeddings],
+                "categoria": categoria,
+                "limite": limite,
+                "candidatos": candidatos,
+                "distancia_maxima": 1 - similaridade_minima,
+            })
+
+            for row in cursor.fetchall():
+                respostas[row["ordem"] - 1].append({
+                    "content": row["content"],
+                    "categoria": row["categoria"],
+                    "similaridade": float(row["similaridade"])
+                })
+
+            if geracao is not None:
+                salvar_resultado(chave, respostas)
+            return respostas
+
+        except Exception as e:
+            print(f"❌ Erro na busca semântica em lote: {e}")
+            return [[] for _ in perguntas]
+
+        finally:
+            cursor.close()
 
 
 def formatar_contexto(resultados: list[dict]) -> str:
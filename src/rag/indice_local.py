@@ -0,0 +1,464 @@
+import copy
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import psycopg2
+from dotenv import load_dotenv
+
+from src.db.conection import vector_conn
+from src.rag.cache_busca import obter_geracao_corpus
+
+load_dotenv()
+
+# Segundos mínimos entre verificações de mudança no corpus
+INTERVALO_ATUALIZACAO = float(os.getenv("RAG_INDICE_LOCAL_INTERVALO", "5"))
+
+# Snapshot salvo com `python -m src.rag.indice_local <diretório>` (opcional)
+DIRETORIO_SNAPSHOT = os.getenv("RAG_INDICE_LOCAL_DIR", "")
+
+# Quanto a busca por linhas novas recua além da marca, para pegar as
+# commitadas fora de ordem por transações longas
+JANELA_ATRASO = float(os.getenv("RAG_INDICE_LOCAL_JANELA", "300"))
+
+# Segmentos acrescentados antes de juntá-los, e fração de linhas excluídas
+# (desligadas, mas ainda na matriz) antes de compactar tudo
+MAX_SEGMENTOS = 8
+FRACAO_DESLIGADA = 0.25
+
+
+def _vetor(texto: str) -> np.ndarray:
+    # Representação textual do pgvector: '[x,y,...]'
+    return np.array(texto[1:-1].split(","), dtype=np.float32)
+
+
+def _normalizar(matriz: np.ndarray) -> np.ndarray:
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    normas[normas == 0] = 1
+    return matriz / normas
+
+
+def _faixas(categorias: np.ndarray) -> dict[str, tuple[int, int]]:
+    """Faixa contígua (início, fim) de cada categoria num vetor já ordenado."""
+    if not len(categorias):
+        return {}
+    nomes, inicios, contagens = np.unique(categorias.astype(str), return_index=True, return_counts=True)
+    return {
+        str(nome): (int(inicio), int(inicio + contagem))
+        for nome, inicio, contagem in zip(nomes, inicios, contagens)
+    }
+
+
+@dataclass(frozen=True)
+class _Segmento:
+    """
+    Bloco imutável de linhas ordenadas por categoria. Exclusões só desligam
+    linhas em `ativos`; a matriz (que pode ser um memmap) não é copiada.
+    """
+    matriz: np.ndarray
+    ids: np.ndarray
+    categorias: np.ndarray
+    conteudos: np.ndarray
+    criados_em: np.ndarray
+    faixas: dict[str, tuple[int, int]]
+    ativos: np.ndarray | None = None  # None: todas as linhas ativas
+
+    @classmethod
+    def montar(cls, matriz, ids, categorias, conteudos, criados_em) -> "_Segmento":
+        """Ordena as linhas por categoria e calcula as faixas."""
+        ordem = np.argsort(categorias.astype(str), kind="stable")
+        categorias = categorias[ordem]
+        return cls(
+            np.ascontiguousarray(matriz[ordem]), ids[ordem], categorias,
+            conteudos[ordem], criados_em[ordem], _faixas(categorias)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids) if self.ativos is None else int(self.ativos.sum())
+
+    def faixa(self, categoria: str | None) -> tuple[int, int]:
+        if categoria:
+            return self.faixas.get(categoria, (0, 0))
+        return 0, len(self.ids)
+
+    def contagens(self) -> dict[str, int]:
+        """Linhas ativas por categoria."""
+        return {
+            categoria: fim - inicio if self.ativos is None else int(self.ativos[inicio:fim].sum())
+            for categoria, (inicio, fim) in self.faixas.items()
+        }
+
+    def sem(self, removidos: np.ndarray) -> "_Segmento":
+        """Cópia com os ids de `removidos` desligados; a matriz é compartilhada."""
+        atingidos = np.isin(self.ids, removidos)
+        if not atingidos.any():
+            return self
+        ativos = np.ones(len(self.ids), dtype=bool) if self.ativos is None else self.ativos.copy()
+        ativos[atingidos] = False
+        return replace(self, ativos=ativos)
+
+
+def _compactar(segmentos: list[_Segmento]) -> _Segmento:
+    """Junta as linhas ativas de vários segmentos num segmento novo."""
+    mascaras = [slice(None) if segmento.ativos is None else segmento.ativos for segmento in segmentos]
+    return _Segmento.montar(*(
+        np.concatenate([getattr(segmento, campo)[mascara] for segmento, mascara in zip(segmentos, mascaras)])
+        for campo in ("matriz", "ids", "categorias", "conteudos", "criados_em")
+    ))
+
+
+def _contagens_banco(cursor) -> dict[str, int] | None:
+    """
+    Linhas por categoria segundo o catálogo rag_categorias_stats_atuais.
+
+    Returns:
+        As contagens, ou None se a tabela ainda não existir (migrações pendentes)
+    """
+    try:
+        cursor.execute("SELECT categoria, total FROM rag_categorias_stats_atuais")
+        return {row["categoria"]: row["total"] for row in cursor.fetchall()}
+    except psycopg2.Error:
+        cursor.connection.rollback()
+        return None
+
+
+class IndiceLocal:
+    """
+    Cópia em memória de rag_embeddings para busca vetorial sem ir ao banco.
+
+    As linhas ficam em segmentos de matrizes float32 contíguas, já
+    normalizadas (o produto escalar é a similaridade de cosseno) e ordenadas
+    por categoria, para que cada categoria seja uma faixa contígua. Cada
+    atualização acrescenta um segmento e desliga as linhas excluídas, sem
+    copiar os anteriores. O primeiro segmento pode ser salvo em disco e
+    reaberto com memory-map.
+
+    Os segmentos formam uma tupla trocada numa única atribuição: uma busca
+    lê a tupla uma vez e não precisa do lock de quem atualiza.
+    """
+
+    def __init__(self):
+        self._segmentos: tuple[_Segmento, ...] = ()
+        self._ids_conhecidos: set = set()
+        self.marca = None  # (created_at, id) da linha mais recente carregada
+        self.geracao = None
+
+    def __len__(self) -> int:
+        return sum(len(segmento) for segmento in self._segmentos)
+
+    @property
+    def segmentos(self) -> tuple[_Segmento, ...]:
+        return self._segmentos
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Ids das linhas ativas, segmento por segmento."""
+        return np.concatenate([np.empty(0, dtype=object)] + [
+            segmento.ids if segmento.ativos is None else segmento.ids[segmento.ativos]
+            for segmento in self._segmentos
+        ])
+
+    # ------------------------------------------------------------------
+    # Montagem
+    # ------------------------------------------------------------------
+    def _aplicar(self, linhas: list[dict], removidos=()):
+        """
+        Acrescenta linhas (id, content, categoria, created_at, embedding) num
+        segmento novo e desliga os ids removidos nos existentes. Sem mudanças
+        não faz nada.
+
+        Passando de MAX_SEGMENTOS, os segmentos após o primeiro são juntados;
+        com mais de FRACAO_DESLIGADA das linhas desligadas, tudo é compactado.
+        """
+        if not linhas and not len(removidos):
+            return
+
+        segmentos = list(self._segmentos)
+        if len(removidos):
+            removidos = set(removidos)
+            alvo = np.array(list(removidos), dtype=object)
+            segmentos = [segmento.sem(alvo) for segmento in segmentos]
+
+        if linhas:
+            def coluna(nome):
+                return np.array([linha[nome] for linha in linhas], dtype=object)
+
+            matriz = _normalizar(np.stack([
+                linha["embedding"] if isinstance(linha["embedding"], np.ndarray) else _vetor(linha["embedding"])
+                for linha in linhas
+            ]).astype(np.float32))
+            segmentos.append(_Segmento.montar(
+                matriz, coluna("id"), coluna("categoria"), coluna("content"), coluna("created_at")
+            ))
+
+        total = sum(len(segmento.ids) for segmento in segmentos)
+        if sum(len(segmento) for segmento in segmentos) < total * (1 - FRACAO_DESLIGADA):
+            segmentos = [_compactar(segmentos)]
+        elif len(segmentos) > MAX_SEGMENTOS:
+            segmentos = [segmentos[0], _compactar(segmentos[1:])]
+
+        self._segmentos = tuple(segmentos)
+
+        self._ids_conhecidos = (self._ids_conhecidos - set(removidos)) | {linha["id"] for linha in linhas}
+        for linha in linhas:
+            chave = (linha["created_at"], linha["id"])
+            if self.marca is None or chave > self.marca:
+                self.marca = chave
+
+    @classmethod
+    def carregar_do_banco(cls, tamanho_lote: int = 5000) -> "IndiceLocal":
+        """Carrega todo o rag_embeddings do banco."""
+        indice = cls()
+        indice.atualizar(tamanho_lote)
+        return indice
+
+    def atualizar(self, tamanho_lote: int = 5000) -> dict:
+        """
+        Sincroniza com o banco de forma incremental.
+
+        Busca as linhas após a marca (created_at, id), recuando
+        RAG_INDICE_LOCAL_JANELA segundos para pegar as commitadas fora de
+        ordem (created_at é o início da transação, não o momento do commit).
+        A lista completa de ids só é relida quando a contagem por categoria
+        do catálogo de categorias não bate com a local: houve exclusões ou uma
+        transação mais longa que a janela.
+
+        Returns:
+            Dicionário com 'novos' e 'removidos'
+        """
+        removidos = set()
+        with vector_conn() as conn:
+            cursor = conn.cursor()
+            try:
+                # Geração, contagens e linhas lidas do mesmo snapshot
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                geracao = obter_geracao_corpus(cursor)
+
+                colunas = "id, content, categoria, created_at, embedding::text AS embedding"
+                if self.marca is None:
+                    cursor.execute(f"SELECT {colunas} FROM rag_embeddings ORDER BY created_at, id")
+                else:
+                    cursor.execute(
+                        f"""
+                        SELECT {colunas} FROM rag_embeddings
+                        WHERE created_at > %s
+                        ORDER BY created_at, id
+                        """,
+                        (self.marca[0] - timedelta(seconds=JANELA_ATRASO),)
+                    )
+
+                linhas = []
+                while lote := cursor.fetchmany(tamanho_lote):
+                    linhas.extend(dict(row) for row in lote if row["id"] not in self._ids_conhecidos)
+
+                esperado: dict[str, int] = {}
+                for segmento in self._segmentos:
+                    for categoria, quantidade in segmento.contagens().items():
+                        esperado[categoria] = esperado.get(categoria, 0) + quantidade
+                for linha in linhas:
+                    esperado[linha["categoria"]] = esperado.get(linha["categoria"], 0) + 1
+
+                banco = _contagens_banco(cursor)
+                if banco != {categoria: total for categoria, total in esperado.items() if total}:
+                    cursor.execute("SELECT id FROM rag_embeddings")
+                    ids_banco = {row["id"] for row in cursor.fetchall()}
+                    removidos = self._ids_conhecidos - ids_banco
+                    faltantes = ids_banco - self._ids_conhecidos - {linha["id"] for linha in linhas}
+                    if faltantes:
+                        cursor.execute(
+                            f"SELECT {colunas} FROM rag_embeddings WHERE id = ANY(%s)",
+                            (list(faltantes),)
+                        )
+                        linhas.extend(dict(row) for row in cursor.fetchall())
+            finally:
+                conn.rollback()
+                cursor.close()
+
+        self._aplicar(linhas, removidos)
+        self.geracao = geracao
+        return {"novos": len(linhas), "removidos": len(removidos)}
+
+    # ------------------------------------------------------------------
+    # Busca
+    # ------------------------------------------------------------------
+    def buscar(
+        self,
+        embedding,
+        categoria: str | None = None,
+        limite: int = 3,
+        similaridade_minima: float = 0.7,
+    ) -> list[dict]:
+        """Top-k por similaridade de cosseno, no formato de buscar_contexto_similar."""
+        return self.buscar_lote([embedding], categoria, limite, similaridade_minima)[0]
+
+    def buscar_lote(
+        self,
+        embeddings,
+        categoria: str | None = None,
+        limite: int = 3,
+        similaridade_minima: float = 0.7,
+    ) -> list[list[dict]]:
+        """Top-k de várias consultas com uma multiplicação de matrizes por segmento."""
+        segmentos = self._segmentos  # lido uma vez: uma atualização concorrente não afeta esta busca
+        if not segmentos:
+            return [[] for _ in embeddings]
+
+        consultas = _normalizar(np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1))
+        candidatos = [[] for _ in embeddings]
+        for segmento in segmentos:
+            inicio, fim = segmento.faixa(categoria)
+            if fim <= inicio:
+                continue
+
+            scores = consultas @ segmento.matriz[inicio:fim].T
+            if segmento.ativos is not None:
+                scores[:, ~segmento.ativos[inicio:fim]] = -np.inf
+            k = min(limite, fim - inicio)
+
+            for encontrados, linha in zip(candidatos, scores):
+                encontrados.extend(
+                    (float(linha[i]), segmento, inicio + i)
+                    for i in np.argpartition(-linha, k - 1)[:k]
+                    if linha[i] >= similaridade_minima
+                )
+
+        return [
+            [
+                {
+                    "content": segmento.conteudos[i],
+                    "categoria": segmento.categorias[i],
+                    "similaridade": score,
+                }
+                for score, segmento, i in sorted(encontrados, key=lambda c: -c[0])[:limite]
+            ]
+            for encontrados in candidatos
+        ]
+
+    # ------------------------------------------------------------------
+    # Persistência
+    # ------------------------------------------------------------------
+    def salvar(self, diretorio: str | Path):
+        """Compacta os segmentos e grava a matriz (.npy) e os metadados (JSON) em `diretorio`."""
+        diretorio = Path(diretorio)
+        diretorio.mkdir(parents=True, exist_ok=True)
+
+        segmentos = list(self._segmentos)
+        if not segmentos:
+            vazio = np.empty(0, dtype=object)
+            segmento = _Segmento(np.empty((0, 0), dtype=np.float32), vazio, vazio, vazio, vazio, {})
+        elif len(segmentos) == 1 and segmentos[0].ativos is None:
+            segmento = segmentos[0]
+        else:
+            segmento = _compactar(segmentos)
+
+        np.save(diretorio / "matriz.npy", segmento.matriz)
+        metadados = {
+            "ids": [str(i) if not isinstance(i, int) else i for i in segmento.ids.tolist()],
+            "categorias": segmento.categorias.tolist(),
+            "conteudos": segmento.conteudos.tolist(),
+            "criados_em": [c.isoformat() if hasattr(c, "isoformat") else c for c in segmento.criados_em.tolist()],
+        }
+        with open(diretorio / "metadados.json", "w", encoding="utf-8") as arquivo:
+            json.dump(metadados, arquivo, ensure_ascii=False)
+
+    @classmethod
+    def abrir(cls, diretorio: str | Path, mmap: bool = True) -> "IndiceLocal":
+        """
+        Reabre um índice salvo. Com `mmap`, a matriz é mapeada do arquivo e
+        compartilhada entre processos pelo cache de páginas do SO.
+        """
+        diretorio = Path(diretorio)
+        with open(diretorio / "metadados.json", encoding="utf-8") as arquivo:
+            metadados = json.load(arquivo)
+
+        # Arquivos gravados por salvar() já estão ordenados por categoria
+        categorias = np.array(metadados["categorias"], dtype=object)
+        segmento = _Segmento(
+            matriz=np.load(diretorio / "matriz.npy", mmap_mode="r" if mmap else None),
+            ids=np.array(metadados["ids"], dtype=object),
+            categorias=categorias,
+            conteudos=np.array(metadados["conteudos"], dtype=object),
+            criados_em=np.array(
+                [datetime.fromisoformat(c) if isinstance(c, str) else c for c in metadados["criados_em"]],
+                dtype=object
+            ),
+            faixas=_faixas(categorias),
+        )
+
+        indice = cls()
+        if len(segmento.ids):
+            indice._segmentos = (segmento,)
+            indice._ids_conhecidos = set(segmento.ids.tolist())
+            indice.marca = max(zip(segmento.criados_em.tolist(), segmento.ids.tolist()))
+        return indice
+
+
+_indice: IndiceLocal | None = None
+_ultima_verificacao = 0.0
+_indice_lock = threading.Lock()
+
+
+def obter_indice_local() -> IndiceLocal:
+    """
+    Índice local do processo, carregado no primeiro uso e atualizado quando a
+    geração do corpus muda (verificada no máximo a cada RAG_INDICE_LOCAL_INTERVALO s).
+
+    Se RAG_INDICE_LOCAL_DIR apontar para um snapshot, ele é aberto com
+    memory-map e só a diferença em relação ao banco é carregada.
+
+    A atualização roda numa cópia, fora do lock: enquanto uma thread lê o
+    banco, as demais seguem buscando no índice atual, que só é trocado
+    pela cópia no fim.
+    """
+    global _indice, _ultima_verificacao
+
+    with _indice_lock:
+        agora = time.monotonic()
+        if _indice is None:
+            # Sem índice não há o que servir: quem chegar agora espera a carga
+            if DIRETORIO_SNAPSHOT and (Path(DIRETORIO_SNAPSHOT) / "matriz.npy").exists():
+                _indice = IndiceLocal.abrir(DIRETORIO_SNAPSHOT)
+                _indice.atualizar()
+            else:
+                _indice = IndiceLocal.carregar_do_banco()
+            _ultima_verificacao = agora
+            return _indice
+        if agora - _ultima_verificacao < INTERVALO_ATUALIZACAO:
+            return _indice
+        # Marcar a verificação reserva a atualização para esta thread
+        _ultima_verificacao = agora
+        atual = _indice
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            geracao = obter_geracao_corpus(cursor)
+        finally:
+            cursor.close()
+    if geracao is not None and geracao == atual.geracao:
+        return atual
+
+    # Cópia rasa: os segmentos são imutáveis e _aplicar só troca referências
+    novo = copy.copy(atual)
+    novo.atualizar()
+    with _indice_lock:
+        if _indice is atual:
+            _indice = novo
+        return _indice
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        print("Uso: python -m src.rag.indice_local <diretório do snapshot>")
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    indice = IndiceLocal.carregar_do_banco()
+    indice.salvar(sys.argv[1])
+    print(f"✅ {len(indice)} embeddings salvos em {sys.argv[1]} ({time.perf_counter() - inicio:.1f}s)")
@@ -1,69 +1,32 @@
 import os
-from src.db.conection import get_vector_conn
-from src.rag.generate import gerar_embedding
-
-
-
-# ============================
-# LEITURA DO TXT
-# ============================
+from src.rag.chunking import iterar_blocos
+from src.rag.pipeline import executar_ingestao
 
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 TEXTO_PATH = os.path.join(BASE_PATH, "Texto.txt")
 
-with open(TEXTO_PATH, "r", encoding="utf-8") as file:
-    texto = file.read()
-
-
-# ============================
-# DIVIDE TEXTO EM BLOCOS
-# ============================
-def dividir_em_blocos(texto: str, tamanho=800):
-    palavras = texto.split()
-    blocos = []
-    atual = []
-
-    for palavra in palavras:
-        atual.append(palavra)
-        if len(" ".join(atual)) >= tamanho:
-            blocos.append(" ".join(atual))
-            atual = []
-
-    if atual:
-        blocos.append(" ".join(atual))
-
-    return blocos
-
 
 # ============================
 # INSERIR NO PGVECTOR
 # ============================
-def inserir_embeddings(textos: list[str], categoria: str):
-    conn = get_vector_conn()
-    cursor = conn.cursor()
-
-    sql = """
-        INSERT INTO rag_embeddings (content, categoria, embedding)
-        VALUES (%s, %s, %s)
-    """
-
+def inserir_embeddings(textos, categoria: str):
     try:
-        for i, texto in enumerate(textos, 1):
-            print(f"⏳ Processando bloco {i}/{len(textos)}...")
-            embedding = gerar_embedding(texto)
-            cursor.execute(sql, (texto, categoria, embedding))
-
-        conn.commit()
-        print(f"✅ {len(textos)} embeddings inseridos com sucesso!")
+        resultado = executar_ingestao(
+            textos,
+            categoria,
+            ao_progredir=lambda feitos, total: print(
+                f"⏳ Processando bloco {feitos}/{total}..." if total else f"⏳ {feitos} blocos processados..."
+            )
+        )
+        print(
+            f"✅ {resultado['linhas']} embeddings novos inseridos com sucesso! "
+            f"{resultado['reaproveitados']} blocos já existiam e foram reaproveitados "
+            f"({resultado['linhas_por_segundo']:.0f} embeddings gravados/s)"
+        )
 
     except Exception as e:
-        conn.rollback()
         print(f"❌ Erro ao inserir embeddings: {e}")
 
-    finally:
-        cursor.close()
-        conn.close()
-
 
 # ============================
 # EXECUÇÃO PRINCIPAL
@@ -71,8 +34,6 @@ def inserir_embeddings(textos: list[str], categoria: str):
 if __name__ == "__main__":
     CATEGORIA = input("Categoria: ")  # ← movi para cá
 
-    blocos = dividir_em_blocos(texto, tamanho=800)
-
-    print(f"📄 Total de blocos gerados: {len(blocos)}")
-
-    inserir_embeddings(blocos, CATEGORIA)
\ No newline at end of file
+    # Lê o arquivo em fluxo: os blocos seguem para a ingestão conforme são gerados
+    with open(TEXTO_PATH, "r", encoding="utf-8") as file:
+        inserir_embeddings(iterar_blocos(file, tamanho=800), CATEGORIA)
\ No newline at end of file
@@ -0,0 +1,345 @@
+import os
+import socket
+
+import psycopg2
+from psycopg2.extras import Json
+from dotenv import load_dotenv
+
+from src.db.conection import vector_conn
+
+load_dotenv()
+
+# Segundos sem heartbeat até um job em processamento ser considerado abandonado
+TIMEOUT_JOB = int(os.getenv("RAG_JOB_TIMEOUT", "300"))
+
+# Tentativas antes de um job (com falha ou abandonado) ir para 'erro'
+MAX_TENTATIVAS = int(os.getenv("RAG_JOB_MAX_TENTATIVAS", "3"))
+
+# Espera antes de uma nova tentativa, multiplicada pelo número de tentativas
+ESPERA_REAGENDAMENTO = int(os.getenv("RAG_JOB_ESPERA_REAGENDAMENTO", "30"))
+
+STATUS_FINAIS = ("concluido", "erro", "cancelado")
+
+_COLUNAS_PUBLICAS = """
+    id, tipo, status, categoria, arquivo, parametros, progresso, total, mensagem,
+    resultado, erro, tentativas, worker, criado_em, iniciado_em, heartbeat_em, concluido_em,
+    cancelamento_solicitado
+"""
+
+
+def identificador_worker() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enfileirar_job(
+    tipo: str,
+    categoria: str,
+    conteudo: bytes,
+    arquivo: str | None = None,
+    parametros: dict | None = None,
+) -> int:
+    """
+    Coloca um job na fila de ingestão.
+
+    Args:
+        tipo: "pdf", "texto" ou "exclusao_categoria"
+        categoria: Categoria dos embeddings
+        conteudo: Bytes do PDF ou texto em UTF-8 (os workers não compartilham disco com a UI);
+            vazio para jobs que não recebem arquivo
+        arquivo: Nome do arquivo de origem
+        parametros: Argumentos de divisão em blocos e afins
+
+    Returns:
+        ID do job
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO rag_jobs (tipo, categoria, arquivo, parametros, conteudo)
+                VALUES (%s, %s, %s, %s, %s)
+                RETURNING id
+            """, (tipo, categoria, arquivo, Json(parametros or {}), psycopg2.Binary(conteudo)))
+            job_id = cursor.fetchone()["id"]
+            conn.commit()
+            return job_id
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+
+def reservar_job(worker: str | None = None) -> dict | None:
+    """
+    Reserva o job pendente mais antigo para `worker`.
+
+    FOR UPDATE SKIP LOCKED deixa vários workers consultarem a fila ao mesmo
+    tempo sem disputar a mesma linha. Jobs em processamento sem heartbeat há
+    mais de RAG_JOB_TIMEOUT segundos (worker morto) voltam a ser elegíveis.
+
+    Returns:
+        O job com 'conteudo' em bytes, ou None se a fila estiver vazia
+    """
+    worker = worker or identificador_worker()
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            # Abandonados com cancelamento pedido não são retomados
+            cursor.execute("""
+                UPDATE rag_jobs
+                SET status = 'cancelado', concluido_em = now()
+                WHERE status = 'processando'
+                  AND cancelamento_solicitado
+                  AND heartbeat_em < now() - make_interval(secs => %s)
+            """, (TIMEOUT_JOB,))
+
+            # Abandonados que já esgotaram as tentativas não voltam para a fila
+            cursor.execute("""
+                UPDATE rag_jobs
+                SET status = 'erro',
+                    erro = 'Worker parou de responder ' || tentativas || ' vezes',
+                    concluido_em = now()
+                WHERE status = 'processando'
+                  AND heartbeat_em < now() - make_interval(secs => %s)
+                  AND tentativas >= %s
+            """, (TIMEOUT_JOB, MAX_TENTATIVAS))
+
+            cursor.execute(f"""
+                UPDATE rag_jobs
+                SET status = 'processando',
+                    worker = %s,
+                    tentativas = tentativas + 1,
+                    iniciado_em = now(),
+                    heartbeat_em = now()
+                WHERE id = (
+                    SELECT id FROM rag_jobs
+                    WHERE (status = 'pendente' AND disponivel_em <= now())
+                       OR (status = 'processando' AND heartbeat_em < now() - make_interval(secs => %s))
+                    ORDER BY criado_em
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING {_COLUNAS_PUBLICAS}, conteudo
+            """, (worker, TIMEOUT_JOB))
+            job = cursor.fetchone()
+            conn.commit()
+
+            if job is None:
+                return None
+            job = dict(job)
+            job["conteudo"] = bytes(job["conteudo"]) if job["conteudo"] is not None else b""
+            return job
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+
+def atualizar_job(job_id: int, progresso: int | None = None, total: int | None = None, mensagem: str | None = None):
+    """Grava progresso e renova o heartbeat (campos None ficam como estão)."""
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE rag_jobs
+                SET progresso = COALESCE(%s, progresso),
+                    total = COALESCE(%s, total),
+                    mensagem = COALESCE(%s, mensagem),
+                    heartbeat_em = now()
+                WHERE id = %s AND status = 'processando'
+            """, (progresso, total, mensagem, job_id))
+            conn.commit()
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+
+def finalizar_job(
+    job_id: int,
+    worker: str,
+    resultado: dict | None = None,
+    erro: str | None = None,
+    status: str | None = None,
+) -> bool:
+    """
+    Marca o job como concluído (ou com erro) e descarta o conteúdo enviado.
+
+    `status` sobrepõe o status deduzido (ex.: "cancelado"). Só grava se o job
+    ainda estiver em processamento por `worker`: um worker que ficou sem
+    heartbeat além de RAG_JOB_TIMEOUT pode ter perdido o job para outro.
+
+    Returns:
+        False se o job já não pertencia a `worker` (nada foi gravado)
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE rag_jobs
+                SET status = %s,
+                    resultado = %s,
+                    erro = %s,
+                    conteudo = NULL,
+                    concluido_em = now(),
+                    heartbeat_em = now()
+                WHERE id = %s AND worker = %s AND status = 'processando'
+            """, (
+                status or ("erro" if erro else "concluido"), Json(resultado) if resultado else None, erro,
+                job_id, worker,
+            ))
+            finalizado = cursor.rowcount > 0
+            conn.commit()
+            return finalizado
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+
+def reagendar_job(job_id: int, worker: str, erro: str) -> bool:
+    """
+    Devolve um job que falhou para a fila, se ainda houver tentativas.
+
+    A ingestão grava checkpoints, então a nova tentativa retoma de onde a
+    anterior parou. Como em finalizar_job, só vale enquanto o job pertencer a `worker`.
+
+    Returns:
+        True se o job foi reagendado, False se esgotou as tentativas (fica como
+        'erro') ou se já pertencia a outro worker
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE rag_jobs
+                SET status = 'pendente',
+                    erro = %s,
+                    disponivel_em = now() + make_interval(secs => %s * tentativas)
+                WHERE id = %s AND worker = %s AND status = 'processando'
+                  AND tentativas < %s AND NOT cancelamento_solicitado
+            """, (erro, ESPERA_REAGENDAMENTO, job_id, worker, MAX_TENTATIVAS))
+            reagendado = cursor.rowcount > 0
+            conn.commit()
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+    if not reagendado:
+        finalizar_job(job_id, worker, erro=erro)
+    return reagendado
+
+
+def cancelar_job(job_id: int) -> bool:
+    """
+    Cancela um job: se ainda estiver na fila, sai dela na hora; se estiver em
+    processamento, o worker para no próximo ponto de verificação (ver
+    cancelamento_solicitado) e o marca como 'cancelado'.
+
+    Returns:
+        True se o job ainda não tinha terminado
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE rag_jobs
+                SET cancelamento_solicitado = true,
+                    status = CASE WHEN status = 'pendente' THEN 'cancelado' ELSE status END,
+                    concluido_em = CASE WHEN status = 'pendente' THEN now() ELSE concluido_em END,
+                    conteudo = CASE WHEN status = 'pendente' THEN NULL ELSE conteudo END
+                WHERE id = %s AND status IN ('pendente', 'processando')
+            """, (job_id,))
+            cancelado = cursor.rowcount > 0
+            conn.commit()
+            return cancelado
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        finally:
+            cursor.close()
+
+
+def cancelamento_solicitado(job_id: int) -> bool:
+    """Consultado pelo worker entre lotes: o usuário pediu para cancelar o job?"""
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT cancelamento_solicitado FROM rag_jobs WHERE id = %s", (job_id,))
+            row = cursor.fetchone()
+            return bool(row and row["cancelamento_solicitado"])
+
+        finally:
+            cursor.close()
+
+
+def obter_job(job_id: int) -> dict | None:
+    """
+    Busca um job pelo ID (sem o conteúdo).
+
+    Returns:
+        Dicionário com os dados do job, ou None se não existir
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(f"SELECT {_COLUNAS_PUBLICAS} FROM rag_jobs WHERE id = %s", (job_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+        except Exception as e:
+            print(f"❌ Erro ao buscar job: {e}")
+            return None
+
+        finally:
+            cursor.close()
+
+
+def listar_jobs(limite: int = 20, tipos: tuple[str, ...] | None = None) -> list[dict]:
+    """
+    Lista os jobs mais recentes (sem o conteúdo).
+
+    Args:
+        limite: Número máximo de resultados
+        tipos: Filtro opcional por tipo de job
+
+    Returns:
+        Lista de dicionários com os dados dos jobs
+    """
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            filtro = "WHERE tipo = ANY(%s)" if tipos else ""
+            cursor.execute(
+                f"SELECT {_COLUNAS_PUBLICAS} FROM rag_jobs {filtro} ORDER BY criado_em DESC LIMIT %s",
+                (list(tipos), limite) if tipos else (limite,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+        except Exception as e:
+            print(f"❌ Erro ao listar jobs: {e}")
+            return []
+
+        finally:
+            cursor.close()
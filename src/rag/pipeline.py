@@ -0,0 +1,333 @@
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+import psycopg2
+
+from src.db.conection import vector_conn
+from src.rag.bulk import COLUNAS_PADRAO, hash_conteudo, inserir_em_massa
+from src.rag.cache_busca import invalidar_cache_busca
+from src.rag.generate import gerar_embeddings_em_lote
+
+
+class LimitadorAdaptativo:
+    """
+    Controla quantas requisições de embedding rodam ao mesmo tempo.
+
+    A cada 429 o limite de concorrência cai pela metade e todas as threads
+    pausam pelo Retry-After (ou por uma espera exponencial). Após uma
+    sequência de sucessos o limite volta a subir, uma vaga por vez.
+
+    Args:
+        max_concorrencia: Teto de requisições simultâneas
+        espera_inicial: Pausa após o primeiro 429 sem Retry-After
+        espera_maxima: Teto da pausa exponencial
+        sucessos_para_aumentar: Sucessos seguidos para liberar mais uma vaga
+    """
+
+    def __init__(
+        self,
+        max_concorrencia: int = 4,
+        espera_inicial: float = 1.0,
+        espera_maxima: float = 60.0,
+        sucessos_para_aumentar: int = 5,
+    ):
+        self.max_concorrencia = max_concorrencia
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.sucessos_para_aumentar = sucessos_para_aumentar
+
+        self.limite = max_concorrencia
+        self.em_uso = 0
+        self.limites_atingidos = 0
+
+        self._cond = threading.Condition()
+        self._pausa_ate = 0.0
+        self._espera = espera_inicial
+        self._sucessos = 0
+
+    def adquirir(self):
+        """Bloqueia até haver vaga e nenhuma pausa em andamento."""
+        with self._cond:
+            while True:
+                restante = self._pausa_ate - time.monotonic()
+                if restante > 0:
+                    self._cond.wait(restante)
+                elif self.em_uso < self.limite:
+                    self.em_uso += 1
+                    return
+                else:
+                    self._cond.wait()
+
+    def liberar(self, sucesso: bool = False, limitado: bool = False, pausa: float | None = None):
+        """Devolve a vaga, ajustando o limite conforme o resultado da requisição."""
+        with self._cond:
+            self.em_uso -= 1
+
+            if limitado:
+                self.limites_atingidos += 1
+                self.limite = max(1, self.limite // 2)
+                self._sucessos = 0
+                pausa = pausa if pausa is not None else self._espera
+                self._espera = min(self._espera * 2, self.espera_maxima)
+                self._pausa_ate = max(self._pausa_ate, time.monotonic() + pausa)
+
+            elif sucesso:
+                self._espera = self.espera_inicial
+                self._sucessos += 1
+                if self._sucessos >= self.sucessos_para_aumentar and self.limite < self.max_concorrencia:
+                    self.limite += 1
+                    self._sucessos = 0
+
+            self._cond.notify_all()
+
+
+def _agrupar(textos: Iterable[str], tamanho: int) -> Iterator[list[str]]:
+    iterador = iter(textos)
+    while lote := list(islice(iterador, tamanho)):
+        yield lote
+
+
+def _hashes_existentes(cursor, categoria: str, hashes: list[str]) -> set[str]:
+    """Hashes de `hashes` que já estão gravados na categoria (inclusive nesta transação)."""
+    cursor.execute(
+        "SELECT content_hash FROM rag_embeddings WHERE categoria = %s AND content_hash = ANY(%s)",
+        (categoria, hashes)
+    )
+    return {row["content_hash"] for row in cursor.fetchall()}
+
+
+def _dimensao_divergente(cursor, dimensoes: int) -> int | None:
+    """
+    Largura de algum vetor do corpus diferente de `dimensoes` (None se não houver).
+
+    min e max saem das duas pontas do índice de embedding_dim; um filtro
+    `<> dimensoes` percorreria a tabela toda quando todas as linhas batem.
+    """
+    cursor.execute("SELECT min(embedding_dim) AS menor, max(embedding_dim) AS maior FROM rag_embeddings")
+    row = cursor.fetchone()
+    for largura in (row["menor"], row["maior"]):
+        if largura is not None and largura != dimensoes:
+            return largura
+    return None
+
+
+def _gravar_lote(cursor, linhas: list[tuple], colunas: tuple[str, ...] = COLUNAS_PADRAO) -> int:
+    """
+    Grava um lote com COPY. Se outra ingestão gravou o mesmo conteúdo nesse
+    meio-tempo (violação de unicidade), refaz o lote com INSERT ... ON CONFLICT
+    DO NOTHING, sem perder o restante da transação.
+
+    Returns:
+        Linhas efetivamente gravadas
+    """
+    cursor.execute("SAVEPOINT lote_ingestao")
+    try:
+        gravadas = inserir_em_massa(cursor, linhas, colunas)["linhas"]
+    except psycopg2.errors.UniqueViolation:
+        cursor.execute("ROLLBACK TO SAVEPOINT lote_ingestao")
+        gravadas = inserir_em_massa(
+            cursor, linhas, colunas, metodo="values", tamanho_lote=len(linhas),
+            conflito="ON CONFLICT (categoria, content_hash) DO NOTHING"
+        )["linhas"]
+    cursor.execute("RELEASE SAVEPOINT lote_ingestao")
+    return gravadas
+
+
+def ingerir_na_transacao(
+    cursor,
+    textos: Iterable,
+    categoria: str,
+    colunas_extras: tuple[str, ...] = (),
+    max_workers: int | None = None,
+    tamanho_lote: int = 64,
+    total: int | None = None,
+    ao_progredir: Callable[[int, int | None], None] | None = None,
+    apos_lote: Callable[[], None] | None = None,
+) -> dict:
+    """
+    Núcleo de executar_ingestao: gera os embeddings e grava pelo `cursor`,
+    sem commit, para quem precisa fazer outras escritas na mesma transação.
+
+    `textos` é consumido na thread chamadora, a mesma que usa o cursor, então
+    o próprio iterador pode executar comandos nesse cursor entre um bloco e outro.
+
+    Args:
+        colunas_extras: Colunas adicionais gravadas com cada bloco; quando
+            informadas, cada item de `textos` é uma tupla (texto, *valores)
+        apos_lote: Chamado após gravar cada lote (ex.: conn.commit para checkpoints)
+
+    Demais argumentos e retorno: ver executar_ingestao.
+    """
+    max_workers = max_workers or int(os.getenv("EMBEDDING_MAX_WORKERS", "4"))
+    if total is None and hasattr(textos, "__len__"):
+        total = len(textos)
+
+    colunas = COLUNAS_PADRAO + tuple(colunas_extras)
+    limitador = LimitadorAdaptativo(max_workers)
+    lotes = _agrupar(textos, tamanho_lote)
+    concluidos = 0
+    gravadas = 0
+    reaproveitados = 0
+    vistos = set()
+    dimensoes_conferidas = False
+    inicio = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pendentes = {}
+
+        def progredir(quantidade: int):
+            nonlocal concluidos
+            concluidos += quantidade
+            if ao_progredir:
+                ao_progredir(concluidos, total)
+
+        def submeter():
+            nonlocal reaproveitados
+            # Mantém a fila curta para não consumir um iterador inteiro de uma vez
+            while len(pendentes) < max_workers * 2:
+                lote = next(lotes, None)
+                if lote is None:
+                    return
+
+                itens = [item if colunas_extras else (item,) for item in lote]
+                hashes = [hash_conteudo(item[0]) for item in itens]
+                existentes = _hashes_existentes(cursor, categoria, list(set(hashes) - vistos))
+                novos = []
+                for item, hash_texto in zip(itens, hashes):
+                    if hash_texto in vistos or hash_texto in existentes:
+                        continue
+                    vistos.add(hash_texto)
+                    novos.append(item)
+                vistos.update(existentes)
+                reaproveitados += len(lote) - len(novos)
+
+                if not novos:
+                    progredir(len(lote))
+                    continue
+
+                futuro = executor.submit(
+                    gerar_embeddings_em_lote, [item[0] for item in novos], limitador=limitador
+                )
+                pendentes[futuro] = (novos, len(lote))
+
+        try:
+            submeter()
+            while pendentes:
+                prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    novos, tamanho = pendentes.pop(futuro)
+                    embeddings = futuro.result()
+                    if not dimensoes_conferidas:
+                        # Vetores de larguras diferentes não são comparáveis na busca
+                        existente = _dimensao_divergente(cursor, len(embeddings[0]))
+                        if existente is not None:
+                            raise ValueError(
+                                f"O corpus tem vetores de {existente} dimensões e os novos têm "
+                                f"{len(embeddings[0])}: ajuste EMBEDDING_DIMENSOES ou reprocesse o corpus"
+                            )
+                        dimensoes_conferidas = True
+                    submeter()
+
+                    gravadas += _gravar_lote(
+                        cursor,
+                        [
+                            (item[0], categoria, embedding, *item[1:])
+                            for item, embedding in zip(novos, embeddings)
+                        ],
+                        colunas,
+                    )
+                    if apos_lote:
+                        apos_lote()
+                    progredir(tamanho)
+
+        except BaseException:
+            for futuro in pendentes:
+                futuro.cancel()
+            raise
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "linhas": gravadas,
+        "reaproveitados": reaproveitados,
+        "segundos": segundos,
+        # Só as linhas gravadas: blocos reaproveitados não custaram nada
+        "linhas_por_segundo": gravadas / segundos if segundos > 0 else 0.0,
+        "limites_atingidos": limitador.limites_atingidos,
+    }
+
+
+def executar_ingestao(
+    textos: Iterable[str],
+    categoria: str,
+    max_workers: int | None = None,
+    tamanho_lote: int = 64,
+    total: int | None = None,
+    ao_progredir: Callable[[int, int | None], None] | None = None,
+    checkpoint: bool = True,
+) -> dict:
+    """
+    Gera embeddings em paralelo e grava no banco à medida que os lotes ficam prontos.
+
+    As requisições rodam numa thread pool limitada por LimitadorAdaptativo;
+    a thread chamadora grava cada lote concluído (COPY) enquanto os demais
+    ainda aguardam a API.
+
+    Blocos cujo conteúdo já existe na categoria (ou que se repetem na própria
+    entrada) são pulados antes de chamar a API de embeddings.
+
+    Com `checkpoint`, cada lote gravado é commitado na hora. Os lotes são
+    gravados na ordem em que a API responde, não na da entrada, então uma
+    falha no meio deixa no banco um subconjunto qualquer dos lotes, não um
+    prefixo. Uma nova execução com a mesma entrada relê tudo, mas a
+    deduplicação pula os blocos já gravados e só os demais vão à API.
+    Sem `checkpoint`, tudo é gravado numa única transação.
+
+    Args:
+        textos: Blocos de texto (lista ou iterador)
+        categoria: Categoria dos embeddings
+        max_workers: Requisições simultâneas (padrão: EMBEDDING_MAX_WORKERS ou 4)
+        tamanho_lote: Blocos por requisição
+        total: Total de blocos, se conhecido, repassado ao callback
+        ao_progredir: Callback chamado na thread chamadora com (concluidos, total)
+        checkpoint: Commita a cada lote em vez de uma transação única
+
+    Returns:
+        Dicionário com 'linhas' (blocos novos gravados), 'reaproveitados'
+        (blocos já existentes, pulados), 'segundos', 'linhas_por_segundo'
+        (linhas gravadas por segundo) e 'limites_atingidos'
+    """
+    commitados = False
+
+    with vector_conn() as conn:
+        cursor = conn.cursor()
+
+        def commitar():
+            nonlocal commitados
+            conn.commit()
+            commitados = True
+
+        try:
+            resultado = ingerir_na_transacao(
+                cursor, textos, categoria,
+                max_workers=max_workers, tamanho_lote=tamanho_lote,
+                total=total, ao_progredir=ao_progredir,
+                apos_lote=commitar if checkpoint else None,
+            )
+            conn.commit()
+            if resultado["linhas"]:
+                invalidar_cache_busca(cursor)
+            return resultado
+
+        except BaseException:
+            conn.rollback()
+            if commitados:
+                # Lotes já commitados continuam no banco
+                invalidar_cache_busca()
+            raise
+
+        finally:
+            cursor.close()
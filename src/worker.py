@@ -0,0 +1,188 @@
+"""
+Worker de ingestão: consome a fila rag_jobs e gera os embeddings fora do Streamlit.
+
+Uso:
+    python -m src.worker
+    docker compose up --scale ingestion_worker=4
+
+Vários workers podem rodar ao mesmo tempo; cada job é reservado por um só
+(FOR UPDATE SKIP LOCKED). SIGTERM/SIGINT terminam o job atual antes de sair.
+"""
+import io
+import os
+import signal
+import threading
+import time
+import traceback
+
+from src.db.schema import aplicar_migracoes
+from src.pdf.pdf_extractor import iterar_paginas_pdf, obter_info_pdf
+from src.rag.chunking import dividir_em_blocos
+from src.rag.crud import consolidar_estatisticas, contar_embeddings, deletar_categoria_em_lotes
+from src.rag.documentos import reingerir_documento
+from src.rag.jobs import (
+    TIMEOUT_JOB,
+    atualizar_job,
+    cancelamento_solicitado,
+    finalizar_job,
+    identificador_worker,
+    reagendar_job,
+    reservar_job,
+)
+from src.rag.pipeline import executar_ingestao
+
+# Segundos entre consultas à fila quando ela está vazia
+INTERVALO_FILA = float(os.getenv("RAG_WORKER_INTERVALO", "2"))
+
+# Intervalo mínimo entre gravações de progresso
+INTERVALO_PROGRESSO = 1.0
+
+_parar = threading.Event()
+
+
+class _Heartbeat:
+    """Renova o heartbeat do job enquanto ele roda, mesmo sem progresso (ex.: esperando a API)."""
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self._fim = threading.Event()
+        self._thread = threading.Thread(target=self._rodar, daemon=True)
+
+    def _rodar(self):
+        while not self._fim.wait(max(TIMEOUT_JOB / 5, 1)):
+            try:
+                atualizar_job(self.job_id)
+            except Exception as e:
+                print(f"⚠️ Falha no heartbeat do job {self.job_id}: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fim.set()
+        self._thread.join()
+
+
+def _progresso(job_id: int):
+    """Callback de progresso que grava no máximo uma vez por INTERVALO_PROGRESSO."""
+    ultimo = 0.0
+
+    def atualizar(progresso: int, total: int | None, mensagem: str | None = None):
+        nonlocal ultimo
+        agora = time.monotonic()
+        if agora - ultimo >= INTERVALO_PROGRESSO or (total and progresso >= total):
+            ultimo = agora
+            atualizar_job(job_id, progresso, total, mensagem)
+
+    return atualizar
+
+
+def processar_pdf(job: dict) -> dict:
+    atualizar = _progresso(job["id"])
+    total_paginas = obter_info_pdf(io.BytesIO(job["conteudo"])).get("num_paginas", 0)
+    paginas_lidas = 0
+
+    def paginas():
+        nonlocal paginas_lidas
+        for pagina in iterar_paginas_pdf(io.BytesIO(job["conteudo"])):
+            paginas_lidas = pagina["pagina"]
+            yield pagina
+
+    return reingerir_documento(
+        paginas(),
+        job["categoria"],
+        job["arquivo"],
+        job["parametros"].get("divisao"),
+        ao_progredir=lambda feitos, _: atualizar(
+            paginas_lidas, total_paginas, f"{feitos} blocos processados (página {paginas_lidas}/{total_paginas})"
+        ),
+    )
+
+
+def processar_texto(job: dict) -> dict:
+    atualizar = _progresso(job["id"])
+    blocos = dividir_em_blocos(job["conteudo"].decode("utf-8"), **job["parametros"].get("divisao", {}))
+
+    return executar_ingestao(
+        blocos,
+        job["categoria"],
+        ao_progredir=lambda feitos, total: atualizar(feitos, total, f"Bloco {feitos}/{total}"),
+    )
+
+
+def processar_exclusao_categoria(job: dict) -> dict:
+    atualizar = _progresso(job["id"])
+    # Lido do catálogo de estatísticas, sem contar a tabela
+    total = contar_embeddings(job["categoria"])
+
+    return deletar_categoria_em_lotes(
+        job["categoria"],
+        ao_progredir=lambda removidos: atualizar(removidos, total, f"{removidos}/{total} trechos removidos"),
+        cancelado=lambda: cancelamento_solicitado(job["id"]),
+        manutencao=job["parametros"].get("manutencao"),
+    )
+
+
+PROCESSADORES = {
+    "pdf": processar_pdf,
+    "texto": processar_texto,
+    "exclusao_categoria": processar_exclusao_categoria,
+}
+
+
+def executar_job(job: dict):
+    print(f"⏳ Job {job['id']} ({job['tipo']}, categoria '{job['categoria']}', tentativa {job['tentativas']})")
+    inicio = time.perf_counter()
+
+    try:
+        processador = PROCESSADORES.get(job["tipo"])
+        if processador is None:
+            raise ValueError(f"Tipo de job desconhecido: {job['tipo']}")
+
+        with _Heartbeat(job["id"]):
+            resultado = processador(job)
+
+        cancelado = bool(resultado.get("cancelado"))
+        if not finalizar_job(job["id"], job["worker"], resultado=resultado, status="cancelado" if cancelado else None):
+            print(f"⚠️ Job {job['id']} foi retomado por outro worker; resultado descartado")
+        elif cancelado:
+            print(f"🚫 Job {job['id']} cancelado após {time.perf_counter() - inicio:.1f}s")
+        else:
+            print(f"✅ Job {job['id']} concluído em {time.perf_counter() - inicio:.1f}s")
+
+    except Exception as e:
+        traceback.print_exc()
+        if reagendar_job(job["id"], job["worker"], str(e)):
+            print(f"⚠️ Job {job['id']} falhou e foi reagendado: {e}")
+        else:
+            print(f"❌ Job {job['id']} falhou: {e}")
+
+
+def main():
+    worker = identificador_worker()
+    signal.signal(signal.SIGTERM, lambda *_: _parar.set())
+    signal.signal(signal.SIGINT, lambda *_: _parar.set())
+
+    aplicar_migracoes()
+    print(f"🚀 Worker {worker} aguardando jobs")
+
+    while not _parar.is_set():
+        consolidar_estatisticas()
+        try:
+            job = reservar_job(worker)
+        except Exception as e:
+            print(f"❌ Erro ao consultar a fila: {e}")
+            job = None
+
+        if job is None:
+            _parar.wait(INTERVALO_FILA)
+            continue
+
+        executar_job(job)
+
+    print(f"👋 Worker {worker} encerrado")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+from contextlib import contextmanager
+
+import pytest
+
+# O cliente da OpenAI é criado na importação de src.rag.generate e exige uma chave
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+# Testes não devem ler nem gravar o cache persistente de embeddings do projeto
+os.environ["EMBEDDING_CACHE_PATH"] = ""
+
+
+class _ConexaoFalsa:
+    """Conexão mínima em volta de um cursor falso que não faz papel de conexão."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def vector_conn_falso(monkeypatch):
+    """
+    Troca o vector_conn de um módulo por um que entrega o cursor falso dado.
+
+    Uso: vector_conn_falso(modulo, cursor). Se o cursor tiver cursor(), ele
+    mesmo faz o papel da conexão (para contar commits e rollbacks);
+    senão, é embrulhado numa conexão que só o devolve.
+    """
+    def substituir(modulo, cursor):
+        conexao = cursor if hasattr(cursor, "cursor") else _ConexaoFalsa(cursor)
+
+        @contextmanager
+        def fake_vector_conn():
+            yield conexao
+
+        monkeypatch.setattr(modulo, "vector_conn", fake_vector_conn)
+        return conexao
+
+    return substituir
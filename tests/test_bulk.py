@@ -0,0 +1,41 @@
+import struct
+
+import numpy as np
+
+import pytest
+
+from src.rag.bulk import _buffer_copy, hash_conteudo, inserir_em_massa, literal_vetor
+
+
+def test_buffer_copy_binario():
+    dados = _buffer_copy([("olá", None, [1.0, -2.5])], ["text", "text", "vector"]).getvalue()
+
+    assert dados.startswith(b"PGCOPY\n\xff\r\n\x00")
+    assert dados.endswith(struct.pack("!h", -1))
+
+    corpo = dados[19:-2]
+    assert struct.unpack("!h", corpo[:2]) == (3,)
+
+    texto = "olá".encode("utf-8")
+    assert corpo[2:6] == struct.pack("!i", len(texto))
+    assert corpo[6:6 + len(texto)] == texto
+
+    resto = corpo[6 + len(texto):]
+    assert resto[:4] == struct.pack("!i", -1)
+    assert resto[4:8] == struct.pack("!i", 4 + 2 * 4)
+    assert struct.unpack("!hh2f", resto[8:]) == (2, 0, 1.0, -2.5)
+
+
+def test_literal_vetor():
+    assert literal_vetor(np.array([0.5, 1], dtype=np.float32)) == "[0.5,1.0]"
+
+
+def test_hash_conteudo_igual_ao_md5_do_postgres():
+    # SELECT md5('abc') no PostgreSQL
+    assert hash_conteudo("abc") == "900150983cd24fb0d6963f7d28e17f72"
+    assert hash_conteudo("") == "d41d8cd98f00b204e9800998ecf8427e"
+
+
+def test_on_conflict_exige_insert():
+    with pytest.raises(ValueError):
+        inserir_em_massa(None, [], metodo="copy", conflito="ON CONFLICT DO NOTHING")
@@ -0,0 +1,57 @@
+import pytest
+
+from src.rag import get
+from src.rag.get import fundir_rrf
+
+
+def test_rrf_premia_quem_aparece_nas_duas_listas():
+    fundido = fundir_rrf([["a", "b", "c"], ["c", "d"]], k=60)
+
+    assert [item for item, _ in fundido] == ["c", "a", "b", "d"]
+    assert fundido[0][1] == pytest.approx(1 / 63 + 1 / 61)
+
+
+class FakeCursor:
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.executados = []
+
+    def execute(self, sql, parametros=None):
+        self.executados.append((sql, parametros))
+
+    def fetchall(self):
+        return self.linhas
+
+
+def _linha(fonte, posicao, id, similaridade=None, score=None):
+    return {
+        "fonte": fonte, "posicao": posicao, "id": id, "content": f"texto {id}",
+        "categoria": "c", "similaridade": similaridade, "score": score,
+    }
+
+
+def test_busca_hibrida_mantem_casamento_lexical_abaixo_do_corte():
+    cursor = FakeCursor([
+        _linha("vetorial", 1, "1", 0.9, 0.9),
+        _linha("vetorial", 2, "2", 0.5, 0.5),
+        _linha("tempo_vetorial", 0, None, score=3.0),
+        _linha("lexical", 1, "3", 0.4, 0.2),
+        _linha("lexical", 2, "1", 0.9, 0.1),
+        _linha("tempo_lexical", 0, None, score=1.5),
+    ])
+    metricas = {}
+
+    resultados = get._executar_busca_hibrida(
+        cursor, "art. 5", [0.1, 0.2], None, 3, 0.7, "", {}, metricas
+    )
+
+    # "2" fica de fora (só vetorial, abaixo do corte); "3" entra pela perna lexical
+    assert [r["content"] for r in resultados] == ["texto 1", "texto 3"]
+    assert metricas == {"vetorial_ms": 3.0, "lexical_ms": 1.5}
+    assert len(cursor.executados) == 1
+    assert cursor.executados[0][1]["candidatos"] == 20
+
+
+def test_modo_invalido():
+    with pytest.raises(ValueError):
+        get.buscar_contexto_similar("pergunta", modo="lexical")
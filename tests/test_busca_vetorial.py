@@ -0,0 +1,163 @@
+"""
+Verifica com EXPLAIN que a busca de src.rag.get usa o índice vetorial.
+
+Precisa de um PostgreSQL com pgvector configurado no .env; sem ele os
+testes são ignorados. Tudo roda numa tabela temporária que sombreia
+rag_embeddings e é descartada no rollback.
+"""
+import random
+
+import pytest
+
+from src.db.conection import get_vector_conn
+from src.rag.bulk import literal_vetor
+from src.rag import get
+from src.rag.get import montar_sql_busca, montar_sql_busca_lote, numero_candidatos, parametros_indice
+
+
+@pytest.fixture
+def cursor():
+    try:
+        conn = get_vector_conn()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL indisponível: {e}")
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'vector'")
+        if not cursor.fetchone():
+            pytest.skip("Extensão pgvector não instalada")
+
+        cursor.execute("""
+            CREATE TEMP TABLE rag_embeddings (
+                id bigserial PRIMARY KEY,
+                content text NOT NULL,
+                categoria text NOT NULL,
+                embedding vector(3) NOT NULL,
+                created_at timestamptz NOT NULL DEFAULT now()
+            )
+        """)
+        rng = random.Random(0)
+        cursor.executemany(
+            "INSERT INTO rag_embeddings (content, categoria, embedding) VALUES (%s, %s, %s::vector)",
+            [
+                (f"texto {i}", f"cat{i % 5}", literal_vetor([rng.random() for _ in range(3)]))
+                for i in range(2000)
+            ]
+        )
+        cursor.execute(
+            "CREATE INDEX rag_embeddings_teste_hnsw ON rag_embeddings USING hnsw (embedding vector_cosine_ops)"
+        )
+        cursor.execute("ANALYZE rag_embeddings")
+        # Com poucas linhas o planner preferiria seq scan de qualquer forma;
+        # desligá-lo mostra se a consulta *pode* ser servida pelo índice.
+        cursor.execute("SET LOCAL enable_seqscan = off")
+
+        yield cursor
+    finally:
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+
+def _plano(cursor, categoria):
+    cursor.execute("EXPLAIN " + montar_sql_busca(categoria), {
+        "vetor": literal_vetor([0.1, 0.2, 0.3]),
+        "categoria": categoria,
+        "limite": 3,
+        "distancia_maxima": 0.3,
+    })
+    return "\n".join(row["QUERY PLAN"] for row in cursor.fetchall())
+
+
+def test_busca_sem_categoria_usa_indice(cursor):
+    plano = _plano(cursor, None)
+
+    assert "Index Scan using rag_embeddings_teste_hnsw" in plano
+    assert "Sort" not in plano.split("Limit")[1]
+
+
+def test_busca_com_categoria_usa_indice(cursor):
+    plano = _plano(cursor, "cat1")
+
+    assert "Index Scan using rag_embeddings_teste_hnsw" in plano
+
+
+def test_categoria_rara_ainda_devolve_limite_linhas(cursor, monkeypatch):
+    cursor.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    versao = tuple(int(parte) for parte in cursor.fetchone()["extversion"].split(".")[:2])
+    if versao < (0, 8):
+        pytest.skip("Varredura iterativa exige pgvector >= 0.8")
+    monkeypatch.setattr(get, "BUSCA_ITERATIVA", "relaxed_order")
+
+    # 10 de 2000 linhas: os 10 candidatos do índice quase nunca são dessa categoria
+    cursor.execute("UPDATE rag_embeddings SET categoria = 'rara' WHERE id % 200 = 0")
+    prefixo, parametros = parametros_indice(ef_search=10, filtrado=True)
+    cursor.execute(prefixo + montar_sql_busca("rara"), {
+        **parametros,
+        "vetor": literal_vetor([0.1, 0.2, 0.3]),
+        "categoria": "rara",
+        "limite": 5,
+        "distancia_maxima": 2,
+    })
+    linhas = cursor.fetchall()
+
+    assert len(linhas) == 5
+    assert {row["categoria"] for row in linhas} == {"rara"}
+    assert [row["similaridade"] for row in linhas] == sorted((row["similaridade"] for row in linhas), reverse=True)
+
+
+def test_busca_em_lote_usa_indice_por_pergunta(cursor):
+    cursor.execute("EXPLAIN " + montar_sql_busca_lote(None), {
+        "vetores": [literal_vetor([0.1, 0.2, 0.3]), literal_vetor([0.9, 0.1, 0.5])],
+        "categoria": None,
+        "limite": 3,
+        "distancia_maxima": 0.3,
+    })
+    plano = "\n".join(row["QUERY PLAN"] for row in cursor.fetchall())
+
+    assert "Nested Loop" in plano
+    assert "Index Scan using rag_embeddings_teste_hnsw" in plano
+
+
+def test_sql_envia_vetor_uma_vez():
+    for categoria in (None, "cat1"):
+        assert montar_sql_busca(categoria).count("%(vetor)s") == 1
+
+
+def test_busca_halfvec_usa_indice_de_expressao(cursor):
+    cursor.execute(
+        "CREATE INDEX rag_embeddings_teste_halfvec ON rag_embeddings "
+        "USING hnsw ((embedding::halfvec(3)) halfvec_cosine_ops)"
+    )
+    cursor.execute("EXPLAIN " + montar_sql_busca(None, "halfvec", 3), {
+        "vetor": literal_vetor([0.1, 0.2, 0.3]),
+        "categoria": None,
+        "limite": 3,
+        "candidatos": 40,
+        "distancia_maxima": 0.3,
+    })
+    plano = "\n".join(row["QUERY PLAN"] for row in cursor.fetchall())
+
+    assert "Index Scan using rag_embeddings_teste_halfvec" in plano
+
+
+def test_sql_quantizado_reordena_pela_distancia_exata():
+    for precisao, operador in (("halfvec", "::halfvec(1536)"), ("bit", "<~> binary_quantize")):
+        sql = montar_sql_busca("cat1", precisao, 1536)
+
+        assert operador in sql
+        assert "embedding <=> %(vetor)s::vector AS distancia" in sql
+        assert "LIMIT %(candidatos)s" in sql
+
+
+def test_precisao_invalida():
+    with pytest.raises(ValueError):
+        montar_sql_busca(None, "int8")
+
+
+def test_numero_candidatos():
+    assert numero_candidatos(3, "vector") == 3
+    assert numero_candidatos(3, "halfvec") == 40
+    assert numero_candidatos(10, "bit") == 100
+    assert numero_candidatos(10, "bit", candidatos=5) == 10
@@ -0,0 +1,73 @@
+
+import pytest
+
+from src.rag import cache_busca
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo(monkeypatch):
+    monkeypatch.setattr(cache_busca, "TTL_CACHE_BUSCA", 600.0)
+    cache_busca.limpar_cache_busca()
+    yield
+    cache_busca.limpar_cache_busca()
+
+
+def test_embeddings_de_perguntas_repetidas_nao_voltam_a_api(monkeypatch):
+    chamadas = []
+
+    def fake_lote(textos):
+        chamadas.append(list(textos))
+        return [[float(len(t))] for t in textos]
+
+    monkeypatch.setattr(cache_busca, "gerar_embeddings_em_lote", fake_lote)
+
+    assert cache_busca.embeddings_perguntas(["oi", "tudo bem"]) == [[2.0], [8.0]]
+    assert cache_busca.embeddings_perguntas(["tudo bem", "nova"]) == [[8.0], [4.0]]
+    assert chamadas == [["oi", "tudo bem"], ["nova"]]
+
+
+def test_resultado_fica_preso_a_geracao_do_corpus():
+    resultado = [{"content": "a", "categoria": "c", "similaridade": 0.9}]
+    cache_busca.salvar_resultado(("similar", "pergunta", 1), resultado)
+
+    # Cópias: alterar o retorno não corrompe o cache
+    cache_busca.obter_resultado(("similar", "pergunta", 1))[0]["content"] = "x"
+
+    assert cache_busca.obter_resultado(("similar", "pergunta", 1)) == resultado
+    assert cache_busca.obter_resultado(("similar", "pergunta", 2)) is None
+
+
+def test_cache_desabilitado_com_ttl_zero(monkeypatch):
+    monkeypatch.setattr(cache_busca, "TTL_CACHE_BUSCA", 0.0)
+    cache_busca.salvar_resultado(("k",), [])
+
+    assert cache_busca.obter_resultado(("k",)) is None
+
+
+def test_geracao_reaproveitada_ate_o_ttl_e_descartada_ao_invalidar(monkeypatch, vector_conn_falso):
+    leituras = []
+
+    class Cursor:
+        connection = None
+
+        def execute(self, sql, parametros=None):
+            leituras.append(sql)
+
+        def fetchone(self):
+            return {"last_value": len(leituras), "is_called": True}
+
+        def close(self):
+            pass
+
+    vector_conn_falso(cache_busca, Cursor())
+    monkeypatch.setattr(cache_busca, "TTL_GERACAO", 60.0)
+
+    assert cache_busca.geracao_recente() == 1
+    assert cache_busca.geracao_recente() == 1
+    assert len(leituras) == 1  # a segunda busca não foi ao banco
+
+    cache_busca.invalidar_cache_busca(Cursor())  # nextval conta como uma leitura do fake
+    assert cache_busca.geracao_recente() == 3
+
+    monkeypatch.setattr(cache_busca, "TTL_GERACAO", 0.0)
+    assert cache_busca.geracao_recente() == 4
@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+from src.rag import generate
+from src.rag.cache_embeddings import CacheEmbeddings, chave_embedding
+
+
+def test_chave_depende_de_modelo_dimensoes_e_texto():
+    base = chave_embedding("m", None, "texto")
+
+    assert base == chave_embedding("m", None, "texto")
+    assert base != chave_embedding("m", 512, "texto")
+    assert base != chave_embedding("outro", None, "texto")
+    assert base != chave_embedding("m", None, "texto ")
+
+
+def test_grava_float32_e_conta_acertos(tmp_path):
+    cache = CacheEmbeddings(tmp_path / "cache.sqlite3")
+    chave = chave_embedding("m", None, "a")
+
+    cache.salvar_varios([chave], [[0.5, -1.25, 3.0]])
+    resultado = cache.obter_varios([chave, chave_embedding("m", None, "b")])
+
+    assert resultado == [[0.5, -1.25, 3.0], None]
+    assert cache.estatisticas()["hits"] == 1
+    assert cache.estatisticas()["misses"] == 1
+
+
+def test_compartilhado_entre_instancias(tmp_path):
+    caminho = tmp_path / "cache.sqlite3"
+    chave = chave_embedding("m", None, "a")
+
+    CacheEmbeddings(caminho).salvar_varios([chave], [[1.0]])
+
+    assert CacheEmbeddings(caminho).obter_varios([chave]) == [[1.0]]
+
+
+def test_remove_menos_usados_ao_exceder_limite(tmp_path):
+    cache = CacheEmbeddings(tmp_path / "cache.sqlite3", max_bytes=10**9)
+    chaves = [chave_embedding("m", None, str(i)) for i in range(200)]
+    cache.salvar_varios(chaves, [[float(i)] * 256 for i in range(200)])
+    cache.obter_varios(chaves[:10])  # as 10 primeiras passam a ser as mais recentes
+
+    cache.max_bytes = cache.estatisticas()["bytes"] // 2
+    cache.salvar_varios([chave_embedding("m", None, "nova")], [[0.0] * 256])
+
+    assert cache.estatisticas()["bytes"] <= cache.max_bytes
+    assert None not in cache.obter_varios(chaves[:10])
+    assert cache.obter_varios(chaves[10:11]) == [None]
+
+
+def test_lote_so_envia_textos_ausentes_do_cache(tmp_path, monkeypatch):
+    cache = CacheEmbeddings(tmp_path / "cache.sqlite3")
+    chamadas = []
+
+    def create(model, input, encoding_format):
+        chamadas.append(list(input))
+        return SimpleNamespace(data=[
+            SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(input)
+        ])
+
+    monkeypatch.setattr(generate, "client", SimpleNamespace(embeddings=SimpleNamespace(create=create)))
+    monkeypatch.setattr(generate, "get_cache_embeddings", lambda: cache)
+
+    assert generate.gerar_embeddings_em_lote(["a", "bb", "a"]) == [[1.0], [2.0], [1.0]]
+    assert generate.gerar_embeddings_em_lote(["bb", "ccc"]) == [[2.0], [3.0]]
+    assert chamadas == [["a", "bb"], ["ccc"]]
@@ -0,0 +1,126 @@
+import itertools
+import time
+
+import pytest
+
+from src.rag.chunking import dividir_em_blocos, estimar_tokens, iterar_blocos
+
+
+def _dividir_legado(texto: str, tamanho: int = 800) -> list[str]:
+    palavras = texto.split()
+    blocos = []
+    atual = []
+    for palavra in palavras:
+        atual.append(palavra)
+        if len(" ".join(atual)) >= tamanho:
+            blocos.append(" ".join(atual))
+            atual = []
+    if atual:
+        blocos.append(" ".join(atual))
+    return blocos
+
+
+def test_blocos_em_fluxo_iguais_ao_texto_concatenado():
+    paginas = [f"pagina {p} " + " ".join(f"palavra{p}_{i}" for i in range(150)) for p in range(5)]
+
+    assert list(iterar_blocos(paginas, tamanho=300)) == _dividir_legado("\n\n".join(paginas), 300)
+
+
+def test_estrategia_palavras_igual_a_funcao_original():
+    texto = " ".join(f"palavra{i}" * (i % 4 + 1) for i in range(2000))
+
+    for tamanho in (50, 400, 800, 1500):
+        assert dividir_em_blocos(texto, tamanho) == _dividir_legado(texto, tamanho)
+
+
+def test_sobreposicao_repete_o_fim_do_bloco_anterior():
+    texto = " ".join(f"p{i}" for i in range(200))
+
+    blocos = dividir_em_blocos(texto, tamanho=60, sobreposicao=15)
+
+    for anterior, seguinte in zip(blocos, blocos[1:]):
+        inicio = seguinte.split()[0]
+        assert inicio in anterior.split()[-5:]
+        assert inicio != anterior.split()[0]
+    assert blocos[-1].split()[-1] == "p199"
+
+
+def test_sentencas_e_paragrafos_nao_cortam_no_meio():
+    sentencas = [f"Sentença número {i} termina aqui." for i in range(30)]
+    paginas = [" ".join(sentencas[:15]), " ".join(sentencas[15:])]
+
+    blocos = list(iterar_blocos(paginas, tamanho=120, estrategia="sentencas"))
+
+    assert all(len(b) <= 120 and b.endswith(".") for b in blocos)
+    assert " ".join(blocos) == " ".join(sentencas)
+
+    texto = "\n\n".join(f"Parágrafo {i}. " + "texto " * 10 for i in range(10))
+    blocos = dividir_em_blocos(texto, tamanho=200, estrategia="paragrafos")
+    assert all(len(b) <= 200 and b.startswith("Parágrafo") for b in blocos)
+
+
+def test_estrategia_tokens_respeita_o_orcamento():
+    texto = " ".join("palavra" for _ in range(1000))
+
+    blocos = dividir_em_blocos(texto, tamanho=50, estrategia="tokens")
+
+    assert all(estimar_tokens(b) <= 50 for b in blocos)
+    assert sum(len(b.split()) for b in blocos) == 1000
+
+
+def test_parametros_invalidos():
+    with pytest.raises(ValueError):
+        dividir_em_blocos("texto", estrategia="linhas")
+    with pytest.raises(ValueError):
+        dividir_em_blocos("texto", tamanho=100, sobreposicao=100)
+
+
+def test_blocos_saem_antes_de_consumir_todas_as_paginas():
+    lidas = []
+
+    def paginas():
+        for p in itertools.count():
+            lidas.append(p)
+            yield "x" * 50 + " " + "y" * 50
+
+    primeiro = next(iterar_blocos(paginas(), tamanho=200))
+
+    assert len(primeiro) >= 200
+    assert len(lidas) == 2
+
+
+@pytest.mark.parametrize("estrategia", ["sentencas", "paragrafos", "tokens"])
+def test_palavra_maior_que_o_bloco_e_cortada_por_caracteres(estrategia):
+    palavra = "x" * 3000
+
+    blocos = dividir_em_blocos("abc " + palavra, 800, estrategia=estrategia)
+
+    assert "".join(blocos).replace(" ", "").replace("abc", "", 1) == palavra
+    if estrategia == "tokens":
+        assert all(estimar_tokens(bloco) <= 800 for bloco in blocos)
+    else:
+        assert all(len(bloco) <= 800 for bloco in blocos)
+
+
+def test_estrategia_palavras_corta_palavra_maior_que_o_bloco():
+    palavra = "x" * 3000
+
+    blocos = dividir_em_blocos("abc " + palavra + " fim", 800, estrategia="palavras")
+
+    assert "".join(blocos).replace(" ", "") == "abc" + palavra + "fim"
+    # Blocos continuam fechando ao atingir `tamanho`, mas nenhum pedaço passa dele
+    assert max(len(bloco) for bloco in blocos) < 2 * 800
+    assert len(blocos) == 4
+
+
+def test_unidade_sem_separador_em_muitas_paginas_tem_custo_linear():
+    paginas = ("palavra sem ponto final " * 50 for _ in range(3000))
+    maior_bloco = 0
+    inicio = time.perf_counter()
+
+    for bloco in iterar_blocos(paginas, tamanho=300, estrategia="sentencas"):
+        maior_bloco = max(maior_bloco, len(bloco))
+
+    # Com o resto crescendo sem limite isto levaria minutos (quadrático)
+    assert time.perf_counter() - inicio < 10
+    assert maior_bloco <= 300
@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.rag import crud
+
+
+class FakeCursor:
+    """Aplica o cursor (created_at, id) e o LIMIT de listar_embeddings_pagina sobre linhas em memória."""
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.comandos = []
+
+    def execute(self, sql, parametros):
+        self.comandos.append((" ".join(sql.split()), parametros))
+        linhas = sorted(self.linhas, key=lambda l: (l["created_at"], l["id"]), reverse=True)
+        if "categoria" in parametros:
+            linhas = [l for l in linhas if l["categoria"] == parametros["categoria"]]
+        if "created_at" in parametros:
+            chave = (parametros["created_at"], parametros["id"])
+            linhas = [l for l in linhas if (l["created_at"], l["id"]) < chave]
+        self.resultado = linhas[:parametros["limite"]]
+
+    def fetchall(self):
+        return self.resultado
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def cursor(vector_conn_falso):
+    inicio = datetime(2024, 1, 1)
+    # Pares com o mesmo created_at: o id desempata
+    linhas = [
+        {"id": i, "previa": f"texto {i}", "categoria": "a" if i % 2 else "b", "created_at": inicio + timedelta(minutes=i // 2)}
+        for i in range(25)
+    ]
+    cursor = FakeCursor(linhas)
+    vector_conn_falso(crud, cursor)
+    return cursor
+
+
+def test_paginas_cobrem_todas_as_linhas_sem_repetir(cursor):
+    vistos = []
+    apos = None
+    paginas = 0
+    while True:
+        pagina = crud.listar_embeddings_pagina(tamanho=10, apos=apos)
+        vistos.extend(item["id"] for item in pagina["itens"])
+        paginas += 1
+        apos = pagina["proximo"]
+        if apos is None:
+            break
+
+    assert paginas == 3
+    assert vistos == list(range(24, -1, -1))
+
+
+def test_pagina_filtra_categoria_e_usa_keyset(cursor):
+    primeira = crud.listar_embeddings_pagina(categoria="a", tamanho=5)
+    segunda = crud.listar_embeddings_pagina(categoria="a", tamanho=5, apos=primeira["proximo"])
+
+    assert [item["id"] for item in primeira["itens"]] == [23, 21, 19, 17, 15]
+    assert [item["id"] for item in segunda["itens"]] == [13, 11, 9, 7, 5]
+    sql, _ = cursor.comandos[-1]
+    assert "(created_at, id) < (%(created_at)s, %(id)s)" in sql
+    assert "OFFSET" not in sql
+
+
+def test_listagem_corta_previa_no_tamanho_configurado(cursor):
+    cursor.linhas = [
+        {"id": 1, "previa": "x" * (crud.TAMANHO_PREVIA + 1), "categoria": "a", "created_at": datetime(2024, 1, 1)},
+        {"id": 2, "previa": "curto", "categoria": "a", "created_at": datetime(2024, 1, 2)},
+    ]
+
+    itens = crud.listar_embeddings_pagina()["itens"]
+
+    assert [item["previa"] for item in itens] == ["curto", "x" * crud.TAMANHO_PREVIA + "..."]
+    assert "content" not in itens[0]
+    assert f"left(content, {crud.TAMANHO_PREVIA + 1})" in cursor.comandos[-1][0]
+
+
+class FakeConexaoExclusao:
+    """Simula os lotes de deletar_categoria_em_lotes: cada execução apaga até `tamanho` linhas."""
+
+    def __init__(self, linhas: int):
+        self.restantes = linhas
+        self.comandos = []
+        self.commits = 0
+        self.resultado = None
+        self.rowcount = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, parametros=None):
+        self.comandos.append((" ".join(sql.split()), parametros))
+        if "WITH lote AS" in sql:
+            removidos = min(self.restantes, parametros["tamanho"])
+            self.restantes -= removidos
+            self.resultado = {"removidos": removidos, "created_at": datetime(2024, 1, 1), "id": self.restantes} if removidos else None
+        else:
+            self.resultado = None
+
+    def fetchone(self):
+        return self.resultado
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def exclusao(monkeypatch, vector_conn_falso):
+    conn = vector_conn_falso(crud, FakeConexaoExclusao(linhas=25))
+    monkeypatch.setattr(crud, "invalidar_cache_busca", lambda cursor=None: None)
+    return conn
+
+
+def test_exclusao_de_categoria_em_lotes_com_progresso(exclusao):
+    progresso = []
+
+    resultado = crud.deletar_categoria_em_lotes("cat", tamanho_lote=10, ao_progredir=progresso.append)
+
+    assert resultado["removidos"] == 25 and resultado["lotes"] == 3
+    assert progresso == [10, 20, 25]
+    # Cada lote (mais a busca vazia com cursor e a passada final sem cursor)
+    # em sua própria transação, depois o registro de documentos
+    assert exclusao.commits == 5 + 1
+    assert "(created_at, id) <" not in exclusao.comandos[0][0]
+    assert "(created_at, id) < (%(created_at)s, %(id)s)" in exclusao.comandos[1][0]
+    assert exclusao.comandos[-1][0] == "DELETE FROM rag_documentos WHERE categoria = %s"
+
+
+def test_exclusao_de_categoria_apaga_linhas_gravadas_durante_a_exclusao(exclusao):
+    # Linhas gravadas depois do primeiro lote ficam acima do cursor e só uma
+    # passada desde o topo (sem cursor) as alcança
+    novas = {"pendentes": 4, "gravadas": False}
+    execute_original = exclusao.execute
+
+    def execute(sql, parametros=None):
+        if "WITH lote AS" in sql and "(created_at, id) <" not in sql and novas["gravadas"] and novas["pendentes"]:
+            exclusao.comandos.append((" ".join(sql.split()), parametros))
+            removidos = min(novas["pendentes"], parametros["tamanho"])
+            novas["pendentes"] -= removidos
+            exclusao.resultado = {"removidos": removidos, "created_at": datetime(2024, 1, 2), "id": 100}
+            return
+        execute_original(sql, parametros)
+        novas["gravadas"] = True
+
+    exclusao.execute = execute
+
+    resultado = crud.deletar_categoria_em_lotes("cat", tamanho_lote=10)
+
+    assert resultado["removidos"] == 25 + 4
+    assert novas["pendentes"] == 0 and exclusao.restantes == 0
+    assert exclusao.comandos[-1][0] == "DELETE FROM rag_documentos WHERE categoria = %s"
+
+
+def test_exclusao_de_categoria_para_ao_cancelar(exclusao):
+    lotes = []
+
+    resultado = crud.deletar_categoria_em_lotes(
+        "cat", tamanho_lote=10, ao_progredir=lotes.append, cancelado=lambda: len(lotes) >= 1
+    )
+
+    assert resultado["cancelado"] is True
+    assert resultado["removidos"] == 10
+    assert exclusao.restantes == 15
+    # O registro de documentos fica enquanto sobrarem trechos
+    assert not any(sql.startswith("DELETE FROM rag_documentos") for sql, _ in exclusao.comandos)
+
+
+def test_exclusao_por_ids_usa_um_unico_comando(exclusao):
+    exclusao.resultado = None
+
+    def execute(sql, parametros=None):
+        exclusao.comandos.append((" ".join(sql.split()), parametros))
+        exclusao.resultado = {"removidos": len(parametros["ids"])}
+
+    exclusao.execute = execute
+
+    assert crud.deletar_embeddings_por_ids(["1", 2, "3"]) == 3
+    assert crud.deletar_embeddings_por_ids([]) == 0
+
+    assert len(exclusao.comandos) == 1
+    sql, parametros = exclusao.comandos[0]
+    assert "DELETE FROM rag_embeddings WHERE id = ANY(%(ids)s)" in sql
+    assert "DELETE FROM rag_documento_paginas" in sql
+    assert parametros["ids"] == [1, 2, 3]
+    assert exclusao.commits == 1
@@ -0,0 +1,254 @@
+import pytest
+
+from src.rag import documentos
+from src.rag.bulk import hash_conteudo
+from src.rag.documentos import hash_pagina
+
+
+class FakeCursor:
+    """
+    Responde às consultas de reingerir_documento a partir de um registro em
+    memória: hashes das páginas, trechos de cada página e trechos gravados.
+    """
+
+    def __init__(self, paginas_registradas: dict[int, str], trechos: dict[int, list[str]] | None = None):
+        self.paginas = dict(paginas_registradas)
+        self.paginas_pendentes = {}
+        # (documento, página, hash) de rag_documento_trechos e hash -> dono em rag_embeddings
+        self.vinculos = set()
+        self.embeddings = {}
+        for pagina, blocos in (trechos or {}).items():
+            for bloco in blocos:
+                self.vinculos.add((7, pagina, hash_conteudo(bloco)))
+                self.embeddings.setdefault(hash_conteudo(bloco), (7, pagina))
+        self.comandos = []
+        self.resultado = []
+        self.rowcount = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def execute(self, sql, parametros=None):
+        sql = " ".join(sql.split())
+        self.comandos.append((sql, parametros))
+        self.rowcount = 0
+        if sql.startswith("INSERT INTO rag_documentos"):
+            self.resultado = [{"id": 7}]
+        elif sql.startswith("SELECT pagina, hash"):
+            self.resultado = [{"pagina": p, "hash": h} for p, h in self.paginas.items()]
+        elif sql.startswith("DELETE FROM rag_documento_trechos"):
+            documento_id, paginas = parametros
+            antigos = {v for v in self.vinculos if v[0] == documento_id and v[1] in paginas}
+            self.vinculos -= antigos
+            self.resultado = [{"content_hash": h} for _, _, h in antigos]
+        elif sql.startswith("INSERT INTO rag_documento_trechos"):
+            documento_id, paginas, hashes = parametros
+            self.vinculos |= {(documento_id, p, h) for p, h in zip(paginas, hashes)}
+        elif sql.startswith("DELETE FROM rag_embeddings"):
+            em_uso = {h for _, _, h in self.vinculos}
+            orfaos = set(parametros["antigos"]) - em_uso
+            self.rowcount = len(orfaos & set(self.embeddings))
+            for h in orfaos:
+                self.embeddings.pop(h, None)
+        elif sql.startswith("SELECT h.content_hash"):
+            hashes, _ = parametros
+            self.resultado = [{"content_hash": h} for h in hashes if h not in self.embeddings]
+
+    def executemany(self, sql, lista):
+        # Só o registro de páginas usa executemany; vale após o commit
+        for _, pagina, hash_pagina_ in lista:
+            self.paginas_pendentes[pagina] = hash_pagina_
+
+    def fetchone(self):
+        return self.resultado[0]
+
+    def fetchall(self):
+        return self.resultado
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+        self.paginas.update(self.paginas_pendentes)
+        self.paginas_pendentes = {}
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.paginas_pendentes = {}
+
+
+@pytest.fixture
+def banco(monkeypatch, vector_conn_falso):
+    divisao = {"tamanho": 50}
+    textos = {1: "página um sem mudanças", 2: "página dois antiga", 3: "página três que saiu"}
+    cursor = FakeCursor(
+        {pagina: hash_pagina(texto, divisao) for pagina, texto in textos.items()},
+        {pagina: [texto] for pagina, texto in textos.items()},
+    )
+    gravados = []
+
+    def fake_ingerir(cursor_, blocos, categoria, colunas_extras=(), **kwargs):
+        # Como a ingestão real, não regrava trechos já existentes na categoria
+        novos = [bloco for bloco in blocos if hash_conteudo(bloco[0]) not in cursor.embeddings]
+        for texto, documento_id, pagina in novos:
+            cursor.embeddings[hash_conteudo(texto)] = (documento_id, pagina)
+        gravados.extend(novos)
+        return {"linhas": len(novos), "reaproveitados": len(blocos) - len(novos), "segundos": 0.1, "limites_atingidos": 0}
+
+    vector_conn_falso(documentos, cursor)
+    monkeypatch.setattr(documentos, "ingerir_na_transacao", fake_ingerir)
+    monkeypatch.setattr(documentos, "invalidar_cache_busca", lambda cursor=None: None)
+    return cursor, gravados, divisao
+
+
+def test_reingere_so_paginas_alteradas(banco):
+    cursor, gravados, divisao = banco
+    paginas = [
+        {"pagina": 1, "texto": "página   um sem\nmudanças"},
+        {"pagina": 2, "texto": "página dois nova"},
+        {"pagina": 4, "texto": "página quatro"},
+    ]
+
+    resultado = documentos.reingerir_documento(paginas, "regulamento", "reg.pdf", divisao)
+
+    assert gravados == [("página dois nova", 7, 2), ("página quatro", 7, 4)]
+    assert resultado["paginas_alteradas"] == 2
+    assert resultado["paginas_inalteradas"] == 1
+    assert resultado["paginas_removidas"] == 1
+    assert resultado["trechos_removidos"] == 2  # o texto antigo da página 2 e a página 3
+    assert set(cursor.embeddings) == {hash_conteudo(p["texto"]) for p in paginas if p["pagina"] != 1} | {
+        hash_conteudo("página um sem mudanças")
+    }
+    assert cursor.paginas[4] == hash_pagina("página quatro", divisao)
+    assert ("DELETE FROM rag_documento_paginas WHERE documento_id = %s AND pagina = ANY(%s)", (7, [3])) in cursor.comandos
+    assert resultado["checkpoints"] == 1
+
+
+def test_mudar_a_divisao_reprocessa_a_pagina():
+    texto = "mesmo texto"
+    assert hash_pagina(texto, {"tamanho": 800}) != hash_pagina(texto, {"tamanho": 400})
+    assert hash_pagina(texto, {"tamanho": 800}) == hash_pagina(" mesmo\ttexto ", {"tamanho": 800})
+
+
+def test_falha_retoma_do_ultimo_checkpoint(banco, monkeypatch):
+    cursor, gravados, divisao = banco
+    paginas = [{"pagina": n, "texto": f"conteúdo novo da página {n}"} for n in (2, 4, 5)]
+    ingerir_original = documentos.ingerir_na_transacao
+    chamadas = []
+
+    def falha_no_segundo_grupo(cursor_, blocos, *args, **kwargs):
+        chamadas.append(blocos)
+        if len(chamadas) == 2:
+            raise RuntimeError("API fora do ar")
+        return ingerir_original(cursor_, blocos, *args, **kwargs)
+
+    monkeypatch.setattr(documentos, "ingerir_na_transacao", falha_no_segundo_grupo)
+
+    with pytest.raises(RuntimeError):
+        documentos.reingerir_documento(paginas, "regulamento", "reg.pdf", divisao, blocos_por_checkpoint=1)
+
+    # Só a página do primeiro grupo ficou registrada
+    assert cursor.paginas[2] == hash_pagina(paginas[0]["texto"], divisao)
+    assert 4 not in cursor.paginas and 5 not in cursor.paginas
+    assert cursor.rollbacks == 1
+
+    monkeypatch.setattr(documentos, "ingerir_na_transacao", ingerir_original)
+    gravados.clear()
+
+    resultado = documentos.reingerir_documento(paginas, "regulamento", "reg.pdf", divisao, blocos_por_checkpoint=1)
+
+    assert [pagina for _, _, pagina in gravados] == [4, 5]
+    assert resultado["paginas_inalteradas"] == 1  # a página 2, gravada antes da falha
+
+
+def test_falha_na_limpeza_nao_encobre_o_erro_original(banco, monkeypatch):
+    cursor, _, divisao = banco
+
+    def falha_na_ingestao(*args, **kwargs):
+        raise RuntimeError("API fora do ar")
+
+    def conexao_caida(cursor=None):
+        raise ConnectionError("conexão encerrada")
+
+    monkeypatch.setattr(documentos, "ingerir_na_transacao", falha_na_ingestao)
+    monkeypatch.setattr(documentos, "invalidar_cache_busca", conexao_caida)
+    desbloqueio = {"chamado": False}
+    execute_original = cursor.execute
+
+    def execute(sql, parametros=None):
+        if "pg_advisory_unlock" in sql:
+            desbloqueio["chamado"] = True
+            raise ConnectionError("conexão encerrada")
+        execute_original(sql, parametros)
+
+    cursor.execute = execute
+    paginas = [{"pagina": 2, "texto": "página dois nova"}]
+
+    with pytest.raises(RuntimeError, match="API fora do ar"):
+        documentos.reingerir_documento(paginas, "regulamento", "reg.pdf", divisao)
+
+    assert desbloqueio["chamado"]
+    assert ("SELECT pg_advisory_lock(hashtext('rag_documentos'), %s)", (7,)) in cursor.comandos
+
+
+def test_trecho_compartilhado_continua_enquanto_outra_pagina_o_usa(monkeypatch, vector_conn_falso):
+    divisao = {"tamanho": 30, "estrategia": "paragrafos", "sobreposicao": 0}
+    comum = "Trecho repetido no rodapé."
+    textos = {1: f"Página um.\n\n{comum}", 2: f"Página dois.\n\n{comum}"}
+    blocos = {pagina: list(documentos.iterar_blocos(texto, **divisao)) for pagina, texto in textos.items()}
+    assert comum in blocos[1] and comum in blocos[2]
+
+    cursor = FakeCursor({pagina: hash_pagina(texto, divisao) for pagina, texto in textos.items()}, blocos)
+    assert cursor.embeddings[hash_conteudo(comum)] == (7, 1)  # gravado uma vez, sob a primeira página
+    gravados = []
+
+    def fake_ingerir(cursor_, itens, categoria, colunas_extras=(), **kwargs):
+        novos = [item for item in itens if hash_conteudo(item[0]) not in cursor.embeddings]
+        for texto, documento_id, pagina in novos:
+            cursor.embeddings[hash_conteudo(texto)] = (documento_id, pagina)
+        gravados.extend(novos)
+        return {"linhas": len(novos), "reaproveitados": len(itens) - len(novos), "segundos": 0.1, "limites_atingidos": 0}
+
+    vector_conn_falso(documentos, cursor)
+    monkeypatch.setattr(documentos, "ingerir_na_transacao", fake_ingerir)
+    monkeypatch.setattr(documentos, "invalidar_cache_busca", lambda cursor=None: None)
+
+    # A página 1 muda e deixa de ter o trecho; a página 2 não muda
+    paginas = [{"pagina": 1, "texto": "Página um, revisada."}, {"pagina": 2, "texto": textos[2]}]
+    resultado = documentos.reingerir_documento(paginas, "regulamento", "reg.pdf", divisao)
+
+    assert resultado["paginas_inalteradas"] == 1
+    assert resultado["trechos_removidos"] == 1  # só "Página um."
+    assert hash_conteudo(comum) in cursor.embeddings
+    assert (7, 2, hash_conteudo(comum)) in cursor.vinculos
+
+    # Agora a página 2 também perde o trecho: ninguém mais o usa
+    paginas = [paginas[0], {"pagina": 2, "texto": "Página dois, revisada."}]
+    resultado = documentos.reingerir_documento(paginas, "regulamento", "reg.pdf", divisao)
+
+    assert hash_conteudo(comum) not in cursor.embeddings
+    assert resultado["trechos_removidos"] == 2
+
+
+def test_trecho_apagado_por_outra_reingestao_e_gravado_de_novo(banco):
+    cursor, gravados, divisao = banco
+    execute_original = cursor.execute
+    travas = []
+
+    def execute(sql, parametros=None):
+        execute_original(sql, parametros)
+        # Outra reingestão da categoria apagou o trecho entre a gravação e a trava
+        if "pg_advisory_xact_lock" in sql and not travas:
+            travas.append(sql)
+            cursor.embeddings.pop(hash_conteudo("página quatro"), None)
+
+    cursor.execute = execute
+    paginas = [{"pagina": n, "texto": texto} for n, texto in ((1, "página um sem mudanças"), (4, "página quatro"))]
+    resultado = documentos.reingerir_documento(paginas, "regulamento", "reg.pdf", divisao)
+
+    assert [texto for texto, _, _ in gravados] == ["página quatro", "página quatro"]
+    assert hash_conteudo("página quatro") in cursor.embeddings
+    assert resultado["linhas"] == 2
@@ -0,0 +1,96 @@
+"""
+Verifica os triggers que mantêm rag_categorias_stats.
+
+Precisa de um PostgreSQL configurado no .env; sem ele os testes são
+ignorados. Tabelas temporárias sombreiam rag_embeddings,
+rag_categorias_stats e rag_categorias_stats_deltas, e tudo é descartado no
+rollback.
+"""
+import pytest
+
+from src.db.conection import get_vector_conn
+from src.db.schema import MIGRACOES
+
+
+@pytest.fixture
+def cursor():
+    try:
+        conn = get_vector_conn()
+    except Exception as e:
+        pytest.skip(f"PostgreSQL indisponível: {e}")
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TEMP TABLE rag_embeddings (
+                id bigserial PRIMARY KEY,
+                content text NOT NULL,
+                categoria text NOT NULL,
+                created_at timestamptz NOT NULL DEFAULT now()
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO rag_embeddings (content, categoria, created_at)
+            VALUES ('antigo', 'a', '2024-01-01'), ('outro', 'b', '2024-01-02')
+        """)
+        cursor.execute("CREATE TEMP TABLE rag_categorias_stats (LIKE public.rag_categorias_stats INCLUDING ALL)")
+        cursor.execute(
+            "CREATE TEMP TABLE rag_categorias_stats_deltas (LIKE public.rag_categorias_stats_deltas INCLUDING ALL)"
+        )
+        cursor.execute(dict(MIGRACOES)["010_estatisticas_categorias"])
+        yield cursor
+    finally:
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+
+def _stats(cursor, tabela: str = "rag_categorias_stats") -> dict:
+    if tabela == "rag_categorias_stats":
+        cursor.execute("SELECT rag_stats_consolidar()")
+    cursor.execute(f"SELECT categoria, total, primeiro_registro::date::text AS primeiro FROM {tabela}")
+    return {row["categoria"]: (row["total"], row["primeiro"]) for row in cursor.fetchall()}
+
+
+def test_carga_inicial_e_insercao(cursor):
+    assert _stats(cursor) == {"a": (1, "2024-01-01"), "b": (1, "2024-01-02")}
+
+    cursor.execute("""
+        INSERT INTO rag_embeddings (content, categoria, created_at)
+        VALUES ('novo 1', 'a', '2023-12-31'), ('novo 2', 'a', now()), ('novo 3', 'c', now())
+    """)
+
+    stats = _stats(cursor)
+    assert stats["a"] == (3, "2023-12-31")
+    assert stats["c"][0] == 1
+
+
+def test_exclusao_recalcula_limites_e_remove_categoria_vazia(cursor):
+    cursor.execute("INSERT INTO rag_embeddings (content, categoria, created_at) VALUES ('novo', 'a', '2024-02-01')")
+    cursor.execute("DELETE FROM rag_embeddings WHERE content IN ('antigo', 'outro')")
+
+    assert _stats(cursor) == {"a": (1, "2024-02-01")}
+
+
+def test_update_de_categoria_move_a_contagem(cursor):
+    cursor.execute("UPDATE rag_embeddings SET categoria = 'b' WHERE content = 'antigo'")
+
+    assert _stats(cursor) == {"b": (2, "2024-01-01")}
+
+
+def test_escritas_so_acrescentam_variacoes_ate_a_consolidacao(cursor):
+    cursor.execute("INSERT INTO rag_embeddings (content, categoria, created_at) VALUES ('novo', 'a', '2023-06-01')")
+    cursor.execute("DELETE FROM rag_embeddings WHERE content = 'outro'")
+
+    # O catálogo não foi tocado pela transação de escrita...
+    cursor.execute("SELECT count(*) AS total FROM rag_categorias_stats_deltas")
+    assert cursor.fetchone()["total"] == 2
+    cursor.execute("SELECT categoria, total FROM rag_categorias_stats ORDER BY categoria")
+    assert [(row["categoria"], row["total"]) for row in cursor.fetchall()] == [("a", 1), ("b", 1)]
+
+    # ...mas a view já soma as variações pendentes
+    assert _stats(cursor, "rag_categorias_stats_atuais") == {"a": (2, "2023-06-01")}
+
+    assert _stats(cursor) == {"a": (2, "2023-06-01")}
+    cursor.execute("SELECT count(*) AS total FROM rag_categorias_stats_deltas")
+    assert cursor.fetchone()["total"] == 0
@@ -0,0 +1,166 @@
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from src.rag import generate
+
+
+def _erro(classe, status, body=None):
+    request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+    return classe("erro", response=httpx.Response(status, request=request), body=body)
+
+
+class FakeEmbeddings:
+    """Devolve [len(texto)] como embedding, com os itens fora de ordem."""
+
+    def __init__(self, falhas=None):
+        self.chamadas = []
+        self.argumentos = []
+        self.falhas = list(falhas or [])
+
+    def create(self, model, input, encoding_format, **argumentos):
+        self.chamadas.append(list(input))
+        self.argumentos.append(argumentos)
+        if self.falhas:
+            erro = self.falhas.pop(0)
+            if erro is not None:
+                raise erro(tuple(input))
+        dados = [SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(dados)))
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def instalar(falhas=None):
+        embeddings = FakeEmbeddings(falhas)
+        monkeypatch.setattr(generate, "client", SimpleNamespace(embeddings=embeddings))
+        monkeypatch.setattr(generate.time, "sleep", lambda s: None)
+        return embeddings
+    return instalar
+
+
+def test_montar_lotes_respeita_limites():
+    textos = ["a" * 30] * 10  # 11 tokens estimados cada
+
+    lotes = generate.montar_lotes(textos, max_inputs=4, max_tokens=25)
+
+    assert lotes == [[0, 1], [2, 3], [4, 5], [6, 7], [8, 9]]
+    assert generate.montar_lotes(textos, max_inputs=4) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_montar_lotes_rejeita_texto_grande_demais():
+    with pytest.raises(ValueError):
+        generate.montar_lotes(["x" * 30_000])
+
+
+def test_lote_preserva_ordem_e_agrupa_requisicoes(fake):
+    embeddings = fake()
+    textos = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    resultado = generate.gerar_embeddings_em_lote(textos, max_inputs=2)
+
+    assert resultado == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert len(embeddings.chamadas) == 3
+
+
+def test_reenvia_apenas_o_lote_que_falhou(fake):
+    rate_limit = lambda _: _erro(openai.RateLimitError, 429)
+    embeddings = fake(falhas=[None, rate_limit])
+
+    resultado = generate.gerar_embeddings_em_lote(["a", "b", "c", "d"], max_inputs=2)
+
+    assert resultado == [[1.0]] * 4
+    assert embeddings.chamadas == [["a", "b"], ["c", "d"], ["c", "d"]]
+
+
+class FakeCache:
+    def __init__(self):
+        self.dados = {}
+
+    def obter_varios(self, chaves):
+        return [self.dados.get(chave) for chave in chaves]
+
+    def salvar_varios(self, chaves, embeddings):
+        self.dados.update(zip(chaves, embeddings))
+
+
+def test_input_rejeitado_sempre_e_isolado_sem_perder_o_resto(fake, monkeypatch):
+    embeddings = fake()
+    create_original = embeddings.create
+
+    def create(model, input, encoding_format, **argumentos):
+        if "c" in input:
+            embeddings.chamadas.append(list(input))
+            raise _erro(openai.BadRequestError, 400, {"code": "context_length_exceeded", "param": "input"})
+        return create_original(model, input, encoding_format, **argumentos)
+
+    embeddings.create = create
+    cache = FakeCache()
+    monkeypatch.setattr(generate, "get_cache_embeddings", lambda: cache)
+
+    with pytest.raises(openai.BadRequestError):
+        generate.gerar_embeddings_em_lote(["a", "b", "c", "d"])
+
+    assert embeddings.chamadas == [["a", "b", "c", "d"], ["a", "b"], ["c", "d"], ["c"], ["d"]]
+    assert sorted(cache.dados.values()) == [[1.0]] * 3
+
+    # Sem o input rejeitado, nada é reenviado à API
+    embeddings.chamadas.clear()
+    assert generate.gerar_embeddings_em_lote(["a", "b", "d"]) == [[1.0]] * 3
+    assert embeddings.chamadas == []
+
+
+def test_erro_da_requisicao_nao_divide_o_lote(fake):
+    embeddings = fake(falhas=[lambda entrada: _erro(openai.BadRequestError, 400, {"param": "dimensions"})])
+
+    with pytest.raises(openai.BadRequestError):
+        generate.gerar_embeddings_em_lote([str(i) for i in range(2048)])
+
+    assert len(embeddings.chamadas) == 1
+
+
+def test_erro_sem_causa_sonda_um_input_antes_de_dividir(fake):
+    # Toda requisição é rejeitada (ex.: modelo inválido sem `param` na resposta)
+    embeddings = fake(falhas=[lambda entrada: _erro(openai.BadRequestError, 400)] * 10)
+
+    with pytest.raises(openai.BadRequestError):
+        generate.gerar_embeddings_em_lote([str(i) for i in range(2048)])
+
+    assert [len(chamada) for chamada in embeddings.chamadas] == [2048, 1]
+
+
+def test_erro_sem_causa_isola_o_input_depois_da_sonda(fake):
+    embeddings = fake()
+    create_original = embeddings.create
+
+    def create(model, input, encoding_format, **argumentos):
+        if "c" in input:
+            embeddings.chamadas.append(list(input))
+            raise _erro(openai.BadRequestError, 400)
+        return create_original(model, input, encoding_format, **argumentos)
+
+    embeddings.create = create
+
+    with pytest.raises(openai.BadRequestError):
+        generate.gerar_embeddings_em_lote(["a", "b", "c", "d"])
+
+    # A sonda ["a"] passou: a requisição é válida e o resto é dividido
+    assert embeddings.chamadas == [["a", "b", "c", "d"], ["a"], ["b"], ["c", "d"], ["c"], ["d"]]
+
+
+def test_zero_tentativas_e_rejeitado(fake):
+    fake()
+
+    with pytest.raises(ValueError):
+        generate.gerar_embeddings_em_lote(["a"], tentativas=0)
+
+
+def test_dimensoes_configuradas_vao_para_a_api(fake, monkeypatch):
+    embeddings = fake()
+    generate.gerar_embeddings_em_lote(["a"])
+    monkeypatch.setattr(generate, "DIMENSOES_EMBEDDING", 512)
+    generate.gerar_embeddings_em_lote(["b"])
+
+    assert embeddings.argumentos == [{}, {"dimensions": 512}]
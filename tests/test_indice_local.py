@@ -0,0 +1,241 @@
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.rag import indice_local
+from src.rag.indice_local import MAX_SEGMENTOS, IndiceLocal
+
+
+def _linhas(quantidade, dimensoes=8, semente=0, inicio_id=0):
+    rng = np.random.default_rng(semente)
+    base = datetime(2026, 1, 1)
+    return [
+        {
+            "id": inicio_id + i,
+            "content": f"texto {inicio_id + i}",
+            "categoria": f"cat{(inicio_id + i) % 3}",
+            "created_at": base + timedelta(seconds=inicio_id + i),
+            "embedding": rng.standard_normal(dimensoes).astype(np.float32),
+        }
+        for i in range(quantidade)
+    ]
+
+
+def _esperado(linhas, consulta, categoria, limite):
+    candidatos = [linha for linha in linhas if categoria is None or linha["categoria"] == categoria]
+    scores = [
+        float(np.dot(linha["embedding"], consulta) / np.linalg.norm(linha["embedding"]) / np.linalg.norm(consulta))
+        for linha in candidatos
+    ]
+    ordem = np.argsort(scores)[::-1][:limite]
+    return [candidatos[i]["content"] for i in ordem]
+
+
+def test_busca_igual_a_forca_bruta_com_e_sem_categoria():
+    linhas = _linhas(300)
+    indice = IndiceLocal()
+    indice._aplicar(linhas)
+    consulta = np.random.default_rng(1).standard_normal(8)
+
+    for categoria in (None, "cat1"):
+        resultado = indice.buscar(consulta, categoria, limite=5, similaridade_minima=-1)
+        assert [r["content"] for r in resultado] == _esperado(linhas, consulta, categoria, 5)
+        assert all(categoria is None or r["categoria"] == categoria for r in resultado)
+
+    assert indice.buscar(consulta, "inexistente") == []
+
+
+def test_similaridade_minima_filtra_candidatos():
+    indice = IndiceLocal()
+    indice._aplicar(_linhas(50))
+
+    resultado = indice.buscar(np.ones(8), limite=50, similaridade_minima=0.5)
+
+    assert all(r["similaridade"] >= 0.5 for r in resultado)
+
+
+def test_atualizacao_incremental_com_exclusoes():
+    indice = IndiceLocal()
+    indice._aplicar(_linhas(30))
+    matriz = indice.segmentos[0].matriz
+    indice._aplicar(_linhas(10, semente=5, inicio_id=30), removidos={0, 1, 2})
+
+    assert len(indice) == 37
+    assert not {0, 1, 2} & set(indice.ids.tolist())
+    assert indice.marca[1] == 39
+    # Exclusões desligam linhas e as novas entram num segmento à parte
+    assert indice.segmentos[0].matriz is matriz
+    assert len(indice.segmentos) == 2
+    for segmento in indice.segmentos:
+        for categoria, (inicio, fim) in segmento.faixas.items():
+            assert set(segmento.categorias[inicio:fim]) == {categoria}
+
+
+def test_busca_com_varios_segmentos_igual_a_forca_bruta():
+    linhas = _linhas(120)
+    indice = IndiceLocal()
+    for inicio in range(0, 120, 12):
+        indice._aplicar(linhas[inicio:inicio + 12], removidos={inicio - 1} if inicio else ())
+    restantes = [linha for linha in linhas if linha["id"] % 12 != 11 or linha["id"] == 119]
+    consulta = np.random.default_rng(3).standard_normal(8)
+
+    assert len(indice.segmentos) <= MAX_SEGMENTOS
+    assert len(indice) == len(restantes)
+    for categoria in (None, "cat0"):
+        resultado = indice.buscar(consulta, categoria, limite=7, similaridade_minima=-1)
+        assert [r["content"] for r in resultado] == _esperado(restantes, consulta, categoria, 7)
+
+
+def test_muitas_exclusoes_compactam_o_indice():
+    indice = IndiceLocal()
+    indice._aplicar(_linhas(40))
+    indice._aplicar(_linhas(5, inicio_id=40))
+    indice._aplicar([], removidos=set(range(20)))
+
+    assert len(indice.segmentos) == 1
+    assert indice.segmentos[0].ativos is None
+    assert sorted(indice.ids.tolist()) == list(range(20, 45))
+
+
+def test_snapshot_memory_map(tmp_path):
+    linhas = _linhas(40)
+    indice = IndiceLocal()
+    indice._aplicar(linhas)
+    indice.salvar(tmp_path)
+
+    reaberto = IndiceLocal.abrir(tmp_path)
+    consulta = np.random.default_rng(2).standard_normal(8)
+
+    assert isinstance(reaberto.segmentos[0].matriz, np.memmap)
+    assert reaberto.segmentos[0].faixas == indice.segmentos[0].faixas
+    assert reaberto.marca == indice.marca
+    assert reaberto.buscar(consulta, "cat2", similaridade_minima=-1) == indice.buscar(consulta, "cat2", similaridade_minima=-1)
+
+
+class FakeCursor:
+    """Responde às consultas de atualizar() a partir de uma lista de linhas."""
+
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.resultado = []
+        self.connection = self
+
+    def execute(self, sql, parametros=None):
+        if "rag_categorias_stats" in sql:
+            totais = {}
+            for linha in self.linhas:
+                totais[linha["categoria"]] = totais.get(linha["categoria"], 0) + 1
+            self.resultado = [{"categoria": c, "total": t} for c, t in totais.items()]
+        elif "rag_embeddings" in sql:
+            raise AssertionError(f"consulta inesperada: {sql}")
+        else:
+            self.resultado = []
+
+    def fetchmany(self, tamanho):
+        lote, self.resultado = self.resultado[:tamanho], self.resultado[tamanho:]
+        return lote
+
+    def fetchall(self):
+        return self.fetchmany(len(self.resultado))
+
+    def rollback(self):
+        pass
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+
+def test_atualizar_sem_mudancas_mantem_o_memory_map(tmp_path, monkeypatch, vector_conn_falso):
+    linhas = _linhas(40)
+    indice = IndiceLocal()
+    indice._aplicar(linhas)
+    indice.salvar(tmp_path)
+    reaberto = IndiceLocal.abrir(tmp_path)
+
+    cursor = FakeCursor(linhas)
+    original = cursor.execute
+
+    def execute(sql, parametros=None):
+        # A releitura após a marca não traz nada que o índice não conheça
+        if "created_at >" in sql:
+            cursor.resultado = [linha for linha in linhas if linha["created_at"] > parametros[0]]
+        else:
+            original(sql, parametros)
+
+    cursor.execute = execute
+    vector_conn_falso(indice_local, cursor)
+    monkeypatch.setattr(indice_local, "obter_geracao_corpus", lambda cursor: 7)
+
+    assert reaberto.atualizar() == {"novos": 0, "removidos": 0}
+    assert reaberto.geracao == 7
+    assert len(reaberto.segmentos) == 1
+    assert isinstance(reaberto.segmentos[0].matriz, np.memmap)
+
+
+def test_busca_concorrente_com_atualizacao():
+    linhas = _linhas(600)
+    indice = IndiceLocal()
+    indice._aplicar(linhas[:100])
+    consulta = np.random.default_rng(4).standard_normal(8)
+    erros = []
+    parar = threading.Event()
+
+    def buscar():
+        try:
+            while not parar.is_set():
+                for resultado in indice.buscar_lote([consulta, -consulta], "cat1", limite=5, similaridade_minima=-1):
+                    assert len(resultado) == 5
+                    assert {r["categoria"] for r in resultado} == {"cat1"}
+        except Exception as erro:
+            erros.append(erro)
+
+    threads = [threading.Thread(target=buscar) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for inicio in range(100, 600, 10):
+        indice._aplicar(linhas[inicio:inicio + 10], removidos={inicio - 100, inicio - 99})
+    parar.set()
+    for thread in threads:
+        thread.join()
+
+    assert erros == []
+    restantes = [linha for linha in linhas if not (linha["id"] < 500 and linha["id"] % 10 in (0, 1))]
+    resultado = indice.buscar(consulta, "cat1", limite=5, similaridade_minima=-1)
+    assert [r["content"] for r in resultado] == _esperado(restantes, consulta, "cat1", 5)
+
+
+def test_atualizacao_nao_bloqueia_quem_busca(monkeypatch, vector_conn_falso):
+    atual = IndiceLocal()
+    atual._aplicar(_linhas(20))
+    atual.geracao = 1
+    monkeypatch.setattr(indice_local, "_indice", atual)
+    monkeypatch.setattr(indice_local, "_ultima_verificacao", float("-inf"))
+    vector_conn_falso(indice_local, FakeCursor([]))
+    monkeypatch.setattr(indice_local, "obter_geracao_corpus", lambda cursor: 2)
+
+    lendo_banco, liberar = threading.Event(), threading.Event()
+
+    def atualizar(self):
+        lendo_banco.set()
+        liberar.wait(5)
+        self.geracao = 2
+
+    monkeypatch.setattr(IndiceLocal, "atualizar", atualizar)
+    obtidos = []
+    thread = threading.Thread(target=lambda: obtidos.append(indice_local.obter_indice_local()))
+    thread.start()
+    assert lendo_banco.wait(5)
+
+    # Com a atualização em andamento, as demais chamadas seguem com o índice atual
+    assert indice_local.obter_indice_local() is atual
+    assert atual.geracao == 1
+
+    liberar.set()
+    thread.join()
+    assert obtidos[0] is not atual and obtidos[0].geracao == 2
+    assert indice_local.obter_indice_local() is obtidos[0]
+    assert obtidos[0].segmentos == atual.segmentos
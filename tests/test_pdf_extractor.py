@@ -0,0 +1,41 @@
+import io
+
+from reportlab.pdfgen import canvas
+
+from src.pdf import pdf_extractor
+from src.pdf.pdf_extractor import extrair_texto_pdf, iterar_paginas_pdf
+
+
+def _pdf(paginas: list[str]) -> io.BytesIO:
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for texto in paginas:
+        for i, linha in enumerate(texto.split("\n")):
+            pdf.drawString(72, 800 - 14 * i, linha)
+        pdf.showPage()
+    pdf.save()
+    buffer.seek(0)
+    return buffer
+
+
+def test_paginas_do_pdf_saem_uma_a_uma():
+    arquivo = _pdf(["primeira pagina", "", "terceira pagina"])
+
+    paginas = iterar_paginas_pdf(arquivo)
+    assert next(paginas)["pagina"] == 1
+    assert [p["pagina"] for p in paginas] == [3]
+
+    arquivo.seek(0)
+    assert "primeira" in extrair_texto_pdf(arquivo)
+
+
+def test_extracao_paralela_preserva_a_ordem(monkeypatch):
+    monkeypatch.setattr(pdf_extractor, "MIN_PAGINAS_PARALELO", 1)
+    monkeypatch.setattr(pdf_extractor, "PAGINAS_POR_TAREFA", 3)
+    dados = _pdf([f"pagina numero {p}" for p in range(1, 11)]).getvalue()
+
+    serial = pdf_extractor.extrair_texto_pdf_por_paginas(io.BytesIO(dados), processos=1)
+    paralelo = pdf_extractor.extrair_texto_pdf_por_paginas(io.BytesIO(dados), processos=2)
+
+    assert paralelo == serial
+    assert [p["pagina"] for p in paralelo] == list(range(1, 11))
@@ -0,0 +1,199 @@
+import threading
+import time
+
+import pytest
+
+from src.rag import pipeline
+from src.rag.bulk import hash_conteudo
+from src.rag.pipeline import LimitadorAdaptativo
+
+
+def test_limitador_reduz_e_recupera_concorrencia():
+    limitador = LimitadorAdaptativo(max_concorrencia=4, sucessos_para_aumentar=2)
+
+    limitador.adquirir()
+    limitador.liberar(limitado=True, pausa=0)
+    assert limitador.limite == 2
+    assert limitador.limites_atingidos == 1
+
+    for _ in range(4):
+        limitador.adquirir()
+        limitador.liberar(sucesso=True)
+    assert limitador.limite == 4
+
+
+def test_limitador_pausa_todas_as_threads_apos_429():
+    limitador = LimitadorAdaptativo(max_concorrencia=2)
+    limitador.adquirir()
+    limitador.liberar(limitado=True, pausa=0.1)
+
+    inicio = time.monotonic()
+    limitador.adquirir()
+
+    assert time.monotonic() - inicio >= 0.09
+
+
+def test_limitador_respeita_limite():
+    limitador = LimitadorAdaptativo(max_concorrencia=2)
+    maximo = 0
+    lock = threading.Lock()
+
+    def tarefa():
+        nonlocal maximo
+        limitador.adquirir()
+        with lock:
+            maximo = max(maximo, limitador.em_uso)
+        time.sleep(0.01)
+        limitador.liberar(sucesso=True)
+
+    threads = [threading.Thread(target=tarefa) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert maximo == 2
+
+
+class FakeConn:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def banco(monkeypatch, vector_conn_falso):
+    conn = vector_conn_falso(pipeline, FakeConn())
+    conn.existentes = set()
+    gravadas = []
+
+    def fake_gravar(cursor, linhas, colunas=None):
+        gravadas.extend(linhas)
+        return len(linhas)
+
+    monkeypatch.setattr(pipeline, "_gravar_lote", fake_gravar)
+    monkeypatch.setattr(
+        pipeline, "_hashes_existentes",
+        lambda cursor, categoria, hashes: conn.existentes & set(hashes)
+    )
+    monkeypatch.setattr(pipeline, "_dimensao_divergente", lambda cursor, dimensoes: None)
+    monkeypatch.setattr(pipeline, "invalidar_cache_busca", lambda cursor=None: None)
+    return conn, gravadas
+
+
+def test_ingestao_grava_todos_os_lotes_e_reporta_progresso(banco, monkeypatch):
+    conn, gravadas = banco
+    monkeypatch.setattr(
+        pipeline, "gerar_embeddings_em_lote",
+        lambda lote, limitador=None: [[float(len(t))] for t in lote]
+    )
+    progresso = []
+    textos = [f"bloco {i}" for i in range(25)]
+
+    resultado = pipeline.executar_ingestao(
+        iter(textos), "cat", max_workers=3, tamanho_lote=4, total=25,
+        ao_progredir=lambda feitos, total: progresso.append((feitos, total))
+    )
+
+    assert resultado["linhas"] == 25
+    assert resultado["reaproveitados"] == 0
+    assert sorted(linha[0] for linha in gravadas) == sorted(textos)
+    assert all(linha[1] == "cat" and linha[2] == [float(len(linha[0]))] for linha in gravadas)
+    assert progresso[-1] == (25, 25)
+    # Um commit por lote (checkpoint) mais o final
+    assert conn.commits == 7 + 1
+
+
+def test_ingestao_sem_checkpoint_usa_uma_transacao(banco, monkeypatch):
+    conn, gravadas = banco
+    monkeypatch.setattr(pipeline, "gerar_embeddings_em_lote", lambda lote, limitador=None: [[1.0] for _ in lote])
+
+    pipeline.executar_ingestao([f"b{i}" for i in range(10)], "cat", tamanho_lote=3, checkpoint=False)
+
+    assert len(gravadas) == 10
+    assert conn.commits == 1
+
+
+def test_ingestao_pula_blocos_ja_existentes(banco, monkeypatch):
+    conn, gravadas = banco
+    conn.existentes = {hash_conteudo("antigo 1"), hash_conteudo("antigo 2")}
+    enviados = []
+
+    def fake_lote(lote, limitador=None):
+        enviados.extend(lote)
+        return [[1.0] for _ in lote]
+
+    monkeypatch.setattr(pipeline, "gerar_embeddings_em_lote", fake_lote)
+    progresso = []
+    textos = ["antigo 1", "novo 1", "novo 1", "antigo 2", "novo 2", "antigo 1"]
+
+    resultado = pipeline.executar_ingestao(
+        textos, "cat", max_workers=2, tamanho_lote=2,
+        ao_progredir=lambda feitos, total: progresso.append(feitos)
+    )
+
+    assert sorted(enviados) == ["novo 1", "novo 2"]
+    assert sorted(linha[0] for linha in gravadas) == ["novo 1", "novo 2"]
+    assert resultado["linhas"] == 2
+    assert resultado["reaproveitados"] == 4
+    assert progresso[-1] == 6
+    # A vazão conta só as linhas gravadas, não os blocos pulados
+    assert resultado["linhas_por_segundo"] == pytest.approx(2 / resultado["segundos"])
+
+
+def test_ingestao_desfaz_transacao_em_erro(banco, monkeypatch):
+    conn, _ = banco
+
+    def falha(lote, limitador=None):
+        raise RuntimeError("API fora do ar")
+
+    monkeypatch.setattr(pipeline, "gerar_embeddings_em_lote", falha)
+
+    with pytest.raises(RuntimeError):
+        pipeline.executar_ingestao(["a", "b"], "cat", max_workers=2, tamanho_lote=1)
+
+    assert conn.rollbacks == 1
+    assert conn.commits == 0
+
+
+def test_ingestao_recusa_dimensao_diferente_do_corpus(banco, monkeypatch):
+    conn, gravadas = banco
+    monkeypatch.setattr(pipeline, "gerar_embeddings_em_lote", lambda lote, limitador=None: [[1.0, 0.0] for _ in lote])
+    monkeypatch.setattr(pipeline, "_dimensao_divergente", lambda cursor, dimensoes: 1536)
+
+    with pytest.raises(ValueError, match="1536 dimensões"):
+        pipeline.executar_ingestao(["a", "b"], "cat")
+
+    assert gravadas == []
+
+
+@pytest.mark.parametrize("menor, maior, divergente", [
+    (None, None, None),  # corpus vazio
+    (768, 768, None),
+    (768, 1536, 1536),
+    (512, 768, 512),
+])
+def test_dimensao_divergente_pelas_pontas_do_indice(menor, maior, divergente):
+    class Cursor:
+        def execute(self, sql, parametros=None):
+            self.sql = sql
+
+        def fetchone(self):
+            return {"menor": menor, "maior": maior}
+
+    cursor = Cursor()
+
+    assert pipeline._dimensao_divergente(cursor, 768) == divergente
+    assert "<>" not in cursor.sql
@@ -0,0 +1,168 @@
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+import psycopg2
+import psycopg2.extensions
+import pytest
+
+from src.db.conection import PoolTimeoutError, VectorConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def fetchone(self):
+        return {"?column?": 1}
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.rollbacks = 0
+        self.pings = 0
+        self.info = SimpleNamespace(transaction_status=psycopg2.extensions.TRANSACTION_STATUS_IDLE)
+        # `servidor` faz o papel do PostgreSQL do outro lado do socket
+        self.servidor, self._cliente = socket.socketpair()
+
+    def fileno(self):
+        return self._cliente.fileno()
+
+    def cursor(self):
+        self.pings += 1
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+        self.servidor.close()
+        self._cliente.close()
+
+
+def test_reutiliza_conexao_devolvida():
+    pool = VectorConnectionPool(minconn=0, maxconn=2, factory=FakeConn)
+
+    with pool.connection() as primeira:
+        pass
+    with pool.connection() as segunda:
+        pass
+
+    assert primeira is segunda
+    assert pool.stats()["created"] == 1
+    assert pool.stats()["checkouts"] == 2
+
+
+def test_desfaz_transacao_aberta_na_devolucao():
+    pool = VectorConnectionPool(minconn=0, maxconn=1, factory=FakeConn)
+
+    with pool.connection() as conn:
+        conn.info.transaction_status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    assert conn.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_reconecta_quando_conexao_ociosa_esta_quebrada():
+    pool = VectorConnectionPool(minconn=1, maxconn=1, factory=FakeConn, check_after=0)
+
+    with pool.connection() as conn:
+        conn.broken = True
+
+    with pool.connection() as nova:
+        assert nova is not conn
+
+    assert conn.closed
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_conexao_recente_nao_e_testada():
+    pool = VectorConnectionPool(minconn=1, maxconn=1, factory=FakeConn, check_after=60)
+
+    with pool.connection() as conn:
+        pass
+
+    assert conn.pings == 0
+
+
+def test_reinicio_do_servidor_detectado_antes_de_check_after():
+    pool = VectorConnectionPool(minconn=1, maxconn=1, factory=FakeConn, check_after=60)
+
+    with pool.connection() as conn:
+        pass
+    # Ao reiniciar, o servidor encerra as conexões com um aviso no socket
+    conn.broken = True
+    conn.servidor.sendall(b"E")
+
+    with pool.connection() as nova:
+        assert nova is not conn
+
+    assert conn.closed
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_queda_de_uma_conexao_faz_testar_as_ociosas():
+    pool = VectorConnectionPool(minconn=2, maxconn=2, factory=FakeConn, check_after=60)
+    ociosa, usada = pool.getconn(), pool.getconn()
+    pool.putconn(ociosa)
+    pool.putconn(usada)
+
+    # Failover sem aviso no socket: as duas morrem, mas só uma falha em uso...
+    ociosa.broken = usada.broken = True
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as conn:
+            assert conn is usada
+            conn.cursor().execute("SELECT 1")
+
+    # ...e a ociosa restante, ainda recente, é testada antes de ser emprestada
+    with pool.connection() as nova:
+        assert nova not in (ociosa, usada)
+
+    assert ociosa.pings == 1 and ociosa.closed
+
+
+def test_descarta_conexao_apos_erro_operacional():
+    pool = VectorConnectionPool(minconn=0, maxconn=1, factory=FakeConn)
+
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as conn:
+            raise psycopg2.OperationalError("conexão perdida")
+
+    assert conn.closed
+    assert pool.stats()["idle"] == 0
+    assert pool.stats()["in_use"] == 0
+
+
+def test_espera_por_vaga_e_contabiliza_tempo():
+    pool = VectorConnectionPool(minconn=0, maxconn=1, factory=FakeConn)
+    conn = pool.getconn()
+
+    threading.Timer(0.05, pool.putconn, args=(conn,)).start()
+    with pool.connection(timeout=2):
+        pass
+
+    assert pool.stats()["wait_max_s"] >= 0.04
+
+
+def test_timeout_quando_pool_esgotado():
+    pool = VectorConnectionPool(minconn=0, maxconn=1, factory=FakeConn)
+    pool.getconn()
+
+    inicio = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn(timeout=0.01)
+
+    assert time.monotonic() - inicio < 1
+    assert pool.stats()["timeouts"] == 1
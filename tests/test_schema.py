@@ -0,0 +1,253 @@
+import inspect
+from contextlib import contextmanager
+
+import pytest
+
+from src.db import schema
+from src.rag import get
+
+
+def _sql(texto: str) -> str:
+    return " ".join(texto.split())
+
+
+def test_ddl_hnsw_com_parametros_e_concorrente():
+    sql = _sql(schema._sql_indice_vetorial("idx", "hnsw", 24, 128, 0, concorrente=True))
+
+    assert sql == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx "
+        "ON rag_embeddings USING hnsw (embedding vector_cosine_ops) "
+        "WITH (m = 24, ef_construction = 128)"
+    )
+
+
+def test_ddl_ivfflat_usa_listas_e_ignora_parametros_do_hnsw():
+    sql = _sql(schema._sql_indice_vetorial("idx", "ivfflat", 16, 64, 250, concorrente=False))
+
+    assert sql == (
+        "CREATE INDEX IF NOT EXISTS idx "
+        "ON rag_embeddings USING ivfflat (embedding vector_cosine_ops) "
+        "WITH (lists = 250)"
+    )
+
+
+@pytest.mark.parametrize("precisao, trecho", [
+    ("halfvec", "((embedding::halfvec(768)) halfvec_cosine_ops)"),
+    ("bit", "((binary_quantize(embedding)::bit(768)) bit_hamming_ops)"),
+])
+def test_ddl_quantizado_indexa_a_expressao_da_busca(precisao, trecho):
+    sql = _sql(schema._sql_indice_vetorial("idx", "hnsw", 16, 64, 0, True, precisao, 768))
+
+    assert f"USING hnsw {trecho}" in sql
+    assert schema.expressao_distancia(precisao, 768).startswith(schema.expressao_indice(precisao, 768)[0])
+
+
+def test_ddl_so_aceita_parametros_inteiros():
+    with pytest.raises(ValueError):
+        schema._sql_indice_vetorial("idx", "hnsw", "16); DROP TABLE rag_embeddings; --", 64, 0, True)
+
+
+@pytest.mark.parametrize("linhas, listas", [(0, 1), (500, 1), (200_000, 200), (4_000_000, 2000)])
+def test_listas_ivfflat_pela_heuristica_do_pgvector(linhas, listas):
+    class Cursor:
+        def execute(self, sql, parametros=None):
+            pass
+
+        def fetchone(self):
+            return {"total": linhas}
+
+    assert schema._listas_ivfflat(Cursor()) == listas
+
+
+def test_padroes_de_construcao_vem_do_ambiente():
+    parametros = inspect.signature(schema.criar_indice_vetorial).parameters
+
+    assert parametros["m"].default == schema.HNSW_M_PADRAO == 16
+    assert parametros["ef_construction"].default == schema.HNSW_EF_CONSTRUCTION_PADRAO == 64
+
+
+class CursorAutocommit:
+    """Registra os comandos de _autocommit; fetchone responde pelo trecho do último SQL."""
+
+    def __init__(self, respostas):
+        self.respostas = respostas
+        self.comandos = []
+
+    def execute(self, sql, parametros=None):
+        self.comandos.append(_sql(sql))
+
+    def fetchone(self):
+        for trecho, resposta in self.respostas.items():
+            if trecho in self.comandos[-1]:
+                return resposta() if callable(resposta) else resposta
+        return None
+
+
+@pytest.fixture
+def autocommit_falso(monkeypatch):
+    def substituir(respostas=None):
+        cursor = CursorAutocommit(respostas or {})
+
+        @contextmanager
+        def autocommit():
+            yield cursor
+
+        monkeypatch.setattr(schema, "_autocommit", autocommit)
+        return cursor.comandos
+
+    return substituir
+
+
+def test_recriar_troca_o_indice_sem_bloquear(autocommit_falso):
+    comandos = autocommit_falso({"vector_dims": {"dimensoes": 1536}})
+
+    assert schema.criar_indice_vetorial(m=32, recriar=True) == schema.INDICE_VETORIAL
+
+    novo = f"{schema.INDICE_VETORIAL}_novo"
+    assert comandos[1:] == [
+        f"DROP INDEX CONCURRENTLY IF EXISTS {novo}",
+        _sql(schema._sql_indice_vetorial(novo, "hnsw", 32, 64, None, True)),
+        f"DROP INDEX CONCURRENTLY IF EXISTS {schema.INDICE_VETORIAL}",
+        f"ALTER INDEX {novo} RENAME TO {schema.INDICE_VETORIAL}",
+    ]
+
+
+def test_parametros_indice_valem_so_na_transacao():
+    sql, parametros = get.parametros_indice(ef_search=100, probes=10)
+
+    assert sql.splitlines() == [
+        "SELECT set_config('hnsw.ef_search', %(ef_search)s, true);",
+        "SELECT set_config('ivfflat.probes', %(probes)s, true);",
+    ]
+    assert parametros == {"ef_search": "100", "probes": "10"}
+
+
+def test_parametros_indice_sem_valores_nao_alteram_o_servidor(monkeypatch):
+    monkeypatch.setattr(get, "EF_SEARCH_PADRAO", None)
+    monkeypatch.setattr(get, "PROBES_PADRAO", None)
+
+    assert get.parametros_indice() == ("", {})
+
+
+def test_parametros_indice_usam_os_padroes_do_ambiente(monkeypatch):
+    monkeypatch.setattr(get, "EF_SEARCH_PADRAO", 80)
+    monkeypatch.setattr(get, "PROBES_PADRAO", None)
+
+    assert get.parametros_indice() == ("SELECT set_config('hnsw.ef_search', %(ef_search)s, true);\n", {"ef_search": "80"})
+    # O valor da chamada tem precedência
+    assert get.parametros_indice(ef_search=200)[1] == {"ef_search": "200"}
+
+
+def test_busca_filtrada_liga_a_varredura_iterativa(monkeypatch):
+    monkeypatch.setattr(get, "EF_SEARCH_PADRAO", None)
+    monkeypatch.setattr(get, "PROBES_PADRAO", None)
+    monkeypatch.setattr(get, "BUSCA_ITERATIVA", "relaxed_order")
+
+    sql, parametros = get.parametros_indice(filtrado=True)
+
+    assert sql.splitlines() == [
+        "SELECT set_config('hnsw.iterative_scan', %(busca_iterativa)s, true);",
+        "SELECT set_config('ivfflat.iterative_scan', %(busca_iterativa)s, true);",
+    ]
+    assert parametros == {"busca_iterativa": "relaxed_order"}
+    # Sem filtro o índice já entrega os `limite` mais próximos
+    assert get.parametros_indice() == ("", {})
+
+    monkeypatch.setattr(get, "BUSCA_ITERATIVA", "")
+    assert get.parametros_indice(filtrado=True) == ("", {})
+
+
+def test_inteiro_env(monkeypatch):
+    monkeypatch.setenv("RAG_TESTE_INTEIRO", " 40 ")
+    assert get._inteiro_env("RAG_TESTE_INTEIRO") == 40
+
+    monkeypatch.setenv("RAG_TESTE_INTEIRO", "")
+    assert get._inteiro_env("RAG_TESTE_INTEIRO") is None
+
+
+def test_migracoes_nao_reescrevem_rag_embeddings():
+    for nome, sql in schema.MIGRACOES:
+        assert "GENERATED" not in sql.upper(), nome
+
+    # Toda coluna derivada tem o trigger que a preenche nas linhas novas
+    migracoes = "\n".join(sql for _, sql in schema.MIGRACOES)
+    for coluna in schema.COLUNAS_DERIVADAS:
+        assert f"NEW.{coluna} :=" in migracoes
+
+
+class FakePreenchimento:
+    """Linhas de rag_embeddings com as colunas derivadas ainda nulas nos ids de `nulos`."""
+
+    def __init__(self, ids, nulos):
+        self.ids = ids
+        self.nulos = set(nulos)
+        self.atualizacoes = []
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, parametros=None):
+        sql = _sql(sql)
+        if "information_schema.columns" in sql:
+            self.resultado = [{"column_name": coluna} for coluna in schema.COLUNAS_DERIVADAS]
+        elif sql.startswith("SELECT id"):
+            ultimo = parametros["ultimo"]
+            ids = [i for i in self.ids if ultimo is None or i > ultimo]
+            self.resultado = [{"id": i} for i in ids[:parametros["limite"]]]
+        elif sql.startswith("UPDATE"):
+            faixa = range(parametros["primeiro"], parametros["ultimo"] + 1)
+            self.rowcount = len([i for i in self.nulos if i in faixa])
+            self.atualizacoes.append((sql.split(" = ")[0], parametros["primeiro"], parametros["ultimo"]))
+
+    def fetchall(self):
+        return self.resultado
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_preencher_colunas_em_lotes_pela_chave(vector_conn_falso):
+    banco = vector_conn_falso(schema, FakePreenchimento(ids=[1, 2, 3, 5, 8], nulos=[2, 5, 8]))
+
+    preenchidas = schema.preencher_colunas(tamanho_lote=2)
+
+    assert preenchidas == {coluna: 3 for coluna in schema.COLUNAS_DERIVADAS}
+    atualizacoes = [(primeiro, ultimo) for coluna, primeiro, ultimo in banco.atualizacoes if coluna.endswith("content_hash")]
+    assert atualizacoes == [(1, 2), (3, 5), (8, 8)]
+    # Um commit por lote: nenhuma transação segura a tabela inteira
+    assert banco.commits >= len(banco.atualizacoes)
+
+
+def test_indice_unico_so_e_criado_sem_duplicatas(autocommit_falso, capsys):
+    estado = {"duplicatas": True}
+    comandos = autocommit_falso({
+        "HAVING count(*) > 1": lambda: (1,) if estado["duplicatas"] else None,
+        "indisvalid": {"indisvalid": False},  # sobra de uma tentativa que falhou
+    })
+
+    assert "rag_embeddings_categoria_hash_key" not in schema.criar_indices_derivados()
+    assert "duplicatas" in capsys.readouterr().out
+    assert not any("CREATE UNIQUE INDEX" in c for c in comandos)
+
+    estado["duplicatas"] = False
+    comandos.clear()
+    assert "rag_embeddings_categoria_hash_key" in schema.criar_indices_derivados()
+    assert "DROP INDEX CONCURRENTLY IF EXISTS rag_embeddings_categoria_hash_key" in comandos
+    assert (
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS rag_embeddings_categoria_hash_key "
+        "ON rag_embeddings (categoria, content_hash)"
+    ) in comandos
+
+
+def test_indice_de_dimensao_criado_sem_bloquear(autocommit_falso):
+    comandos = autocommit_falso()
+
+    assert "rag_embeddings_embedding_dim_idx" in schema.criar_indices_derivados()
+    assert "CREATE INDEX CONCURRENTLY IF NOT EXISTS rag_embeddings_embedding_dim_idx ON rag_embeddings (embedding_dim)" in comandos
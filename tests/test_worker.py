@@ -0,0 +1,95 @@
+from src import worker
+from src.rag import jobs
+
+
+def test_job_concluido_grava_resultado(monkeypatch):
+    finalizados = []
+    monkeypatch.setattr(worker, "finalizar_job", lambda job_id, dono, **kwargs: finalizados.append((job_id, kwargs)) or True)
+    monkeypatch.setitem(worker.PROCESSADORES, "texto", lambda job: {"linhas": 3})
+
+    worker.executar_job({"id": 1, "tipo": "texto", "categoria": "c", "tentativas": 1, "worker": "w1"})
+
+    assert finalizados == [(1, {"resultado": {"linhas": 3}, "status": None})]
+
+
+def test_job_com_erro_volta_para_a_fila(monkeypatch):
+    finalizados = []
+    monkeypatch.setattr(worker, "reagendar_job", lambda job_id, dono, erro: finalizados.append((job_id, {"erro": erro})))
+
+    def falha(job):
+        raise RuntimeError("PDF corrompido")
+
+    monkeypatch.setitem(worker.PROCESSADORES, "pdf", falha)
+
+    worker.executar_job({"id": 2, "tipo": "pdf", "categoria": "c", "tentativas": 1, "worker": "w1"})
+    worker.executar_job({"id": 3, "tipo": "planilha", "categoria": "c", "tentativas": 1, "worker": "w1"})
+
+    assert finalizados[0] == (2, {"erro": "PDF corrompido"})
+    assert finalizados[1][0] == 3 and "planilha" in finalizados[1][1]["erro"]
+
+
+def test_progresso_limita_gravacoes(monkeypatch):
+    gravados = []
+    monkeypatch.setattr(worker, "atualizar_job", lambda *args: gravados.append(args))
+
+    atualizar = worker._progresso(5)
+    for feitos in range(1, 11):
+        atualizar(feitos, 10, "msg")
+
+    # Primeira chamada e a final (progresso completo)
+    assert gravados == [(5, 1, 10, "msg"), (5, 10, 10, "msg")]
+
+
+def test_job_cancelado_nao_conta_como_concluido(monkeypatch):
+    finalizados = []
+    monkeypatch.setattr(worker, "finalizar_job", lambda job_id, dono, **kwargs: finalizados.append((job_id, kwargs)) or True)
+    monkeypatch.setitem(worker.PROCESSADORES, "exclusao_categoria", lambda job: {"removidos": 10, "cancelado": True})
+
+    worker.executar_job({"id": 4, "tipo": "exclusao_categoria", "categoria": "c", "tentativas": 1, "worker": "w1"})
+
+    assert finalizados == [(4, {"resultado": {"removidos": 10, "cancelado": True}, "status": "cancelado"})]
+
+
+def test_job_retomado_por_outro_worker_nao_e_dado_como_concluido(monkeypatch, capsys):
+    monkeypatch.setattr(worker, "finalizar_job", lambda job_id, dono, **kwargs: dono == "w2")
+    monkeypatch.setitem(worker.PROCESSADORES, "texto", lambda job: {"linhas": 3})
+
+    worker.executar_job({"id": 5, "tipo": "texto", "categoria": "c", "tentativas": 1, "worker": "w1"})
+
+    saida = capsys.readouterr().out
+    assert "retomado por outro worker" in saida and "concluído" not in saida
+
+
+class FakeCursorJobs:
+    def __init__(self, linhas_afetadas):
+        self.linhas_afetadas = linhas_afetadas
+        self.comandos = []
+
+    def execute(self, sql, parametros=None):
+        self.comandos.append((" ".join(sql.split()), parametros))
+        self.rowcount = self.linhas_afetadas
+
+    def close(self):
+        pass
+
+
+def test_so_o_dono_finaliza_o_job(vector_conn_falso):
+    cursor = FakeCursorJobs(linhas_afetadas=0)
+    vector_conn_falso(jobs, cursor)
+
+    assert jobs.finalizar_job(6, "w1", resultado={"linhas": 1}) is False
+
+    sql, parametros = cursor.comandos[0]
+    assert "WHERE id = %s AND worker = %s AND status = 'processando'" in sql
+    assert parametros[-2:] == (6, "w1")
+
+
+def test_reagendar_job_perdido_nao_o_marca_como_erro(vector_conn_falso):
+    cursor = FakeCursorJobs(linhas_afetadas=0)
+    vector_conn_falso(jobs, cursor)
+
+    assert jobs.reagendar_job(7, "w1", "falhou") is False
+
+    # A tentativa de finalizar também exige o dono, então o job do outro worker fica intacto
+    assert all("worker = %s" in sql for sql, _ in cursor.comandos)
+    assert [parametros[-2:] for _, parametros in cursor.comandos[1:]] == [(7, "w1")]